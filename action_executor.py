@@ -0,0 +1,167 @@
+import bisect
+import itertools
+import logging
+import threading
+import time
+
+from metrics import metrics, STAGE_QUEUE
+
+log = logging.getLogger(__name__)
+
+# Lower numbers run first.
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+ACTION_PRIORITIES = {
+    "Toggle Stream": PRIORITY_HIGH,
+    "Toggle Recording": PRIORITY_HIGH,
+    "Toggle Mic": PRIORITY_NORMAL,
+    "Scene 1": PRIORITY_NORMAL,
+    "Scene 2": PRIORITY_NORMAL,
+    "Toggle Filter": PRIORITY_LOW,
+    "Run Program": PRIORITY_LOW,
+}
+
+# Queued after any pending work so stop() lets the queue drain first.
+_STOP_PRIORITY = 99
+
+
+def priority_for(action_name):
+    """Return the queue priority used for the given action name."""
+    return ACTION_PRIORITIES.get(action_name, PRIORITY_NORMAL)
+
+
+class ActionExecutor:
+    """Run key actions on a worker pool fed by a bounded priority queue.
+
+    ``submit`` never blocks: when the queue is full the press is dropped
+    and counted, so the Tk loop and the keyboard hook thread stay responsive
+    even while OBS is stalled.
+
+    Workers take the oldest action of the highest priority. Actions
+    submitted with the same ``order`` key run one after another in the
+    order they were queued (two presses of one key never swap); the rest
+    run side by side, so their OBS requests can be in flight together.
+    """
+
+    def __init__(self, workers=2, max_queue=64):
+        self.workers = workers
+        self.max_queue = max_queue
+        # (priority, seq, queued_at, func, name, order), kept sorted
+        self._pending = []
+        # Order keys of the actions being run
+        self._running = set()
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._threads = []
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._last_wait = 0.0
+
+    def start(self):
+        if self._threads:
+            return
+        for i in range(self.workers):
+            t = threading.Thread(
+                target=self._worker, name=f"action-worker-{i+1}", daemon=True
+            )
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout=1.0):
+        """Let queued actions finish and stop the workers."""
+        with self._ready:
+            for _ in self._threads:
+                # Not counted against max_queue, so stopping always works
+                bisect.insort(self._pending, (_STOP_PRIORITY, next(self._seq), 0.0, None, None, None))
+            self._ready.notify_all()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def submit(self, func, priority=PRIORITY_NORMAL, name=None, order=None):
+        """Queue ``func`` and return immediately; False if it was dropped.
+
+        ``func`` does not start while an earlier action with the same
+        ``order`` key (any hashable, None for no ordering) is running.
+        """
+        item = (priority, next(self._seq), time.perf_counter(), func, name, order)
+        with self._ready:
+            if len(self._pending) >= self.max_queue:
+                self.dropped += 1
+                item = None
+            else:
+                bisect.insort(self._pending, item)
+                self.submitted += 1
+                self._ready.notify()
+        if item is None:
+            log.warning(
+                "⚠️ Action queue full, dropped %s",
+                name or "action", extra={"action": name},
+            )
+            return False
+        return True
+
+    def _next(self):
+        """Wait for the first queued item whose order key is not running."""
+        with self._ready:
+            while True:
+                for i, item in enumerate(self._pending):
+                    order = item[5]
+                    if order is None or order not in self._running:
+                        del self._pending[i]
+                        if order is not None:
+                            self._running.add(order)
+                        return item
+                self._ready.wait()
+
+    def _worker(self):
+        while True:
+            _, _, queued_at, func, name, order = self._next()
+            if func is None:
+                break
+            waited = time.perf_counter() - queued_at
+            if metrics.enabled:
+                metrics.record(name, STAGE_QUEUE, waited)
+            try:
+                func()
+            except Exception as e:
+                with self._lock:
+                    self.failed += 1
+                if metrics.enabled:
+                    metrics.error(name)
+                log.error("❌ Action %s failed: %s", name or func, e, extra={"action": name})
+            finally:
+                with self._ready:
+                    self._running.discard(order)
+                    self.completed += 1
+                    self._wait_total += waited
+                    self._last_wait = waited
+                    if waited > self._wait_max:
+                        self._wait_max = waited
+                    # The next action with this order key may be waiting
+                    if order is not None:
+                        self._ready.notify_all()
+
+    def stats(self):
+        """Return queue depth, counters and wait times in milliseconds."""
+        with self._lock:
+            done = self.completed
+            avg = self._wait_total / done if done else 0.0
+            return {
+                "queue_depth": len(self._pending),
+                "submitted": self.submitted,
+                "completed": done,
+                "failed": self.failed,
+                "dropped": self.dropped,
+                "avg_wait_ms": avg * 1000,
+                "last_wait_ms": self._last_wait * 1000,
+                "max_wait_ms": self._wait_max * 1000,
+            }
@@ -0,0 +1,200 @@
+import logging
+from functools import partial
+
+from action_executor import priority_for
+from encoders import (
+    ENCODER_ACTIONS, VolumeTarget, TransitionDurationTarget, TransformTarget,
+)
+from gestures import GESTURES, GESTURE_FIELDS, PREVIOUS_SCENE, Gestures
+from launcher import Launcher
+from obs_targets import BROADCAST
+
+log = logging.getLogger(__name__)
+
+# Entry fields, besides "action", that belong to each configurable action
+ACTION_FIELDS = {
+    "Toggle Filter": ("source", "filter"),
+    "Run Program": ("command", "shell", "single_instance"),
+    "Macro": ("steps", "execution"),
+    "Switch Layer": ("layer",),
+    "Volume": ("input", "step"),
+    "Transition Duration": ("step",),
+    "Nudge Transform": ("scene", "source", "property", "step"),
+}
+# Actions that go to OBS and so can name a target (see OBSTargets)
+LOCAL_ACTIONS = ("Run Program", "Switch Layer")
+
+
+def builtin_actions(obs):
+    """Return the actions that need no extra settings, by name."""
+    return {
+        "Toggle Stream": obs.toggle_streaming,
+        "Toggle Recording": obs.toggle_recording,
+        "Toggle Mic": obs.toggle_mic,
+        "Scene 1": partial(obs.set_scene, "Scene 1"),
+        "Scene 2": partial(obs.set_scene, "Scene 2"),
+    }
+
+
+class Binding:
+    """A compiled key assignment, ready to call.
+
+    ``inline`` bindings are cheap and local (like switching layers) and run
+    on the calling thread instead of going through the action queue.
+    Encoder actions have no ``func``; turning the encoder feeds ticks to
+    their ``encoder`` target instead. ``gestures`` holds the double-tap and
+    long-press bindings of the key, if any, and ``follow_up`` a ``(delay,
+    Binding)`` to run after this one.
+    """
+
+    __slots__ = (
+        "action_name", "func", "meta", "priority", "inline", "encoder", "gestures", "follow_up",
+    )
+
+    def __init__(self, action_name, func, meta=None, inline=False, encoder=None):
+        self.action_name = action_name
+        self.func = func
+        self.meta = meta or {}
+        self.priority = priority_for(action_name)
+        self.inline = inline
+        self.encoder = encoder
+        self.gestures = None
+        self.follow_up = None
+
+    def __call__(self):
+        self.func()
+
+    def to_entry(self):
+        """Return the config entry this binding was compiled from."""
+        return dict({"action": self.action_name}, **self.meta)
+
+
+class ActionCompiler:
+    """Turn config entries into Bindings once, so dispatch is a lookup.
+
+    With several OBS ``targets``, OBS actions go through
+    ``OBSTargets.fan_out`` to the entry's ``target`` (the primary when
+    unset, every target for ``"*"``).
+    """
+
+    def __init__(self, obs, switch_layer=None, launcher=None, targets=None):
+        self.obs = obs
+        self.builtins = builtin_actions(obs)
+        self.switch_layer = switch_layer
+        self.launcher = launcher or Launcher()
+        self.targets = targets
+        self._target_builtins = {}
+        if targets is not None:
+            self._target_builtins = {t.name: builtin_actions(t.obs) for t in targets}
+        # Shared by every binding that adjusts the same value, so ticks
+        # from different layers coalesce together
+        self._encoder_targets = {}
+
+    def compile(self, entry):
+        """Return a Binding for a validated entry, or None if unassigned."""
+        binding = self._compile_action(entry)
+        if binding is None:
+            return None
+        follow_up = entry.get("follow_up")
+        if follow_up:
+            follow = self._compile_follow_up(follow_up)
+            if follow is not None:
+                binding.follow_up = (follow_up["delay"], follow)
+        if any(entry.get(gesture) for gesture in GESTURES):
+            double_tap = self.compile(entry["double_tap"]) if entry.get("double_tap") else None
+            long_press = self.compile(entry["long_press"]) if entry.get("long_press") else None
+            if double_tap is not None or long_press is not None:
+                binding.gestures = Gestures(
+                    double_tap, long_press,
+                    entry["double_tap_ms"] / 1000 if "double_tap_ms" in entry else None,
+                    entry["long_press_ms"] / 1000 if "long_press_ms" in entry else None,
+                )
+        # Kept in meta so to_entry gives back the whole entry
+        binding.meta.update((field, entry[field]) for field in GESTURE_FIELDS if field in entry)
+        return binding
+
+    def _compile_follow_up(self, follow_up):
+        if follow_up["action"] == PREVIOUS_SCENE:
+            # The scene to go back to is only known when the key is pressed
+            return Binding(PREVIOUS_SCENE, None)
+        return self.compile({k: v for k, v in follow_up.items() if k != "delay"})
+
+    def _compile_action(self, entry):
+        action = entry.get("action") if entry else None
+        if not action:
+            return None
+        meta = {field: entry[field] for field in ACTION_FIELDS.get(action, ()) if field in entry}
+        if action not in LOCAL_ACTIONS and entry.get("target") is not None:
+            meta["target"] = entry["target"]
+        if self.targets is not None and action not in LOCAL_ACTIONS:
+            if len(self.targets) > 1:
+                return self._compile_targeted(action, meta)
+            if self.targets.resolve(meta.get("target")) is None:
+                log.warning("Ignoring %s: unknown OBS target '%s'", action, meta['target'])
+                return None
+        if action == "Run Program":
+            func = partial(
+                self.launcher.run, meta["command"],
+                shell=meta.get("shell", False),
+                single_instance=meta.get("single_instance", False),
+            )
+            return Binding(action, func, meta)
+        if action == "Toggle Filter":
+            func = partial(self.obs.toggle_filter, meta["source"], meta["filter"])
+            return Binding(action, func, meta)
+        if action == "Macro":
+            meta["execution"] = meta.get("execution") or "serial"
+            func = partial(self.obs.run_macro, meta["steps"], meta["execution"])
+            return Binding(action, func, meta)
+        if action == "Switch Layer":
+            return Binding(action, partial(self.switch_layer, meta["layer"]), meta, inline=True)
+        if action in ENCODER_ACTIONS:
+            return Binding(action, None, meta, encoder=self._encoder_target(action, meta))
+        func = self.builtins.get(action)
+        if func is None:
+            log.warning("Ignoring unknown action '%s'", action)
+            return None
+        return Binding(action, func, meta)
+
+    def _compile_targeted(self, action, meta):
+        targets = self.targets.resolve(meta.get("target"))
+        if targets is None:
+            log.warning("Ignoring %s: unknown OBS target '%s'", action, meta['target'])
+            return None
+        if action in ENCODER_ACTIONS:
+            if len(targets) > 1:
+                log.warning(
+                    "Ignoring %s: encoders adjust one OBS target, not '%s'",
+                    action, BROADCAST,
+                )
+                return None
+            return Binding(action, None, meta, encoder=self._encoder_target(action, meta, targets[0].obs))
+        calls = []
+        for target in targets:
+            if action == "Toggle Filter":
+                func = partial(target.obs.toggle_filter, meta["source"], meta["filter"])
+            elif action == "Macro":
+                meta["execution"] = meta.get("execution") or "serial"
+                func = partial(target.obs.run_macro, meta["steps"], meta["execution"])
+            else:
+                func = self._target_builtins[target.name].get(action)
+                if func is None:
+                    log.warning("Ignoring unknown action '%s'", action)
+                    return None
+            calls.append((target, func))
+        return Binding(action, partial(self.targets.fan_out, action, calls), meta)
+
+    def _encoder_target(self, action, meta, obs=None):
+        obs = obs or self.obs
+        if action == "Volume":
+            target = VolumeTarget(obs, meta["input"], meta.get("step", 1.0))
+        elif action == "Transition Duration":
+            target = TransitionDurationTarget(obs, meta.get("step", 50))
+        else:
+            target = TransformTarget(
+                obs, meta["scene"], meta["source"], meta["property"], meta.get("step")
+            )
+        return self._encoder_targets.setdefault(target.key, target)
+
+    def compile_layer(self, entries):
+        return [self.compile(entry) for entry in entries]
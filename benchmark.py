@@ -0,0 +1,699 @@
+"""Benchmarks for the OBS hot paths, run against a local fake OBS server.
+
+Usage::
+
+    python benchmark.py                          # both backends, default run
+    python benchmark.py --backend asyncio --latency 2 --jitter 0.5
+    python benchmark.py --json results.json      # save for later comparison
+    python benchmark.py --compare results.json   # flag regressions
+
+Latency and jitter are simulated by the server with a fixed random seed, so
+results from two runs on the same machine are comparable.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from fake_obs_server import FakeOBSServer
+from obs_client import OBSClient
+from connection_supervisor import ConnectionSupervisor, STATE_CONNECTED
+from obs_state import OBSStateMirror
+from encoders import TickCoalescer, TransformTarget
+from hotkeys import HotkeyHook
+from obs_targets import OBSTargets
+
+BACKENDS = ("obsws", "asyncio")
+
+# OBSClient methods exercised one call at a time
+METHODS = {
+    "set_scene": lambda c: c.set_scene("Scene 2"),
+    "toggle_mic": lambda c: c.toggle_mic(),
+    "toggle_recording": lambda c: c.toggle_recording(),
+    "toggle_streaming": lambda c: c.toggle_streaming(),
+    "start_recording": lambda c: c.start_recording(),
+    "stop_recording": lambda c: c.stop_recording(),
+    "start_streaming": lambda c: c.start_streaming(),
+    "stop_streaming": lambda c: c.stop_streaming(),
+    "toggle_filter": lambda c: c.toggle_filter("Mic/Aux", "Noise Suppression"),
+    "list_inputs": lambda c: c.list_inputs(),
+    "list_filters": lambda c: c.list_filters("Mic/Aux"),
+}
+
+
+class quiet:
+    """Hide the controller's log messages below ``level`` while timing."""
+
+    def __init__(self, level=logging.ERROR):
+        self.level = level
+
+    def __enter__(self):
+        root = logging.getLogger()
+        self._level = root.level
+        root.setLevel(self.level)
+
+    def __exit__(self, *exc):
+        logging.getLogger().setLevel(self._level)
+
+
+def summarize(samples):
+    """Return latency percentiles in ms and throughput for a list of seconds."""
+    ordered = sorted(samples)
+
+    def pct(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    total = sum(samples)
+    return {
+        "n": len(samples),
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "ops_per_s": len(samples) / total if total else 0.0,
+    }
+
+
+def time_calls(func, iterations, warmup):
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def connected_client(server, backend):
+    client = OBSClient("127.0.0.1", server.port, server.password, backend=backend)
+    with quiet():
+        client.connect()
+    return client
+
+
+def bench_methods(server, backend, args):
+    client = connected_client(server, backend)
+    results = {}
+    with quiet():
+        for name, call in METHODS.items():
+            samples = time_calls(lambda: call(client), args.iterations, args.warmup)
+            results[name] = summarize(samples)
+        client.disconnect()
+    return results
+
+
+def bench_toggle_filter(server, backend, args):
+    """Requests and latency per toggle, without and with the state mirror."""
+    results = {}
+    for mirrored in (False, True):
+        client = connected_client(server, backend)
+        if mirrored:
+            mirror = OBSStateMirror(client)
+            mirror.track_filter("Mic/Aux", "Noise Suppression")
+            mirror.resync()
+        with quiet():
+            before = sum(server.request_counts.values())
+            samples = time_calls(
+                lambda: client.toggle_filter("Mic/Aux", "Noise Suppression"),
+                args.iterations, 0,
+            )
+            sent = sum(server.request_counts.values()) - before
+            client.disconnect()
+        summary = summarize(samples)
+        summary["requests_per_toggle"] = sent / args.iterations
+        results["mirrored" if mirrored else "uncached"] = summary
+    return results
+
+
+def bench_concurrent(server, backend, args, threads=8):
+    """Throughput with several simultaneous callers (e.g. executor workers)."""
+    client = connected_client(server, backend)
+    per_thread = max(1, args.iterations // threads)
+    barrier = threading.Barrier(threads + 1)
+
+    def worker():
+        barrier.wait()
+        for _ in range(per_thread):
+            client.set_scene("Scene 1")
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    with quiet():
+        for t in workers:
+            t.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for t in workers:
+            t.join()
+        elapsed = time.perf_counter() - start
+        client.disconnect()
+    return {
+        "threads": threads,
+        "requests": per_thread * threads,
+        "ops_per_s": per_thread * threads / elapsed,
+    }
+
+
+def bench_encoder(server, backend, args, ticks=500, rate=500):
+    """Requests sent for a fast encoder spin, and whether the end value is exact."""
+    client = connected_client(server, backend)
+    coalescer = TickCoalescer(interval=client.get_frame_interval())
+    target = TransformTarget(client, "Scene 1", "Camera", "positionX", step=1.0)
+    transform = server.scene_items["Scene 1"]["Camera"]["transform"]
+    expected = transform["positionX"] + ticks
+    before = server.request_counts["SetSceneItemTransform"]
+    with quiet():
+        coalescer.start()
+        start = time.perf_counter()
+        for _ in range(ticks):
+            coalescer.tick(target, 1)
+            time.sleep(1 / rate)
+        while coalescer.stats()["pending"]:
+            time.sleep(0.001)
+        time.sleep(0.1)
+        elapsed = time.perf_counter() - start
+        coalescer.stop()
+        client.disconnect()
+    sent = server.request_counts["SetSceneItemTransform"] - before
+    return {
+        "ticks": ticks,
+        "requests": sent,
+        "requests_per_s": sent / elapsed,
+        "exact": transform["positionX"] == expected,
+    }
+
+
+def bench_reconnect(server, backend, args, rounds=5):
+    """Time from OBS coming back until the supervisor reports connected."""
+    client = OBSClient("127.0.0.1", server.port, server.password, backend=backend)
+    connected = threading.Event()
+    supervisor = ConnectionSupervisor(
+        client, heartbeat_interval=0.2, backoff_initial=0.05, backoff_max=0.2
+    )
+    supervisor.add_listener(lambda state, info: state == STATE_CONNECTED and connected.set())
+    samples = []
+    with quiet():
+        supervisor.start()
+        connected.wait(5)
+        for _ in range(rounds):
+            connected.clear()
+            server.stop()
+            time.sleep(0.3)
+            restarted = time.perf_counter()
+            server.start()
+            if connected.wait(5):
+                samples.append(time.perf_counter() - restarted)
+        supervisor.stop()
+        client.disconnect()
+    return summarize(samples) if samples else {"n": 0}
+
+
+class _KeyEvent:
+    __slots__ = ("scan_code", "event_type")
+
+    def __init__(self, scan_code, event_type):
+        self.scan_code = scan_code
+        self.event_type = event_type
+
+
+def bench_hotkey_hook(events=100000):
+    """Time spent in the keyboard hook per event, with no-op actions.
+
+    Uses made-up scan codes, so it runs without keyboard access.
+    """
+    codes = {f"f{13 + i}": (183 + i,) for i in range(12)}
+    codes.update({"ctrl": (29,), "shift": (42,)})
+
+    def resolve(name):
+        if name not in codes:
+            raise ValueError(name)
+        return codes[name]
+
+    hook = HotkeyHook(lambda index: None, lambda encoder, direction: None,
+                      debounce=0, resolve=resolve)
+    hook.start()
+    # Mapped presses, held-key repeats, unmapped keys and modifier chords
+    pattern = [(183, "down"), (183, "down"), (183, "up"), (30, "down"), (30, "up"),
+               (29, "down"), (184, "down"), (184, "up"), (29, "up")]
+    stream = [_KeyEvent(code, kind) for code, kind in pattern] * (events // len(pattern))
+    start = time.perf_counter()
+    for event in stream:
+        hook.on_event(event)
+    elapsed = time.perf_counter() - start
+    stats = hook.stats()
+    return {
+        "events": len(stream),
+        "per_event_us": elapsed / len(stream) * 1e6,
+        "in_hook_avg_us": stats["avg_us"],
+        "repeats_suppressed": stats["repeats_suppressed"],
+    }
+
+
+def bench_volume_meters(inputs=40, channels=2, messages=1000, per_frame=3, seed=0):
+    """Cost of InputVolumeMeters handling for many inputs, without OBS.
+
+    ``per_frame`` messages arrive between two display reads (50 Hz events
+    drawn at about 15 fps).
+    """
+    try:
+        from volume_meters import VolumeMeters
+    except ImportError as e:
+        return {"skipped": str(e)}
+    from obswebsocket import events
+    rng = random.Random(seed)
+    stream = []
+    for _ in range(messages):
+        event = events.InputVolumeMeters()
+        event.input({"inputs": [
+            {"inputName": f"Input {i}", "inputLevelsMul": [
+                [rng.random() * 0.5, rng.random(), rng.random()] for _ in range(channels)
+            ]}
+            for i in range(inputs)
+        ]})
+        stream.append(event)
+    meters = VolumeMeters(obs=None)
+    handler_s = 0.0
+    for number, event in enumerate(stream, start=1):
+        start = time.perf_counter()
+        meters._on_meters(event)
+        handler_s += time.perf_counter() - start
+        if number % per_frame == 0:
+            meters.levels()
+    stats = meters.stats()
+    return {
+        "inputs": inputs,
+        "messages": messages,
+        "handler_us": handler_s / messages * 1e6,
+        "frames": stats["frames"],
+        "frame_ms": stats["avg_frame_ms"],
+    }
+
+
+def bench_timer_wheel(timers=500, span=1.0, idle=0.5, seed=0):
+    """Timer lateness with many pending timers, and wakeups while idle.
+
+    Half the timers are cancelled before they are due, like long-press
+    timeouts of keys that were released in time. A further ``timers`` are
+    set an hour out to check that pending timers do not wake the thread.
+    """
+    from timer_wheel import TimerWheel
+    rng = random.Random(seed)
+    wheel = TimerWheel()
+    wheel.start()
+    far = [wheel.schedule(3600, lambda: None) for _ in range(timers)]
+    time.sleep(0.05)
+    before = wheel.stats()["wakeups"]
+    time.sleep(idle)
+    idle_wakeups = wheel.stats()["wakeups"] - before
+    start = time.perf_counter()
+    pending = [wheel.schedule(rng.uniform(0, span), lambda: None) for _ in range(timers)]
+    for timer in pending[::2]:
+        timer.cancel()
+    schedule_us = (time.perf_counter() - start) / (timers * 1.5) * 1e6
+    time.sleep(span + 0.1)
+    for timer in far:
+        timer.cancel()
+    stats = wheel.stats()
+    wheel.stop()
+    return {
+        "timers": timers,
+        "fired": stats["fired"],
+        "schedule_us": schedule_us,
+        "idle_wakeups": idle_wakeups,
+        "wakeups": stats["wakeups"],
+        "avg_late_ms": stats["avg_late_ms"],
+        "p99_late_ms": stats["p99_late_ms"],
+        "max_late_ms": stats["max_late_ms"],
+    }
+
+
+def bench_fanout(presses=50, slow_latency=0.2, timeout=0.1):
+    """Broadcast presses to a fast, a slow and an unreachable OBS.
+
+    The fast target's latency should not grow with the others, and no press
+    should take much longer than the per-target timeout.
+    """
+    # The unreachable target warns about every skipped press and retry
+    with quiet(), FakeOBSServer() as fast, FakeOBSServer(latency=slow_latency) as slow:
+        spec = f"fast=127.0.0.1:{fast.port},slow=127.0.0.1:{slow.port},dead=127.0.0.1:1"
+        targets = OBSTargets(timeout=timeout, spec=spec)
+        targets.start()
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline and not (
+            targets.get("fast").obs.connected and targets.get("slow").obs.connected
+        ):
+            time.sleep(0.05)
+        calls = [(t, t.obs.toggle_recording) for t in targets]
+        samples = []
+        for _ in range(presses):
+            start = time.perf_counter()
+            try:
+                targets.fan_out("Toggle Recording", calls)
+            except RuntimeError:
+                pass
+            samples.append(time.perf_counter() - start)
+        time.sleep(slow_latency * 2)
+        stats = targets.stats()
+        targets.stop()
+    return {
+        "presses": presses,
+        "timeout_ms": timeout * 1000,
+        "press_p50_ms": statistics.median(samples) * 1000,
+        "press_max_ms": max(samples) * 1000,
+        "targets": {
+            name: {k: s[k] for k in ("avg_ms", "failures", "timeouts")}
+            for name, s in stats.items()
+        },
+    }
+
+
+def bench_key_grid(events=20000, frames=100, seed=0):
+    """Event storm against the key grid renderer (skipped without a display).
+
+    ``events`` key state changes are spread over ``frames`` frames, as a
+    burst of OBS events would be, and each frame is painted once.
+    """
+    try:
+        import tkinter as tk
+        from key_grid import KeyGrid
+        root = tk.Tk()
+    except Exception as e:
+        return {"skipped": str(e).splitlines()[0]}
+    import random
+    rng = random.Random(seed)
+    grid = KeyGrid(root, lambda index: None, lambda index, delta: None)
+    grid.pack()
+    root.update()
+    start = time.perf_counter()
+    for _ in range(frames):
+        for _ in range(events // frames):
+            grid.set_active(rng.randrange(len(grid.keys)), rng.random() < 0.5)
+        grid.paint()
+        root.update_idletasks()
+    elapsed = time.perf_counter() - start
+    stats = grid.stats()
+    root.destroy()
+    return {
+        "events": stats["updates"],
+        "frames": stats["frames"],
+        "items_painted": stats["items_painted"],
+        "avg_frame_ms": stats["avg_frame_ms"],
+        "max_frame_ms": stats["max_frame_ms"],
+        "events_per_s": stats["updates"] / elapsed,
+    }
+
+
+def _rss_kb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def bench_gui_startup(server, runs=3, presses=500):
+    """Cold start of KeyboardGUI in a fresh interpreter, until first idle.
+
+    The last run also times ``presses`` in-process key presses through the
+    controller and reports the resident size, to compare with the daemon.
+    """
+    code = (
+        "import time; t0 = time.perf_counter()\n"
+        "from gui import KeyboardGUI\n"
+        "from daemon import rss_kb\n"
+        "import threading\n"
+        "t1 = time.perf_counter()\n"
+        "g = KeyboardGUI(); g.update()\n"
+        "t2 = time.perf_counter()\n"
+        "c = g.controller; c.set_entry(c.active_layer, 3, {'action': 'Scene 1'})\n"
+        "g.obs.connect(); left = [%d]; done = threading.Event()\n"
+        "def ack(error, lock=threading.Lock()):\n"
+        "    with lock:\n"
+        "        left[0] -= 1\n"
+        "        left[0] or done.set()\n"
+        "t3 = time.perf_counter()\n"
+        "for _ in range(left[0]): c.dispatch(3, ack)\n"
+        "done.wait(60); t4 = time.perf_counter()\n"
+        "print(t1 - t0, t2 - t0, t4 - t3, rss_kb())\n"
+        "g.on_exit()\n"
+    ) % presses
+    env = dict(os.environ, OBS_HOST="127.0.0.1", OBS_PORT=str(server.port),
+               OBS_PASSWORD=server.password)
+    imports, totals = [], []
+    # Runs in a scratch directory so the real keyboard_config.json is untouched
+    with tempfile.TemporaryDirectory() as scratch:
+        env["PYTHONPATH"] = os.path.dirname(os.path.abspath(__file__))
+        for _ in range(runs):
+            proc = subprocess.run(
+                [sys.executable, "-c", code], env=env, capture_output=True,
+                text=True, timeout=120, cwd=scratch,
+            )
+            if proc.returncode != 0:
+                last = (proc.stderr.strip().splitlines() or ["unknown error"])[-1]
+                return {"skipped": last}
+            imported, total, pressed, rss = proc.stdout.strip().splitlines()[-1].split()
+            imports.append(float(imported))
+            totals.append(float(total))
+    return {
+        "import_ms": statistics.median(imports) * 1000,
+        "window_ready_ms": statistics.median(totals) * 1000,
+        "presses_per_s": presses / float(pressed),
+        "rss_kb": int(rss) if rss != "None" else None,
+    }
+
+
+def bench_daemon(server, requests=2000, depth=64):
+    """Pipelined control socket throughput and footprint of daemon.py.
+
+    Keeps ``depth`` "wait" requests in flight on one connection, so each
+    reply means an action has run against OBS, then reads the daemon's
+    resident size and whether Tk got loaded.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, OBS_HOST="127.0.0.1", OBS_PORT=str(server.port),
+               OBS_PASSWORD=server.password)
+    with tempfile.TemporaryDirectory() as scratch:
+        path = os.path.join(scratch, "control.sock")
+        config = os.path.join(scratch, "keyboard_config.json")
+        with open(config, "w", encoding="utf-8") as f:
+            json.dump({"version": 2, "active_layer": "Base", "layers": {
+                "Base": [{"action": "Scene 1"}] * 18}}, f)
+        started = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, os.path.join(here, "daemon.py"), "--config", config,
+             "--socket", path, "--no-hotkeys"],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, cwd=scratch,
+        )
+        try:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            while True:
+                try:
+                    sock.connect(path)
+                    break
+                except OSError:
+                    if proc.poll() is not None or time.perf_counter() - started > 30:
+                        last = (proc.stderr.read().decode().strip().splitlines() or ["no output"])[-1]
+                        return {"skipped": last}
+                    time.sleep(0.01)
+            ready_ms = (time.perf_counter() - started) * 1000
+            lines = sock.makefile("rb")
+
+            def call(request):
+                sock.sendall((json.dumps(request) + "\n").encode())
+                return json.loads(lines.readline())
+
+            while call({"op": "status"})["obs"] != STATE_CONNECTED:
+                time.sleep(0.05)
+            press = (json.dumps({"op": "press", "key": "Key 1", "wait": True}) + "\n").encode()
+            run = (json.dumps({"op": "run", "entry": {"action": "Scene 2"}, "wait": True}) + "\n").encode()
+            sent = received = failed = 0
+            start = time.perf_counter()
+            while received < requests:
+                while sent < requests and sent - received < depth:
+                    sock.sendall(press if sent % 2 else run)
+                    sent += 1
+                failed += not json.loads(lines.readline())["ok"]
+                received += 1
+            elapsed = time.perf_counter() - start
+            status = call({"op": "status"})
+            with open(f"/proc/{proc.pid}/maps") as f:
+                tk_loaded = "_tkinter" in f.read()
+            sock.close()
+        finally:
+            proc.terminate()
+            proc.wait(10)
+    return {
+        "ready_ms": ready_ms,
+        "requests": requests,
+        "depth": depth,
+        "failed": failed,
+        "requests_per_s": requests / elapsed,
+        "rss_kb": status["rss_kb"],
+        "tk_loaded": tk_loaded,
+    }
+
+
+def run(args):
+    results = {"config": {
+        "iterations": args.iterations, "latency_ms": args.latency,
+        "jitter_ms": args.jitter, "seed": args.seed,
+    }}
+    backends = BACKENDS if args.backend == "all" else (args.backend,)
+    for backend in backends:
+        with FakeOBSServer(latency=args.latency / 1000, jitter=args.jitter / 1000,
+                           seed=args.seed) as server:
+            results[backend] = {
+                "methods": bench_methods(server, backend, args),
+                "toggle_filter": bench_toggle_filter(server, backend, args),
+                "concurrent": bench_concurrent(server, backend, args),
+                "encoder": bench_encoder(server, backend, args),
+                "reconnect": bench_reconnect(server, backend, args),
+            }
+    results["hotkey_hook"] = bench_hotkey_hook()
+    results["fanout"] = bench_fanout()
+    results["volume_meters"] = bench_volume_meters(seed=args.seed)
+    results["timer_wheel"] = bench_timer_wheel(seed=args.seed)
+    with FakeOBSServer(seed=args.seed) as server:
+        results["daemon"] = bench_daemon(server)
+    if not args.skip_gui:
+        results["key_grid"] = bench_key_grid(seed=args.seed)
+        with FakeOBSServer(seed=args.seed) as server:
+            results["gui_startup"] = bench_gui_startup(server)
+    return results
+
+
+def flatten(results, prefix=""):
+    """Yield ``(path, value)`` for every numeric leaf."""
+    for key, value in results.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            yield from flatten(value, path)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield path, value
+
+
+def compare(baseline, current, threshold):
+    """Print metrics that got worse by more than ``threshold`` (a fraction)."""
+    old = dict(flatten(baseline))
+    regressions = 0
+    for path, value in flatten(current):
+        if path.startswith("config.") or path not in old or not old[path]:
+            continue
+        # Higher is better for throughput, lower is better for everything else
+        higher_is_better = path.endswith(("ops_per_s", "presses_per_s", "requests_per_s", "events_per_s"))
+        change = (value - old[path]) / old[path]
+        worse = -change if higher_is_better else change
+        if worse > threshold:
+            regressions += 1
+            print(f"REGRESSION {path}: {old[path]:.3f} -> {value:.3f} ({change:+.1%})")
+    print(f"{regressions} regression(s) above {threshold:.0%}")
+    return regressions
+
+
+def print_report(results):
+    for backend in BACKENDS:
+        if backend not in results:
+            continue
+        r = results[backend]
+        print(f"\n== {backend} ==")
+        print(f"{'method':<18}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'ops/s':>10}")
+        for name, s in r["methods"].items():
+            print(f"{name:<18}{s['p50_ms']:>9.3f}{s['p95_ms']:>9.3f}{s['p99_ms']:>9.3f}{s['ops_per_s']:>10.0f}")
+        for mode, s in r["toggle_filter"].items():
+            print(f"toggle_filter {mode}: {s['requests_per_toggle']:.1f} requests, p50 {s['p50_ms']:.3f} ms")
+        c = r["concurrent"]
+        print(f"concurrent set_scene x{c['threads']}: {c['ops_per_s']:.0f} ops/s")
+        e = r["encoder"]
+        print(f"encoder spin: {e['ticks']} ticks -> {e['requests']} requests "
+              f"({e['requests_per_s']:.0f}/s), final value {'exact' if e['exact'] else 'WRONG'}")
+        rc = r["reconnect"]
+        if rc.get("n"):
+            print(f"reconnect: p50 {rc['p50_ms']:.1f} ms, p99 {rc['p99_ms']:.1f} ms")
+    if "hotkey_hook" in results:
+        h = results["hotkey_hook"]
+        print(f"\nkeyboard hook: {h['per_event_us']:.2f} us/event over {h['events']} events")
+    if "fanout" in results:
+        f = results["fanout"]
+        print(f"\nbroadcast to 3 OBS: p50 {f['press_p50_ms']:.1f} ms, max {f['press_max_ms']:.1f} ms "
+              f"(timeout {f['timeout_ms']:.0f} ms)")
+        for name, s in f["targets"].items():
+            print(f"  {name:<6} {s['avg_ms']:>8.1f} ms avg, {s['failures']} failed, {s['timeouts']} timed out")
+    if "volume_meters" in results:
+        v = results["volume_meters"]
+        if "skipped" in v:
+            print(f"\nvolume meters skipped: {v['skipped']}")
+        else:
+            print(f"\nvolume meters ({v['inputs']} inputs): {v['handler_us']:.1f} us/message, "
+                  f"{v['frame_ms']:.3f} ms/frame over {v['frames']} frames")
+    if "timer_wheel" in results:
+        t = results["timer_wheel"]
+        print(f"\ntimer wheel: {t['fired']} of {t['timers']} fired, late avg {t['avg_late_ms']:.2f} ms, "
+              f"p99 {t['p99_late_ms']:.2f} ms, max {t['max_late_ms']:.2f} ms; "
+              f"{t['idle_wakeups']} wakeups idle with {t['timers']} pending")
+    if "daemon" in results:
+        d = results["daemon"]
+        if "skipped" in d:
+            print(f"\ndaemon skipped: {d['skipped']}")
+        else:
+            print(f"\ndaemon: ready {d['ready_ms']:.0f} ms, {d['requests_per_s']:.0f} requests/s "
+                  f"(depth {d['depth']}, {d['failed']} failed), {d['rss_kb']} kB resident, "
+                  f"Tk {'loaded' if d['tk_loaded'] else 'not loaded'}")
+    if "key_grid" in results:
+        k = results["key_grid"]
+        if "skipped" in k:
+            print(f"\nkey grid skipped: {k['skipped']}")
+        else:
+            print(f"\nkey grid: {k['events']} state changes -> {k['frames']} frames, "
+                  f"{k['items_painted']} items redrawn, {k['avg_frame_ms']:.2f} ms/frame "
+                  f"(max {k['max_frame_ms']:.2f})")
+    if "gui_startup" in results:
+        g = results["gui_startup"]
+        if "skipped" in g:
+            print(f"\nGUI startup skipped: {g['skipped']}")
+        else:
+            print(f"\nGUI startup: import {g['import_ms']:.0f} ms, window ready {g['window_ready_ms']:.0f} ms")
+            print(f"GUI: {g['presses_per_s']:.0f} presses/s in-process, {g['rss_kb']} kB resident")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=BACKENDS + ("all",), default="all")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0, help="server latency in ms")
+    parser.add_argument("--jitter", type=float, default=0.0, help="latency jitter in ms")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-gui", action="store_true")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="baseline results file to compare with")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="regression threshold as a fraction (default 0.10)")
+    args = parser.parse_args()
+    # obs-websocket-py logs every dropped connection during the reconnect runs
+    logging.getLogger("obswebsocket").setLevel(logging.ERROR)
+
+    results = run(args)
+    print_report(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(baseline, results, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+
+from encoders import TRANSFORM_PROPERTIES
+from gestures import GESTURES, MAX_FOLLOW_UP_S, MAX_GESTURE_MS, PREVIOUS_SCENE
+from macros import EXECUTION_MODES, validate_steps
+
+log = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 2
+DEFAULT_LAYER = "Base"
+
+
+def _migrate_v0(data):
+    """Version 0 was a bare list with one entry per key."""
+    return {"version": 1, "keys": data}
+
+
+def _migrate_v1(data):
+    """Version 1 had a single set of keys; it becomes the base layer."""
+    return {
+        "version": 2,
+        "active_layer": DEFAULT_LAYER,
+        "layers": {DEFAULT_LAYER: data.get("keys", [])},
+    }
+
+
+# Maps a schema version to the function upgrading it by one version
+MIGRATIONS = {
+    0: _migrate_v0,
+    1: _migrate_v1,
+}
+
+
+def migrate(data):
+    """Upgrade a loaded document to the current schema version."""
+    version = 0 if isinstance(data, list) else data.get("version", 0)
+    if version > SCHEMA_VERSION:
+        raise ValueError(f"Config version {version} is newer than supported ({SCHEMA_VERSION})")
+    while version < SCHEMA_VERSION:
+        data = MIGRATIONS[version](data)
+        version = data["version"]
+    return data
+
+
+def _valid_step(entry):
+    step = entry.get("step", 1)
+    return isinstance(step, (int, float)) and not isinstance(step, bool) and step != 0
+
+
+def _valid_number(value, high):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and 0 < value <= high
+
+
+def _valid_nested(entry, follow_up=True):
+    """A gesture's or follow-up's own entry: an action without gestures."""
+    if not isinstance(entry, dict) or not isinstance(entry.get("action"), str):
+        return False
+    if any(gesture in entry for gesture in GESTURES):
+        return False
+    if not follow_up and "follow_up" in entry:
+        return False
+    return validate_entry(entry) is not None
+
+
+def _valid_follow_up(follow_up):
+    if not isinstance(follow_up, dict) or not _valid_number(follow_up.get("delay"), MAX_FOLLOW_UP_S):
+        return False
+    if follow_up.get("action") == PREVIOUS_SCENE:
+        return True
+    return _valid_nested({k: v for k, v in follow_up.items() if k != "delay"}, follow_up=False)
+
+
+def _valid_gestures(entry):
+    for gesture in GESTURES:
+        if gesture in entry and not _valid_nested(entry[gesture]):
+            return False
+    for field in ("double_tap_ms", "long_press_ms"):
+        if field in entry and not _valid_number(entry[field], MAX_GESTURE_MS):
+            return False
+    return "follow_up" not in entry or _valid_follow_up(entry["follow_up"])
+
+
+def validate_entry(entry):
+    """Return a cleaned key entry, or None if it cannot be used."""
+    if not isinstance(entry, dict):
+        return None
+    action = entry.get("action")
+    if action is None:
+        return {"action": None}
+    if not isinstance(action, str):
+        return None
+    target = entry.get("target")
+    if target is not None and (not isinstance(target, str) or not target):
+        return None
+    if action == "Run Program":
+        if not isinstance(entry.get("command"), str) or not entry["command"]:
+            return None
+        if not all(isinstance(entry.get(flag, False), bool) for flag in ("shell", "single_instance")):
+            return None
+    elif action == "Toggle Filter":
+        if not isinstance(entry.get("source"), str) or not isinstance(entry.get("filter"), str):
+            return None
+    elif action == "Macro":
+        if not validate_steps(entry.get("steps")):
+            return None
+        if entry.get("execution", "serial") not in EXECUTION_MODES:
+            return None
+    elif action == "Switch Layer":
+        if not isinstance(entry.get("layer"), str) or not entry["layer"]:
+            return None
+    elif action == "Volume":
+        if not isinstance(entry.get("input"), str) or not _valid_step(entry):
+            return None
+    elif action == "Transition Duration":
+        if not _valid_step(entry):
+            return None
+    elif action == "Nudge Transform":
+        if not isinstance(entry.get("scene"), str) or not isinstance(entry.get("source"), str):
+            return None
+        if entry.get("property") not in TRANSFORM_PROPERTIES or not _valid_step(entry):
+            return None
+    if not _valid_gestures(entry):
+        return None
+    return dict(entry)
+
+
+def validate_keys(entries, count):
+    """Validate key entries and fit them to ``count`` keys."""
+    if not isinstance(entries, list):
+        raise ValueError("'keys' must be a list")
+    keys = []
+    for index, entry in enumerate(entries[:count]):
+        cleaned = validate_entry(entry)
+        if cleaned is None:
+            log.warning("Ignoring invalid config entry for key #%s: %r", index + 1, entry)
+            cleaned = {"action": None}
+        keys.append(cleaned)
+    if len(entries) > count:
+        log.warning("Ignoring %s extra config entries", len(entries) - count)
+    keys += [{"action": None}] * (count - len(keys))
+    return keys
+
+
+def validate_hotkeys(hotkeys):
+    """Keep the control -> hotkey entries that are both strings."""
+    if hotkeys is None:
+        return {}
+    if not isinstance(hotkeys, dict):
+        log.warning("Ignoring 'hotkeys': not an object")
+        return {}
+    cleaned = {}
+    for control, hotkey in hotkeys.items():
+        if isinstance(control, str) and isinstance(hotkey, str):
+            cleaned[control] = hotkey
+        else:
+            log.warning("Ignoring invalid hotkey entry %r: %r", control, hotkey)
+    return cleaned
+
+
+def validate_document(data, count):
+    """Validate every layer in a v2 document and pick a valid active layer."""
+    layers = data.get("layers")
+    if not isinstance(layers, dict) or not layers:
+        raise ValueError("'layers' must be a non-empty object")
+    cleaned = {}
+    for name, entries in layers.items():
+        if not isinstance(name, str) or not name:
+            log.warning("Ignoring layer with invalid name %r", name)
+            continue
+        cleaned[name] = validate_keys(entries, count)
+    if not cleaned:
+        raise ValueError("no usable layers")
+    for name, keys in cleaned.items():
+        for index, entry in enumerate(keys):
+            if entry.get("action") == "Switch Layer" and entry["layer"] not in cleaned:
+                log.warning(
+                    "Ignoring switch to unknown layer '%s' on %s key #%s",
+                    entry['layer'], name, index + 1,
+                )
+                keys[index] = {"action": None}
+    active = data.get("active_layer")
+    if active not in cleaned:
+        active = next(iter(cleaned))
+    return {
+        "version": data["version"],
+        "active_layer": active,
+        "layers": cleaned,
+        "hotkeys": validate_hotkeys(data.get("hotkeys")),
+    }
+
+
+class ConfigStore:
+    """Versioned keyboard config file with debounced, atomic writes.
+
+    ``save`` only remembers the latest document and (re)starts a short
+    timer; the write happens on the timer thread, so rapid edits cost one
+    write. Each write goes to a temp file that is fsynced and renamed over
+    the config, and the previous file is kept as a rolling backup.
+    """
+
+    def __init__(self, path, delay=0.5, backups=3):
+        self.path = path
+        self.delay = delay
+        self.backups = backups
+        self.writes = 0
+        # signature() of the file as we last wrote it, to tell our own
+        # writes apart from external edits
+        self.last_written = None
+        self._pending = None
+        self._timer = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def backup_path(self, n):
+        return f"{self.path}.bak{n}"
+
+    def load(self, key_count, fallback=True):
+        """Load, migrate and validate the config.
+
+        Falls back to the newest readable backup if the main file is
+        corrupt, unless ``fallback`` is false. Returns None when there is no
+        usable config.
+        """
+        candidates = [self.path]
+        if fallback:
+            candidates += [self.backup_path(n) for n in range(1, self.backups + 1)]
+        for path in candidates:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = validate_document(migrate(json.load(f)), key_count)
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError, KeyError, AttributeError) as e:
+                log.warning("Failed to load config from %s: %s", path, e)
+                continue
+            if path != self.path:
+                log.warning("Restored config from backup %s", path)
+            return data
+        return None
+
+    def signature(self):
+        """Return something that changes whenever the config file is replaced."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def changed_externally(self):
+        """True if the file on disk is not the one we last wrote."""
+        signature = self.signature()
+        return signature is not None and signature != self.last_written
+
+    def save(self, data):
+        """Schedule ``data`` to be written after the debounce delay."""
+        with self._lock:
+            self._pending = data
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Write any pending document now."""
+        with self._lock:
+            data, self._pending = self._pending, None
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if data is None:
+            return
+        try:
+            self._write(data)
+        except Exception as e:
+            log.error("Failed to save config: %s", e)
+
+    def _write(self, data):
+        data = dict(data, version=SCHEMA_VERSION)
+        text = json.dumps(data, indent=2)
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with self._write_lock:
+            self._rotate_backups()
+            fd, tmp = tempfile.mkstemp(
+                prefix=os.path.basename(self.path) + ".", suffix=".tmp", dir=directory
+            )
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(text)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.path)
+            except BaseException:
+                try:
+                    os.unlink(tmp)
+                except OSError:
+                    pass
+                raise
+            _fsync_dir(directory)
+            self.writes += 1
+            self.last_written = self.signature()
+
+    def _rotate_backups(self):
+        if not self.backups or not os.path.exists(self.path):
+            return
+        for n in range(self.backups, 1, -1):
+            older = self.backup_path(n - 1)
+            if os.path.exists(older):
+                os.replace(older, self.backup_path(n))
+        shutil.copy2(self.path, self.backup_path(1))
+
+
+def _fsync_dir(directory):
+    # Makes the rename durable; not supported on Windows
+    if os.name == "nt":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
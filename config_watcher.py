@@ -0,0 +1,149 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+
+log = logging.getLogger(__name__)
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0o2000000)
+
+_EVENT = struct.Struct("iIII")
+
+
+def _load_inotify():
+    """Return libc with the inotify calls, or None where unavailable."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class ConfigWatcher:
+    """Call ``on_change()`` when a file is edited or replaced.
+
+    On Linux the file's directory is watched with inotify, so atomic
+    replacements (write to a temp file, then rename) are seen as well as
+    in-place edits. Elsewhere, or if inotify cannot be set up, the file's
+    inode, mtime and size are polled every ``poll_interval`` seconds.
+    Bursts of events are coalesced: ``on_change`` runs once the file has
+    been quiet for ``settle`` seconds.
+    """
+
+    def __init__(self, path, on_change, poll_interval=1.0, settle=0.1):
+        self.path = os.path.abspath(path)
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self.settle = settle
+        self.mode = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._fd = None
+        self._wake_r = self._wake_w = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._fd = self._open_inotify()
+        self.mode = "inotify" if self._fd is not None else "polling"
+        target = self._run_inotify if self._fd is not None else self._run_polling
+        self._thread = threading.Thread(target=target, name="config-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2):
+        self._stop.set()
+        if self._wake_w is not None:
+            os.write(self._wake_w, b"x")
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        for fd in (self._fd, self._wake_r, self._wake_w):
+            if fd is not None:
+                os.close(fd)
+        self._fd = self._wake_r = self._wake_w = None
+
+    def _notify(self):
+        try:
+            self.on_change()
+        except Exception as e:
+            log.error("Config reload failed: %s", e)
+
+    # -- inotify -----------------------------------------------------------
+
+    def _open_inotify(self):
+        libc = _load_inotify()
+        if libc is None:
+            return None
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            return None
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_MODIFY
+        directory = os.path.dirname(self.path).encode()
+        if libc.inotify_add_watch(fd, directory, mask) < 0:
+            os.close(fd)
+            return None
+        self._wake_r, self._wake_w = os.pipe()
+        return fd
+
+    def _read_events(self):
+        """Return True if any pending event is about the watched file."""
+        name = os.path.basename(self.path)
+        hit = False
+        while True:
+            try:
+                buf = os.read(self._fd, 4096)
+            except BlockingIOError:
+                return hit
+            offset = 0
+            while offset + _EVENT.size <= len(buf):
+                _, _, _, length = _EVENT.unpack_from(buf, offset)
+                offset += _EVENT.size
+                raw = buf[offset:offset + length].split(b"\0", 1)[0]
+                offset += length
+                if raw.decode(errors="replace") == name:
+                    hit = True
+
+    def _run_inotify(self):
+        fds = [self._fd, self._wake_r]
+        while not self._stop.is_set():
+            ready, _, _ = select.select(fds, [], [])
+            if self._stop.is_set():
+                break
+            if not self._read_events():
+                continue
+            # Wait for the burst of events from one save to finish
+            while select.select([self._fd], [], [], self.settle)[0]:
+                self._read_events()
+            self._notify()
+
+    # -- polling fallback --------------------------------------------------
+
+    def _signature(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _run_polling(self):
+        last = self._signature()
+        while not self._stop.wait(self.poll_interval):
+            current = self._signature()
+            if current is not None and current != last:
+                self._notify()
+            last = current
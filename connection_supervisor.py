@@ -0,0 +1,183 @@
+import logging
+import random
+import threading
+import time
+from collections import deque
+
+from metrics import metrics
+
+log = logging.getLogger(__name__)
+
+STATE_DISCONNECTED = "disconnected"
+STATE_CONNECTING = "connecting"
+STATE_CONNECTED = "connected"
+
+# What happens to a key press while OBS is unreachable
+POLICY_FAIL = "fail"
+POLICY_QUEUE = "queue"
+
+
+class ConnectionSupervisor:
+    """Own the OBS connection and keep it alive from a background thread.
+
+    Drops are noticed either by the client's socket-closed callback or by a
+    periodic heartbeat request. Reconnects use exponential backoff with
+    jitter. While the link is down, actions either fail immediately or are
+    held (bounded, with a maximum age) and replayed once connected again.
+    """
+
+    def __init__(self, obs, policy=POLICY_FAIL, heartbeat_interval=5.0,
+                 backoff_initial=0.5, backoff_max=30.0, max_pending=32,
+                 pending_ttl=10.0, dispatch=None):
+        if policy not in (POLICY_FAIL, POLICY_QUEUE):
+            raise ValueError(f"Unknown offline policy: {policy}")
+        self.obs = obs
+        self.policy = policy
+        self.heartbeat_interval = heartbeat_interval
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.pending_ttl = pending_ttl
+        self.dispatch = dispatch
+
+        self.state = STATE_DISCONNECTED
+        self.attempts = 0
+        self.reconnects = 0
+        self.last_error = None
+        self.next_retry_at = None
+        self.down_since = time.monotonic()
+        self.last_reconnect_duration = None
+
+        self._pending = deque(maxlen=max_pending)
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._ever_connected = False
+
+        obs.supervisor = self
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="obs-supervisor", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def add_listener(self, callback):
+        """Call ``callback(state, info)`` from the supervisor thread on changes."""
+        self._listeners.append(callback)
+
+    def info(self):
+        """Return a snapshot of the connection state and reconnect timing."""
+        retry_in = None
+        if self.next_retry_at is not None:
+            retry_in = max(0.0, self.next_retry_at - time.monotonic())
+        return {
+            "state": self.state,
+            "attempts": self.attempts,
+            "reconnects": self.reconnects,
+            "retry_in": retry_in,
+            "last_error": self.last_error,
+            "last_reconnect_duration": self.last_reconnect_duration,
+            "pending": len(self._pending),
+        }
+
+    def connection_lost(self, error=None):
+        """Mark the link as down and wake the reconnect loop."""
+        with self._lock:
+            if self.state == STATE_DISCONNECTED:
+                return
+            self.down_since = time.monotonic()
+            self.last_error = str(error) if error else None
+        self._set_state(STATE_DISCONNECTED)
+        self._wake.set()
+
+    def connection_unavailable(self, retry=None):
+        """Handle an action attempted while OBS is unreachable."""
+        if self.policy == POLICY_QUEUE and retry is not None:
+            self._pending.append((time.monotonic(), retry))
+            log.info("⏳ OBS offline, action queued until reconnect")
+        else:
+            log.warning("⚠️ OBS offline, action skipped")
+        self._wake.set()
+
+    def _set_state(self, state):
+        self.state = state
+        info = self.info()
+        for callback in list(self._listeners):
+            try:
+                callback(state, info)
+            except Exception as e:
+                log.error("Connection listener failed: %s", e)
+
+    def _run(self):
+        delay = self.backoff_initial
+        while not self._stop.is_set():
+            if self.state != STATE_CONNECTED:
+                if self._try_connect():
+                    delay = self.backoff_initial
+                    continue
+                # Equal jitter keeps retries spread out but never immediate
+                wait = delay / 2 + random.uniform(0, delay / 2)
+                delay = min(delay * 2, self.backoff_max)
+                self.next_retry_at = time.monotonic() + wait
+                self._set_state(STATE_DISCONNECTED)
+                self._wake.wait(wait)
+                self._wake.clear()
+                self.next_retry_at = None
+                continue
+
+            self._wake.wait(self.heartbeat_interval)
+            self._wake.clear()
+            if self._stop.is_set() or self.state != STATE_CONNECTED:
+                continue
+            try:
+                self.obs.ping()
+            except Exception as e:
+                log.warning("⚠️ OBS heartbeat failed: %s", e)
+                self.obs.connected = False
+                self.connection_lost(e)
+
+    def _try_connect(self):
+        self.attempts += 1
+        self._set_state(STATE_CONNECTING)
+        try:
+            self.obs.reconnect() if self._ever_connected else self.obs.connect()
+        except Exception as e:
+            self.last_error = str(e)
+            return False
+        if self._ever_connected:
+            self.reconnects += 1
+            if metrics.enabled:
+                metrics.increment("reconnects")
+        self._ever_connected = True
+        self.last_reconnect_duration = time.monotonic() - self.down_since
+        self.attempts = 0
+        self.last_error = None
+        self._set_state(STATE_CONNECTED)
+        self._replay_pending()
+        return True
+
+    def _replay_pending(self):
+        now = time.monotonic()
+        while self._pending:
+            queued_at, retry = self._pending.popleft()
+            if now - queued_at > self.pending_ttl:
+                continue
+            if self.dispatch is not None:
+                self.dispatch(retry)
+            else:
+                try:
+                    retry()
+                except Exception as e:
+                    log.error("Queued action failed: %s", e)
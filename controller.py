@@ -0,0 +1,526 @@
+import logging
+import os
+import threading
+import time
+from functools import partial
+
+from action_executor import ActionExecutor, PRIORITY_HIGH, PRIORITY_LOW
+from actions import ActionCompiler, Binding
+from launcher import Launcher
+from encoders import TickCoalescer
+from toggle_reconciler import ToggleReconciler
+from timer_wheel import TimerWheel
+from gestures import (
+    GestureEngine, DEFAULT_DOUBLE_TAP_MS, DEFAULT_LONG_PRESS_MS, PREVIOUS_SCENE,
+)
+from hotkeys import HotkeyHook, DEFAULT_HOTKEYS, PRESS_CONTROLS
+from qmk_hid import QMKRawHID, find_qmk_device
+from key_trace import TraceRecorder
+from connection_supervisor import STATE_CONNECTED
+from obs_targets import OBSTargets, BROADCAST
+from obs_state import OBSStateMirror, SCENE, RECORD, STREAM, mute_key, filter_key
+from obs_inventory import OBSInventory
+from config_store import ConfigStore, DEFAULT_LAYER
+from config_watcher import ConfigWatcher
+from metrics import metrics, STAGE_HOOK, STAGE_TOTAL
+
+log = logging.getLogger(__name__)
+
+KEY_COUNT = len(PRESS_CONTROLS)
+
+
+def state_key_for(binding):
+    """Return the mirrored OBS state shown on a key, if any."""
+    name = binding.action_name if binding else None
+    if name == "Toggle Stream":
+        return STREAM
+    if name == "Toggle Recording":
+        return RECORD
+    if name == "Toggle Mic":
+        return mute_key("Mic/Aux")
+    if name in ("Scene 1", "Scene 2"):
+        return SCENE
+    if name == "Toggle Filter":
+        return filter_key(binding.meta.get("source"), binding.meta.get("filter"))
+    return None
+
+
+class Controller:
+    """Everything between the inputs and OBS, without any UI.
+
+    Owns the OBS connection and its helpers, the action queue, the compiled
+    key layers, the config file and the hotkey or raw HID input. Both
+    ``KeyboardGUI`` and the headless daemon are built on it. Listeners added
+    with ``add_listener`` hear about changes as ``(event, *args)``, on
+    whichever thread made them:
+
+    - ``("key", index)``: the key's binding or on/off state changed
+    - ``("layers",)``: the active layer or the list of layers changed
+    """
+
+    def __init__(self, config_file="keyboard_config.json", max_queue=64):
+        self._listeners = []
+        # Guards the layer tables against edits from the GUI, the config
+        # watcher and socket clients at once; dispatch never takes it
+        self._lock = threading.RLock()
+
+        # Key presses are queued here so OBS round trips never run on the
+        # Tk loop or the keyboard hook thread
+        self.executor = ActionExecutor(workers=4, max_queue=max_queue)
+        self.executor.start()
+
+        # One client per OBS instance, each connected, watched and
+        # reconnected in the background by its own supervisor; presses made
+        # while OBS is down fail fast or wait for the link depending on the
+        # policy. Keys show the primary's state.
+        self.targets = OBSTargets(
+            dispatch=lambda f: self.executor.submit(f, PRIORITY_HIGH, "queued action"),
+        )
+        self.obs = self.targets.primary.obs
+        self.supervisor = self.targets.primary.supervisor
+        self.supervisor.add_listener(self.on_connection_state)
+        # Event-fed copy of OBS state: toggles are computed locally and keys
+        # show live on/off state without polling OBS
+        self.obs_state = OBSStateMirror(self.obs)
+        self.obs_state.track_input("Mic/Aux")
+        self.obs_state.add_listener(self._on_state_changed)
+        # Toggle keys set the wanted stream/record/mute state; only the net
+        # change is sent, once any transition in progress has settled
+        self.toggles = ToggleReconciler()
+        for target in self.targets:
+            self.toggles.attach(target.obs)
+
+        # Source/filter names for the pickers, prefetched on connect
+        self.inventory = OBSInventory(self.obs)
+
+        # Run Program starts commands from a helper process, not from here
+        self.launcher = Launcher()
+        # Encoder turns are summed here and sent at most once per OBS frame
+        self.coalescer = TickCoalescer()
+        # Long-press and double-tap timeouts and delayed follow-up actions
+        # all run off one timer thread
+        self.timers = TimerWheel()
+        self.gestures = GestureEngine(
+            self.timers, self.run_binding,
+            double_tap=float(os.getenv("KEYBOARD_DOUBLE_TAP_MS", DEFAULT_DOUBLE_TAP_MS)) / 1000,
+            long_press=float(os.getenv("KEYBOARD_LONG_PRESS_MS", DEFAULT_LONG_PRESS_MS)) / 1000,
+        )
+        # id(binding) -> [timer, previous scene] of its pending follow-up
+        self._follow_ups = {}
+        self._follow_lock = threading.Lock()
+
+        # Every layer is compiled into a list of Bindings indexed like the
+        # controls; a press is a list lookup and switching layers swaps
+        # which list is active
+        # Layer keys switch at runtime only; the active layer is written
+        # with the next save or at shutdown, not on every press
+        self.compiler = ActionCompiler(
+            self.obs, switch_layer=partial(self.switch_layer, save=False),
+            launcher=self.launcher, targets=self.targets,
+        )
+        self.layers = {}
+        self.dispatch_tables = {}
+        self.active_layer = DEFAULT_LAYER
+        # Active layer as last written to or read from the config file
+        self._saved_layer = DEFAULT_LAYER
+        self.add_layer(DEFAULT_LAYER)
+        self.dispatch_table = self.dispatch_tables[DEFAULT_LAYER]
+
+        self.config_file = config_file
+        # Edits are written in the background, debounced and atomically
+        self.config_store = ConfigStore(config_file)
+        self.config_watcher = ConfigWatcher(config_file, self.on_config_file_changed)
+
+        # Set when QMK_HID_DEVICE selects raw HID input instead of the hook
+        self.hid = None
+        # With KEYBOARD_TRACE, hook and raw HID input is also written to a
+        # trace file that soak.py can replay
+        self.recorder = None
+        self._input = (self.press, self.rotate, self.release)
+        if os.getenv("KEYBOARD_TRACE"):
+            self.recorder = TraceRecorder(os.getenv("KEYBOARD_TRACE"))
+            self._input = self.recorder.wrap(*self._input)
+        press, turn, release = self._input
+        # One keyboard hook for all 18 controls
+        self.hotkeys = HotkeyHook(
+            press, turn, release=release,
+            debounce=float(os.getenv("KEYBOARD_DEBOUNCE_MS", 30)) / 1000,
+        )
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def _notify(self, event, *args):
+        for callback in list(self._listeners):
+            try:
+                callback(event, *args)
+            except Exception as e:
+                log.error("Controller listener failed: %s", e)
+
+    # -- lifecycle -----------------------------------------------------------
+
+    def start(self, hotkeys=True):
+        """Connect to OBS, watch the config and start reading input.
+
+        Input comes from QMK raw HID when ``QMK_HID_DEVICE`` is set, else
+        from the keyboard hook unless ``hotkeys`` is false.
+        """
+        self.targets.start()
+        self.coalescer.start()
+        self.toggles.start()
+        self.timers.start()
+        if self.recorder is not None:
+            self.recorder.start()
+        self.config_watcher.start()
+        log.info("👀 Watching %s for changes (%s)", self.config_file, self.config_watcher.mode)
+        if os.getenv("QMK_HID_DEVICE"):
+            self.setup_hid(os.getenv("QMK_HID_DEVICE"))
+        elif hotkeys:
+            threading.Thread(target=self.setup_hotkeys, name="hotkey-setup", daemon=True).start()
+
+    def stop(self):
+        """Stop every background service; pending config edits and the
+        active layer are written."""
+        # Pending gestures and follow-ups are dropped
+        self.timers.stop()
+        self.executor.stop()
+        self.config_watcher.stop()
+        if self.active_layer != self._saved_layer:
+            self.save_config()
+        self.config_store.flush()
+        self.launcher.stop()
+        self.coalescer.stop()
+        self.toggles.stop()
+        self.hotkeys.stop()
+        if self.hid is not None:
+            self.hid.stop()
+        if self.recorder is not None:
+            self.recorder.stop()
+        self.targets.stop()
+
+    def on_connection_state(self, state, info):
+        """Refill the OBS state mirror and inventory after every (re)connect."""
+        if state == STATE_CONNECTED:
+            self.executor.submit(self.obs_state.resync, PRIORITY_LOW, "state resync")
+            self.executor.submit(self.inventory.prefetch, PRIORITY_LOW, "inventory prefetch")
+            self.executor.submit(self.update_frame_interval, PRIORITY_LOW, "frame interval")
+
+    def update_frame_interval(self):
+        interval = self.obs.get_frame_interval()
+        if interval:
+            self.coalescer.interval = interval
+
+    def request_resync(self):
+        if self.obs.connected:
+            self.executor.submit(self.obs_state.resync, PRIORITY_LOW, "state resync")
+
+    # -- input ---------------------------------------------------------------
+
+    def setup_hotkeys(self):
+        """Install the keyboard hook that drives every control."""
+        started = time.perf_counter()
+        try:
+            problems = self.hotkeys.start()
+        except Exception as e:
+            log.error("Failed to register hotkeys: %s", e)
+            return
+        for problem in problems:
+            log.warning("Ignoring hotkey: %s", problem)
+        elapsed = (time.perf_counter() - started) * 1000
+        log.info(
+            "⌨️ Keyboard hook installed for %s controls (%.0f ms)",
+            len(self.hotkeys.mapping()), elapsed,
+        )
+
+    def setup_hid(self, device):
+        """Take input from QMK raw HID reports instead of the keyboard hook."""
+        if device == "auto":
+            device = find_qmk_device()
+            if device is None:
+                log.warning("No QMK raw HID device found")
+                return
+        press, turn, release = self._input
+        hid = QMKRawHID(press, turn, device=device, release=release)
+        try:
+            hid.start()
+        except OSError as e:
+            log.warning("Failed to open %s: %s", device, e)
+            return
+        self.hid = hid
+        for index in range(KEY_COUNT):
+            hid.set_led(index, self.key_active(index))
+        log.info("🎹 Reading raw HID reports from %s", device)
+
+    # -- dispatch ------------------------------------------------------------
+
+    def press(self, index, done=None):
+        """Key-down on control ``index``, from the hook, raw HID or the GUI.
+
+        Keys without a double-tap or long-press run right away, like
+        ``dispatch``; the others go to the gesture engine and run once their
+        gesture is known. ``done`` is as for ``dispatch``.
+        """
+        binding = self.dispatch_table[index]
+        if binding is None or binding.gestures is None:
+            return self.dispatch(index, done)
+        self.gestures.down(index, binding, done)
+        return True
+
+    def release(self, index):
+        """Key-up on control ``index``; only gesture keys care."""
+        self.gestures.up(index)
+
+    def dispatch(self, index, done=None):
+        """Run the action bound to control ``index`` on the active layer.
+
+        Safe from any thread; it only looks the binding up and queues it.
+        ``done(error)`` is called once the action has run, with None on
+        success, or right away with the reason when nothing was run.
+        Returns False if nothing was run or queued.
+        """
+        binding = self.dispatch_table[index]
+        if binding is None:
+            log.warning("No action assigned to %s", PRESS_CONTROLS[index])
+            if done is not None:
+                done(f"no action assigned to {PRESS_CONTROLS[index]}")
+            return False
+        return self.run_binding(binding, done)
+
+    def run_binding(self, binding, done=None):
+        """Run or queue a compiled binding; see ``dispatch``."""
+        if binding.encoder is not None:
+            log.info("Turn the encoder to adjust %s", binding.action_name)
+            if done is not None:
+                done(f"{binding.action_name} is adjusted by turning, not pressing")
+            return False
+        if binding.follow_up is not None:
+            self._schedule_follow_up(binding)
+        if binding.inline:
+            binding()
+            if done is not None:
+                done(None)
+            return True
+        pressed = time.perf_counter() if metrics.enabled else None
+        func = binding.func
+        if pressed is not None or done is not None:
+            func = partial(self._run, binding, pressed, done)
+        # Presses of one key run in press order; different keys run side
+        # by side, with their requests in flight together
+        queued = self.executor.submit(func, binding.priority, binding.action_name, binding)
+        if pressed is not None:
+            metrics.record(binding.action_name, STAGE_HOOK, time.perf_counter() - pressed)
+        if not queued:
+            if binding.follow_up is not None:
+                self._cancel_follow_up(binding)
+            if done is not None:
+                done("action queue full")
+        return queued
+
+    def _run(self, binding, pressed, done):
+        error = None
+        try:
+            binding.func()
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            if pressed is not None:
+                metrics.record(binding.action_name, STAGE_TOTAL, time.perf_counter() - pressed)
+            if done is not None:
+                done(error)
+
+    def _schedule_follow_up(self, binding):
+        """Run the binding's follow-up after its delay.
+
+        Pressing the key again before then restarts the delay. Previous
+        Scene remembers the scene that was live before the first press.
+        """
+        delay, follow = binding.follow_up
+        key = id(binding)
+        with self._follow_lock:
+            pending = self._follow_ups.pop(key, None)
+            if pending is not None:
+                pending[0].cancel()
+                previous = pending[1]
+            elif follow.action_name == PREVIOUS_SCENE:
+                previous = self.obs_state.get(SCENE)
+            else:
+                previous = None
+            pending = [None, previous]
+            pending[0] = self.timers.schedule(delay, partial(self._run_follow_up, key, follow, pending))
+            self._follow_ups[key] = pending
+
+    def _cancel_follow_up(self, binding):
+        with self._follow_lock:
+            pending = self._follow_ups.pop(id(binding), None)
+        if pending is not None:
+            pending[0].cancel()
+
+    def _run_follow_up(self, key, follow, pending):
+        """Runs on the timer thread; only queues the action."""
+        with self._follow_lock:
+            if self._follow_ups.get(key) is not pending:
+                # Restarted or cancelled since this timer was set
+                return
+            del self._follow_ups[key]
+        if follow.action_name == PREVIOUS_SCENE:
+            previous = pending[1]
+            if previous is None:
+                log.warning("No previous scene to go back to")
+                return
+            follow = Binding(PREVIOUS_SCENE, partial(self.obs.set_scene, previous))
+        self.run_binding(follow)
+
+    def rotate(self, index, delta):
+        """Turn encoder ``index`` by ``delta`` ticks (negative is counter-clockwise).
+
+        Safe from any thread; the coalescer decides when OBS hears about it.
+        """
+        binding = self.dispatch_table[index]
+        if binding is not None and binding.encoder is not None:
+            self.coalescer.tick(binding.encoder, delta)
+
+    # -- key state -----------------------------------------------------------
+
+    def key_active(self, index):
+        """True while the OBS state shown on control ``index`` is on."""
+        binding = self.dispatch_table[index]
+        key = state_key_for(binding)
+        if key is None:
+            return False
+        if binding.meta.get("target") not in (None, BROADCAST, self.targets.primary.name):
+            # Only the primary's state is mirrored
+            return False
+        value = self.obs_state.get(key)
+        if key == SCENE:
+            return value == binding.action_name
+        if key[0] == "mute":
+            return value is False
+        return bool(value)
+
+    def _key_changed(self, index):
+        if self.hid is not None:
+            self.hid.set_led(index, self.key_active(index))
+        self._notify("key", index)
+
+    def _on_state_changed(self, key, value):
+        for index, binding in enumerate(self.dispatch_table):
+            if binding is not None and state_key_for(binding) == key:
+                self._key_changed(index)
+
+    # -- layers --------------------------------------------------------------
+
+    def set_entry(self, layer, index, entry):
+        """Store and compile one key of a layer.
+
+        Returns True for filter toggles, whose state the caller should then
+        have the mirror fetch.
+        """
+        with self._lock:
+            self.layers[layer][index] = entry
+            binding = self.compiler.compile(entry)
+            self.dispatch_tables[layer][index] = binding
+        if layer == self.active_layer:
+            self._key_changed(index)
+        if binding is not None and binding.action_name == "Toggle Filter":
+            self.obs_state.track_filter(binding.meta["source"], binding.meta["filter"])
+            return True
+        return False
+
+    def assign(self, index, entry):
+        """Set a key on the active layer, then save."""
+        if self.set_entry(self.active_layer, index, entry):
+            self.request_resync()
+        self.save_config()
+
+    def add_layer(self, name):
+        """Create an empty layer."""
+        with self._lock:
+            self.layers[name] = [{"action": None} for _ in range(KEY_COUNT)]
+            self.dispatch_tables[name] = [None] * KEY_COUNT
+
+    def switch_layer(self, name, save=True):
+        """Make ``name`` the active layer; safe to call from any thread."""
+        table = self.dispatch_tables.get(name)
+        if table is None:
+            log.warning("Unknown layer '%s'", name)
+            return False
+        self.active_layer = name
+        self.dispatch_table = table
+        if self.hid is not None:
+            for index in range(KEY_COUNT):
+                self.hid.set_led(index, self.key_active(index))
+        self._notify("layers")
+        if save:
+            self.save_config()
+        return True
+
+    # -- config --------------------------------------------------------------
+
+    def save_config(self):
+        with self._lock:
+            # Entries are replaced, never mutated, so shallow copies are
+            # enough for the write that happens later on the store's timer
+            layers = {name: list(entries) for name, entries in self.layers.items()}
+        self._saved_layer = self.active_layer
+        self.config_store.save({
+            "active_layer": self.active_layer,
+            "layers": layers,
+            "hotkeys": self.hotkeys.mapping(),
+        })
+
+    def load_config(self):
+        data = self.config_store.load(KEY_COUNT)
+        if data is not None:
+            self.apply_config(data)
+
+    def apply_config(self, data):
+        """Bring the layers in line with a loaded config.
+
+        Only keys whose entry differs are recompiled, so a reload after a
+        small edit touches just those keys. Hotkeys go through the dispatch
+        tables and never need re-registering. Returns the number of keys
+        that changed.
+        """
+        changed = 0
+        needs_resync = False
+        with self._lock:
+            for name in [n for n in self.layers if n not in data["layers"]]:
+                del self.layers[name]
+                del self.dispatch_tables[name]
+                changed += KEY_COUNT
+            for name, entries in data["layers"].items():
+                if name not in self.layers:
+                    self.add_layer(name)
+                current = self.layers[name]
+                for index, entry in enumerate(entries):
+                    if entry != current[index]:
+                        needs_resync |= self.set_entry(name, index, entry)
+                        changed += 1
+            if data["active_layer"] != self.active_layer or self.active_layer not in self.layers:
+                self.switch_layer(data["active_layer"], save=False)
+            else:
+                self._notify("layers")
+            self._saved_layer = data["active_layer"]
+        if needs_resync:
+            self.request_resync()
+        hotkeys = dict(DEFAULT_HOTKEYS, **data.get("hotkeys", {}))
+        if hotkeys != self.hotkeys.mapping():
+            # Swaps the hook's lookup table; nothing is re-registered
+            for problem in self.hotkeys.set_mapping(hotkeys):
+                log.warning("Ignoring hotkey: %s", problem)
+            changed += 1
+        return changed
+
+    def on_config_file_changed(self):
+        """Called on the watcher thread when the config file changes."""
+        if not self.config_store.changed_externally():
+            return
+        started = time.perf_counter()
+        # No backup fallback: a half-saved edit should not roll keys back
+        data = self.config_store.load(KEY_COUNT, fallback=False)
+        if data is None:
+            return
+        changed = self.apply_config(data)
+        elapsed = (time.perf_counter() - started) * 1000
+        log.info("🔄 Reloaded %s: %s key(s) changed (%.1f ms)", self.config_file, changed, elapsed)
@@ -0,0 +1,339 @@
+"""Headless keyboard controller with a local control socket.
+
+Runs the same saved assignments as the GUI, from the same
+``keyboard_config.json``, without importing Tk, PIL or pystray. Input comes
+from the keyboard hook (or QMK raw HID when ``QMK_HID_DEVICE`` is set) and
+from scripts talking to a Unix-domain socket.
+
+The socket speaks JSON lines. Each request is an object with an ``op`` and
+an optional ``id`` that is echoed in its reply; clients may pipeline as many
+requests as they like without waiting. Replies are ``{"id": ..., "ok":
+true, ...}`` or ``{"id": ..., "ok": false, "error": "..."}`` and come back
+as soon as the action is queued, or once it has run when the request has
+``"wait": true`` (so waited replies can overtake each other).
+
+    {"op": "press", "key": "Key 4"}             key name or control index
+    {"op": "turn", "encoder": 0, "ticks": -3}
+    {"op": "run", "entry": {"action": "Scene 1"}}
+    {"op": "run", "entry": {"action": "Volume", "input": "Mic/Aux"}, "ticks": 2}
+    {"op": "batch", "entries": [{...}, {...}]}
+    {"op": "layer", "name": "Editing"}
+    {"op": "status"}
+    {"op": "log", "since": 0}                   entries newer than seq 0
+"""
+import argparse
+import json
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from config_store import validate_entry
+from controller import Controller, KEY_COUNT
+from event_log import get_event_log, setup_logging, shutdown_logging
+from hotkeys import ENCODER_COUNT, PRESS_CONTROLS
+
+log = logging.getLogger(__name__)
+
+# Compiled bindings kept for entries sent with "run" and "batch"
+BINDING_CACHE_SIZE = 256
+
+
+def default_socket_path():
+    runtime = os.getenv("XDG_RUNTIME_DIR")
+    if runtime:
+        return os.path.join(runtime, "keyboard-controller.sock")
+    return f"/tmp/keyboard-controller-{os.getuid()}.sock"
+
+
+def rss_kb():
+    """Resident set size of this process in kB, or None where unknown."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+class RequestError(Exception):
+    pass
+
+
+class ControlServer:
+    """Unix socket front end for a ``Controller``; one thread per client."""
+
+    def __init__(self, controller, path):
+        self.controller = controller
+        self.path = path
+        self.requests = 0
+        self.errors = 0
+        self._bindings = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._sock = None
+        self._thread = None
+        self._started = time.monotonic()
+
+    def start(self):
+        if os.path.exists(self.path):
+            # Left behind by a daemon that did not exit cleanly
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.path)
+            except OSError:
+                os.unlink(self.path)
+            else:
+                raise OSError(f"another daemon is listening on {self.path}")
+            finally:
+                probe.close()
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o177)
+        try:
+            sock.bind(self.path)
+        finally:
+            os.umask(old_umask)
+        sock.listen(16)
+        self._sock = sock
+        self._thread = threading.Thread(target=self._accept, name="control-socket", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._sock is not None:
+            try:
+                self._sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._sock.close()
+            self._sock = None
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), name="control-client", daemon=True).start()
+
+    def _serve(self, conn):
+        write_lock = threading.Lock()
+
+        def reply(message):
+            data = (json.dumps(message, default=str) + "\n").encode()
+            with write_lock:
+                try:
+                    conn.sendall(data)
+                except OSError:
+                    pass  # client went away; the action still ran
+
+        with conn, conn.makefile("rb") as lines:
+            for line in lines:
+                if not line.strip():
+                    continue
+                self.requests += 1
+                request_id = None
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise RequestError("request must be a JSON object")
+                    request_id = request.get("id")
+                    self.handle(request, lambda message, i=request_id: reply(dict(message, id=i)))
+                except (ValueError, RequestError) as e:
+                    self.errors += 1
+                    reply({"id": request_id, "ok": False, "error": str(e)})
+                except Exception as e:
+                    # A bug in one request must not drop the connection
+                    self.errors += 1
+                    log.error("❌ Control request %r failed: %s", request_id, e)
+                    reply({"id": request_id, "ok": False, "error": f"internal error: {e}"})
+
+    def handle(self, request, reply):
+        """Carry out one request and call ``reply`` with its result, maybe later."""
+        op = request.get("op")
+        wait = bool(request.get("wait"))
+        if op == "press":
+            index = self._control_index(request.get("key"))
+            self._submit(reply, wait, lambda done: self.controller.dispatch(index, done))
+        elif op == "turn":
+            index, ticks = request.get("encoder"), request.get("ticks", 1)
+            if not isinstance(index, int) or not 0 <= index < ENCODER_COUNT:
+                raise RequestError(f"encoder must be 0-{ENCODER_COUNT - 1}")
+            if not isinstance(ticks, int) or not ticks:
+                raise RequestError("ticks must be a non-zero integer")
+            self.controller.rotate(index, ticks)
+            reply({"ok": True})
+        elif op == "run":
+            binding = self._binding(request.get("entry"))
+            if binding.encoder is not None:
+                ticks = request.get("ticks")
+                if not isinstance(ticks, int) or not ticks:
+                    raise RequestError(f"{binding.action_name} needs non-zero integer ticks")
+                self.controller.coalescer.tick(binding.encoder, ticks)
+                reply({"ok": True})
+                return
+            self._submit(reply, wait, lambda done: self.controller.run_binding(binding, done))
+        elif op == "batch":
+            entries = request.get("entries")
+            if not isinstance(entries, list) or not entries:
+                raise RequestError("entries must be a non-empty list")
+            bindings = [self._binding(entry) for entry in entries]
+            if any(b.encoder is not None for b in bindings):
+                raise RequestError("encoder actions cannot be batched; use run with ticks")
+            self._run_batch(bindings, reply, wait)
+        elif op == "layer":
+            name = request.get("name")
+            if not isinstance(name, str) or name not in self.controller.layers:
+                raise RequestError(f"unknown layer {name!r}")
+            self.controller.switch_layer(name)
+            reply({"ok": True, "layer": name})
+        elif op == "status":
+            reply(dict(self.status(), ok=True))
+        elif op == "log":
+            since = request.get("since", 0)
+            if not isinstance(since, int) or since < 0:
+                raise RequestError("since must be a non-negative integer")
+            event_log = get_event_log()
+            entries = event_log.ring.since(since) if event_log is not None else []
+            reply({"ok": True, "entries": entries})
+        else:
+            raise RequestError(f"unknown op {op!r}")
+
+    def _submit(self, reply, wait, start):
+        """Queue an action; ``start(done)`` returns False if it did not run."""
+        if not wait:
+            # Collects the reason when the action is refused up front
+            refused = []
+            if not start(refused.append):
+                raise RequestError(refused[0] if refused else "nothing to run")
+            reply({"ok": True, "queued": True})
+            return
+
+        def done(error):
+            if error is None:
+                reply({"ok": True})
+            else:
+                self.errors += 1
+                reply({"ok": False, "error": error})
+
+        start(done)
+
+    def _run_batch(self, bindings, reply, wait):
+        remaining = [len(bindings)]
+        errors = []
+        lock = threading.Lock()
+
+        def done(error):
+            with lock:
+                if error is not None:
+                    errors.append(error)
+                remaining[0] -= 1
+                finished = remaining[0] == 0
+            if finished and wait:
+                if errors:
+                    self.errors += 1
+                    reply({"ok": False, "error": "; ".join(errors), "count": len(bindings)})
+                else:
+                    reply({"ok": True, "count": len(bindings)})
+
+        queued = 0
+        for binding in bindings:
+            queued += bool(self.controller.run_binding(binding, done))
+        if not wait:
+            reply({"ok": queued == len(bindings), "queued": queued})
+
+    def _control_index(self, key):
+        if isinstance(key, str) and key in PRESS_CONTROLS:
+            return PRESS_CONTROLS.index(key)
+        if isinstance(key, int) and 0 <= key < KEY_COUNT:
+            return key
+        raise RequestError(f"key must be a control name or 0-{KEY_COUNT - 1}")
+
+    def _binding(self, entry):
+        """Compile an ad-hoc entry, reusing the binding for repeated entries."""
+        cache_key = json.dumps(entry, sort_keys=True)
+        with self._cache_lock:
+            binding = self._bindings.get(cache_key)
+            if binding is not None:
+                self._bindings.move_to_end(cache_key)
+                return binding
+        cleaned = validate_entry(entry)
+        if cleaned is None or cleaned["action"] is None:
+            raise RequestError(f"invalid entry {entry!r}")
+        binding = self.controller.compiler.compile(cleaned)
+        if binding is None:
+            raise RequestError(f"unknown action {cleaned['action']!r}")
+        with self._cache_lock:
+            self._bindings[cache_key] = binding
+            if len(self._bindings) > BINDING_CACHE_SIZE:
+                self._bindings.popitem(last=False)
+        return binding
+
+    def status(self):
+        controller = self.controller
+        return {
+            "obs": controller.supervisor.info()["state"],
+            "layer": controller.active_layer,
+            "layers": list(controller.layers),
+            "queue": controller.executor.stats(),
+            "encoders": controller.coalescer.stats(),
+            "toggles": controller.toggles.stats(),
+            "gestures": dict(controller.gestures.stats(), timers=controller.timers.stats()),
+            "targets": controller.targets.stats(),
+            "requests": self.requests,
+            "errors": self.errors,
+            "uptime_s": round(time.monotonic() - self._started, 1),
+            "rss_kb": rss_kb(),
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the keyboard controller without a window")
+    parser.add_argument("--config", default="keyboard_config.json")
+    parser.add_argument("--socket", default=default_socket_path())
+    parser.add_argument("--no-hotkeys", action="store_true",
+                        help="only take input from the control socket (and QMK raw HID)")
+    args = parser.parse_args(argv)
+    setup_logging()
+    try:
+        return _serve(args)
+    finally:
+        shutdown_logging()
+
+
+def _serve(args):
+    controller = Controller(args.config, max_queue=256)
+    controller.load_config()
+    server = ControlServer(controller, args.socket)
+    try:
+        server.start()
+    except OSError as e:
+        log.error("❌ Cannot listen on %s: %s", args.socket, e)
+        controller.stop()
+        return 1
+    stopping = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stopping.set())
+
+    controller.start(hotkeys=not args.no_hotkeys)
+    log.info(
+        "🎛️ Daemon listening on %s (layer %s, %s kB resident)",
+        args.socket, controller.active_layer, rss_kb(),
+    )
+    stopping.wait()
+    log.info("🛑 Stopping daemon...")
+    server.stop()
+    controller.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
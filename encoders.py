@@ -0,0 +1,239 @@
+import logging
+import threading
+import time
+
+from metrics import metrics, STAGE_TOTAL
+
+log = logging.getLogger(__name__)
+
+# Used until OBS reports its frame rate
+DEFAULT_FRAME_INTERVAL = 1 / 60
+# Once an encoder has been still this long, the next turn reads the value
+# from OBS again in case it was changed elsewhere
+REFRESH_AFTER = 1.0
+
+ENCODER_ACTIONS = ("Volume", "Transition Duration", "Nudge Transform")
+# Scene item transform fields an encoder can nudge, with their default step
+TRANSFORM_PROPERTIES = {
+    "positionX": 5.0,
+    "positionY": 5.0,
+    "rotation": 1.0,
+    "scaleX": 0.01,
+    "scaleY": 0.01,
+}
+
+
+def clamp(value, low, high):
+    return max(low, min(high, value))
+
+
+class EncoderTarget:
+    """An absolute OBS value that an encoder moves by ``step`` per tick.
+
+    The value is read once and then tracked locally, so a burst of ticks is
+    applied as a single Set request with the summed change. ``key`` tells
+    targets apart: the same value on two OBS instances is two targets.
+    """
+
+    name = "Encoder"
+
+    def __init__(self, obs, step):
+        self.obs = obs
+        self.step = step
+        self.value = None
+        self.last_flush = 0.0
+
+    @property
+    def key(self):
+        return (id(self.obs),) + self.value_key
+
+    @property
+    def value_key(self):
+        raise NotImplementedError
+
+    def read(self):
+        raise NotImplementedError
+
+    def write(self, value):
+        raise NotImplementedError
+
+    def limit(self, value):
+        return value
+
+    def flush(self, ticks):
+        """Apply ``ticks`` (negative for counter-clockwise); True on success."""
+        now = time.monotonic()
+        if self.value is None or now - self.last_flush > REFRESH_AFTER:
+            self.value = self.read()
+        self.last_flush = now
+        if self.value is None:
+            return False
+        value = self.limit(self.value + ticks * self.step)
+        if not self.write(value):
+            self.value = None
+            return False
+        self.value = value
+        return True
+
+
+class VolumeTarget(EncoderTarget):
+    name = "Volume"
+
+    def __init__(self, obs, input_name, step=1.0):
+        super().__init__(obs, step)
+        self.input_name = input_name
+
+    @property
+    def value_key(self):
+        return ("volume", self.input_name, self.step)
+
+    def read(self):
+        return self.obs.get_input_volume(self.input_name)
+
+    def write(self, value):
+        return self.obs.set_input_volume(self.input_name, value)
+
+    def limit(self, value):
+        # Range accepted by SetInputVolume
+        return clamp(value, -100.0, 26.0)
+
+
+class TransitionDurationTarget(EncoderTarget):
+    name = "Transition Duration"
+
+    def __init__(self, obs, step=50):
+        super().__init__(obs, step)
+
+    @property
+    def value_key(self):
+        return ("transition_duration", self.step)
+
+    def read(self):
+        return self.obs.get_transition_duration()
+
+    def write(self, value):
+        return self.obs.set_transition_duration(value)
+
+    def limit(self, value):
+        return int(clamp(value, 50, 20000))
+
+
+class TransformTarget(EncoderTarget):
+    name = "Nudge Transform"
+
+    def __init__(self, obs, scene_name, source_name, prop, step=None):
+        super().__init__(obs, TRANSFORM_PROPERTIES[prop] if step is None else step)
+        self.scene_name = scene_name
+        self.source_name = source_name
+        self.prop = prop
+        self.item_id = None
+
+    @property
+    def value_key(self):
+        return ("transform", self.scene_name, self.source_name, self.prop, self.step)
+
+    def read(self):
+        self.item_id, transform = self.obs.get_scene_item_transform(
+            self.scene_name, self.source_name
+        )
+        return transform.get(self.prop) if transform else None
+
+    def write(self, value):
+        return self.obs.set_scene_item_transform(
+            self.scene_name, self.item_id, {self.prop: value}
+        )
+
+
+class TickCoalescer:
+    """Collects encoder ticks and applies them at most once per frame.
+
+    ``tick`` only adds to a per-target counter and returns, so it is safe to
+    call from the hotkey thread at any rate. A single flusher thread sends
+    one request per target with the summed ticks, no more often than every
+    ``interval`` seconds per target, and never more than one at a time. No
+    tick is dropped, so the final value is the same as sending every tick.
+    """
+
+    def __init__(self, interval=DEFAULT_FRAME_INTERVAL):
+        self.interval = interval
+        self.ticks = 0
+        self.flushes = 0
+        self.failures = 0
+        self._pending = {}  # target key -> [target, ticks, first tick time]
+        self._next_due = {}  # target key -> earliest time of its next flush
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name="encoder-flush", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def tick(self, target, delta):
+        with self._cond:
+            self.ticks += 1
+            entry = self._pending.get(target.key)
+            if entry is None:
+                self._pending[target.key] = [target, delta, time.perf_counter()]
+            else:
+                entry[1] += delta
+            self._cond.notify()
+
+    def _due(self):
+        """Wait for targets that may be flushed and take their ticks."""
+        with self._cond:
+            while self._running:
+                now = time.monotonic()
+                due = [k for k in self._pending if self._next_due.get(k, 0) <= now]
+                if due:
+                    for key in due:
+                        self._next_due[key] = now + self.interval
+                    return [self._pending.pop(key) for key in due]
+                timeout = None
+                if self._pending:
+                    timeout = min(self._next_due[k] for k in self._pending) - now
+                self._cond.wait(timeout)
+            return None
+
+    def _run(self):
+        while True:
+            batch = self._due()
+            if batch is None:
+                return
+            for target, ticks, first_tick in batch:
+                if ticks == 0:
+                    # Turned back and forth within one frame
+                    continue
+                try:
+                    ok = target.flush(ticks)
+                except Exception as e:
+                    log.error("%s encoder failed: %s", target.name, e)
+                    ok = False
+                self.flushes += 1
+                if not ok:
+                    self.failures += 1
+                if metrics.enabled:
+                    metrics.record(target.name, STAGE_TOTAL, time.perf_counter() - first_tick)
+                    if not ok:
+                        metrics.error(target.name)
+
+    def stats(self):
+        return {
+            "pending": len(self._pending),
+            "ticks": self.ticks,
+            "flushes": self.flushes,
+            "failures": self.failures,
+            "interval_ms": self.interval * 1000,
+        }
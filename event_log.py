@@ -0,0 +1,157 @@
+"""Application log: non-blocking for callers, bounded in memory.
+
+Modules log through the standard ``logging`` module. ``setup_logging``
+puts a single ``QueueHandler`` on the root logger, so a log call on a hot
+path (a key press, the keyboard hook, an OBS event) only formats its
+message and appends it to a queue. A ``QueueListener`` thread hands the
+records to the sinks: a fixed-size ring buffer the GUI log panel reads, an
+optional console, and a rotating log file, which keeps messages when the
+app runs from the tray without a console.
+
+Extra fields passed with ``extra=`` (such as ``action`` or ``target``) are
+kept on the ring buffer entries and written to the file after the message.
+"""
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from collections import deque
+
+# Entries kept for the log panel
+DEFAULT_CAPACITY = 1000
+DEFAULT_LOG_FILE = "keyboard_controller.log"
+# The file is rotated at this size, keeping LOG_BACKUPS old files
+LOG_MAX_BYTES = 1024 * 1024
+LOG_BACKUPS = 3
+# Record attributes set by logging itself; anything else came from extra=
+_STANDARD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+def record_fields(record):
+    """The structured fields a record was logged with, as a dict."""
+    return {k: v for k, v in vars(record).items() if k not in _STANDARD_FIELDS}
+
+
+class RingBufferHandler(logging.Handler):
+    """Keeps the newest ``capacity`` records as plain dicts.
+
+    Every entry gets an increasing ``seq``, so readers poll with
+    ``since(last_seq)`` and only get what is new.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        super().__init__()
+        self.capacity = capacity
+        self.seq = 0
+        self.dropped = 0
+        self._entries = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+
+    def emit(self, record):
+        entry = {
+            "time": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(record_fields(record))
+        with self._lock:
+            self.seq += 1
+            entry["seq"] = self.seq
+            if len(self._entries) == self.capacity:
+                self.dropped += 1
+            self._entries.append(entry)
+
+    def since(self, seq=0):
+        """Entries newer than ``seq``, oldest first."""
+        with self._lock:
+            if seq >= self.seq:
+                return []
+            return [e for e in self._entries if e["seq"] > seq]
+
+
+class _FieldFormatter(logging.Formatter):
+    """Standard format, followed by the record's extra fields as key=value."""
+
+    def format(self, record):
+        text = super().format(record)
+        fields = record_fields(record)
+        if fields:
+            text += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return text
+
+
+class EventLog:
+    """The queue, listener thread and sinks set up by ``setup_logging``."""
+
+    def __init__(self, capacity, console, log_file, level):
+        self.ring = RingBufferHandler(capacity)
+        self.log_file = log_file
+        handlers = [self.ring]
+        if console:
+            stream = logging.StreamHandler(sys.stdout)
+            stream.setFormatter(logging.Formatter("%(message)s"))
+            handlers.append(stream)
+        if log_file:
+            file_handler = logging.handlers.RotatingFileHandler(
+                log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8",
+            )
+            file_handler.setFormatter(_FieldFormatter(
+                "%(asctime)s %(levelname)s %(name)s [%(threadName)s] %(message)s"
+            ))
+            handlers.append(file_handler)
+        self.queue = queue.SimpleQueue()
+        self.handler = logging.handlers.QueueHandler(self.queue)
+        self.listener = logging.handlers.QueueListener(
+            self.queue, *handlers, respect_handler_level=True,
+        )
+        self.level = level
+
+    def start(self):
+        root = logging.getLogger()
+        root.addHandler(self.handler)
+        root.setLevel(self.level)
+        self.listener.start()
+
+    def stop(self):
+        """Write out everything still queued and close the sinks."""
+        logging.getLogger().removeHandler(self.handler)
+        self.listener.stop()
+        for handler in self.listener.handlers:
+            handler.close()
+
+
+_event_log = None
+
+
+def setup_logging(console=True, log_file=None, capacity=None, level=None):
+    """Route all logging through the queue; safe to call more than once.
+
+    ``log_file`` defaults to ``KEYBOARD_LOG_FILE`` (``keyboard_controller.log``;
+    an empty value turns the file off) and ``level`` to ``KEYBOARD_LOG_LEVEL``.
+    """
+    global _event_log
+    if _event_log is not None:
+        return _event_log
+    if log_file is None:
+        log_file = os.getenv("KEYBOARD_LOG_FILE", DEFAULT_LOG_FILE)
+    level = level or os.getenv("KEYBOARD_LOG_LEVEL", "INFO").upper()
+    _event_log = EventLog(capacity or DEFAULT_CAPACITY, console, log_file, level)
+    _event_log.start()
+    # The obsws client logs every message it does not expect as a warning
+    logging.getLogger("obswebsocket").setLevel(logging.ERROR)
+    return _event_log
+
+
+def get_event_log():
+    """The running ``EventLog``, or None before ``setup_logging``."""
+    return _event_log
+
+
+def shutdown_logging():
+    global _event_log
+    if _event_log is not None:
+        _event_log.stop()
+        _event_log = None
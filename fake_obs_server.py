@@ -0,0 +1,442 @@
+import asyncio
+import base64
+import collections
+import hashlib
+import json
+import random
+import struct
+import threading
+import zlib
+
+import websockets
+
+from obs_async_client import (
+    OP_HELLO, OP_IDENTIFY, OP_IDENTIFIED, OP_REIDENTIFY, OP_EVENT, OP_REQUEST,
+    OP_REQUEST_RESPONSE, OP_REQUEST_BATCH, OP_REQUEST_BATCH_RESPONSE,
+    EXECUTION_PARALLEL, EVENT_SUBSCRIPTION_ALL, EVENT_SUBSCRIPTION_INPUT_VOLUME_METERS,
+    build_auth_string,
+)
+
+# RequestStatus codes used by the stand-in
+STATUS_SUCCESS = 100
+STATUS_UNKNOWN_REQUEST = 204
+STATUS_RESOURCE_NOT_FOUND = 600
+
+
+def solid_png(width, height, rgb):
+    """Encode a ``width`` x ``height`` PNG filled with one color."""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    row = b"\x00" + bytes(rgb) * width
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(row * height))
+        + chunk(b"IEND", b"")
+    )
+
+
+class FakeOBSServer:
+    """Local stand-in for an obs-websocket v5 server.
+
+    It keeps a small scene/input/filter state, answers the requests the
+    controller uses, emits the matching events, and can add latency, jitter
+    and disconnects. Handlers for other requests can be added with ``on``.
+    Runs its own event loop thread, so it can be used from plain code::
+
+        with FakeOBSServer(latency=0.005) as server:
+            client = OBSClient("127.0.0.1", server.port, "")
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, password="", latency=0.0,
+                 jitter=0.0, seed=0, disconnect_every=None, output_delay=0.0):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.latency = latency
+        self.jitter = jitter
+        self.disconnect_every = disconnect_every
+        # Seconds recording/streaming take to start or stop
+        self.output_delay = output_delay
+        self._random = random.Random(seed)
+
+        self.request_counts = collections.Counter()
+        self.scenes = ["Scene 1", "Scene 2"]
+        self.program_scene = "Scene 1"
+        self.inputs = {"Mic/Aux": {"muted": False, "volume_db": 0.0}}
+        self.filters = {"Mic/Aux": {"Noise Suppression": True}}
+        self.outputs = {"record": False, "stream": False}
+        self._transitions = set()
+        self.transition_duration = 300
+        self.scene_items = {
+            "Scene 1": {"Camera": {"id": 1, "transform": {
+                "positionX": 0.0, "positionY": 0.0, "rotation": 0.0,
+                "scaleX": 1.0, "scaleY": 1.0,
+            }}},
+        }
+
+        self._handlers = {}
+        # Identified clients and their eventSubscriptions
+        self._clients = {}
+        # Answer and event sends in progress, cancelled by stop()
+        self._tasks = set()
+        self._server = None
+        self._loop = None
+        self._thread = None
+        self._requests_seen = 0
+        self._register_defaults()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # -- lifecycle ---------------------------------------------------------
+
+    def start(self):
+        """Start listening (again); the port is kept across restarts."""
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(
+                target=self._loop.run_forever, name="fake-obs", daemon=True
+            )
+            self._thread.start()
+        self._run(self._start())
+
+    async def _start(self):
+        self._server = await websockets.serve(
+            self._serve, self.host, self.port, max_size=None
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    def stop(self):
+        """Stop listening and drop every client, like OBS shutting down."""
+        if self._server is not None:
+            self._run(self._stop())
+
+    async def _stop(self):
+        self._server.close()
+        for ws in list(self._clients):
+            await ws.close()
+        await self._server.wait_closed()
+        self._server = None
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def close(self):
+        self.stop()
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(2)
+            self._loop = None
+
+    def drop_connections(self):
+        """Close every client connection but keep accepting new ones."""
+        self._run(self._drop())
+
+    async def _drop(self):
+        for ws in list(self._clients):
+            await ws.close()
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(5)
+
+    # -- scripting ---------------------------------------------------------
+
+    def on(self, request_type, handler):
+        """Answer ``request_type`` with ``handler(data) -> (ok, response)``."""
+        self._handlers[request_type] = handler
+
+    def emit(self, event_type, data=None):
+        """Send an event to every identified client (thread-safe)."""
+        self._loop.call_soon_threadsafe(self._broadcast, event_type, data or {})
+
+    def emit_volume_meters(self, levels):
+        """Send InputVolumeMeters, ``levels`` being ``{input: [[mag, peak, input_peak], ...]}``.
+
+        Like OBS, only clients that subscribed to the meters receive it.
+        """
+        self.emit("InputVolumeMeters", {"inputs": [
+            {"inputName": name, "inputLevelsMul": channels}
+            for name, channels in levels.items()
+        ]})
+
+    def _broadcast(self, event_type, data):
+        intent = EVENT_SUBSCRIPTION_INPUT_VOLUME_METERS if event_type == "InputVolumeMeters" else 1
+        message = json.dumps({
+            "op": OP_EVENT,
+            "d": {"eventType": event_type, "eventIntent": intent, "eventData": data},
+        })
+        for ws, subscriptions in list(self._clients.items()):
+            if subscriptions & intent:
+                self._spawn(self._send(ws, message))
+
+    def _spawn(self, coro):
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, ws, message):
+        try:
+            await ws.send(message)
+        except websockets.ConnectionClosed:
+            pass
+
+    # -- protocol ----------------------------------------------------------
+
+    async def _serve(self, ws):
+        hello = {"obsWebSocketVersion": "5.0.0-fake", "rpcVersion": 1}
+        salt = challenge = None
+        if self.password:
+            salt = base64.b64encode(self._random.randbytes(16)).decode()
+            challenge = base64.b64encode(self._random.randbytes(16)).decode()
+            hello["authentication"] = {"salt": salt, "challenge": challenge}
+        try:
+            await ws.send(json.dumps({"op": OP_HELLO, "d": hello}))
+            identify = json.loads(await ws.recv())
+            if identify.get("op") != OP_IDENTIFY:
+                return
+            if self.password:
+                expected = build_auth_string(self.password, salt, challenge)
+                if identify["d"].get("authentication") != expected:
+                    await ws.close(4009, "Authentication failed.")
+                    return
+            await ws.send(json.dumps({"op": OP_IDENTIFIED, "d": {"negotiatedRpcVersion": 1}}))
+            self._clients[ws] = identify["d"].get("eventSubscriptions", EVENT_SUBSCRIPTION_ALL)
+            async for message in ws:
+                msg = json.loads(message)
+                if msg.get("op") == OP_REIDENTIFY:
+                    self._clients[ws] = msg["d"].get("eventSubscriptions", EVENT_SUBSCRIPTION_ALL)
+                    await self._send(ws, json.dumps({"op": OP_IDENTIFIED, "d": {"negotiatedRpcVersion": 1}}))
+                elif msg.get("op") == OP_REQUEST:
+                    self._spawn(self._answer(ws, msg["d"]))
+                elif msg.get("op") == OP_REQUEST_BATCH:
+                    self._spawn(self._answer_batch(ws, msg["d"]))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self._clients.pop(ws, None)
+
+    async def _delay(self):
+        delay = self.latency
+        if self.jitter:
+            delay += self._random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _execute(self, request_type, data):
+        self.request_counts[request_type] += 1
+        handler = self._handlers.get(request_type)
+        if handler is None:
+            return {
+                "requestType": request_type,
+                "requestStatus": {
+                    "result": False, "code": STATUS_UNKNOWN_REQUEST,
+                    "comment": f"Unknown request type: {request_type}",
+                },
+            }
+        ok, response = handler(data)
+        status = {"result": ok, "code": STATUS_SUCCESS if ok else STATUS_RESOURCE_NOT_FOUND}
+        result = {"requestType": request_type, "requestStatus": status}
+        if response:
+            result["responseData"] = response
+        return result
+
+    async def _answer(self, ws, d):
+        await self._delay()
+        result = self._execute(d["requestType"], d.get("requestData") or {})
+        result["requestId"] = d["requestId"]
+        await self._send(ws, json.dumps({"op": OP_REQUEST_RESPONSE, "d": result}))
+        await self._maybe_disconnect(ws)
+
+    async def _answer_batch(self, ws, d):
+        await self._delay()
+        results = []
+        for req in d.get("requests", []):
+            result = self._execute(req["requestType"], req.get("requestData") or {})
+            results.append(result)
+            if (d.get("haltOnFailure") and not result["requestStatus"]["result"]
+                    and d.get("executionType") != EXECUTION_PARALLEL):
+                break
+        payload = {"requestId": d["requestId"], "results": results}
+        await self._send(ws, json.dumps({"op": OP_REQUEST_BATCH_RESPONSE, "d": payload}))
+        await self._maybe_disconnect(ws)
+
+    async def _maybe_disconnect(self, ws):
+        self._requests_seen += 1
+        if self.disconnect_every and self._requests_seen % self.disconnect_every == 0:
+            await ws.close()
+
+    # -- default request handlers ------------------------------------------
+
+    def _register_defaults(self):
+        ok = lambda response=None: (True, response)
+        self.on("GetVersion", lambda d: ok({"obsWebSocketVersion": "5.0.0-fake", "rpcVersion": 1}))
+        self.on("GetCurrentProgramScene", lambda d: ok({
+            "currentProgramSceneName": self.program_scene,
+            "sceneName": self.program_scene,
+        }))
+        self.on("SetCurrentProgramScene", self._set_scene)
+        self.on("GetSceneList", lambda d: ok({
+            "currentProgramSceneName": self.program_scene,
+            "scenes": [
+                {"sceneName": name, "sceneIndex": i}
+                for i, name in enumerate(reversed(self.scenes))
+            ],
+        }))
+        self.on("GetInputList", lambda d: ok({
+            "inputs": [{"inputName": name} for name in self.inputs]
+        }))
+        self.on("GetInputMute", lambda d: self._with_input(
+            d, lambda i: ok({"inputMuted": i["muted"]})))
+        self.on("SetInputMute", lambda d: self._set_mute(d, d.get("inputMuted")))
+        self.on("ToggleInputMute", lambda d: self._set_mute(d, None))
+        self.on("GetInputVolume", lambda d: self._with_input(
+            d, lambda i: ok({"inputVolumeDb": i["volume_db"]})))
+        self.on("SetInputVolume", self._set_volume)
+        self.on("GetCurrentSceneTransition", lambda d: ok({
+            "transitionName": "Fade", "transitionDuration": self.transition_duration,
+        }))
+        self.on("SetCurrentSceneTransitionDuration", self._set_transition_duration)
+        self.on("GetSceneItemId", self._scene_item_id)
+        self.on("GetSceneItemTransform", lambda d: self._with_scene_item(
+            d, lambda item: ok({"sceneItemTransform": dict(item["transform"])})))
+        self.on("SetSceneItemTransform", self._set_transform)
+        self.on("GetVideoSettings", lambda d: ok({
+            "fpsNumerator": 60, "fpsDenominator": 1,
+            "baseWidth": 1920, "baseHeight": 1080,
+            "outputWidth": 1920, "outputHeight": 1080,
+        }))
+        self.on("GetSourceScreenshot", self._screenshot)
+        self.on("GetSourceFilterList", self._filter_list)
+        self.on("GetSourceFilter", self._get_filter)
+        self.on("SetSourceFilterEnabled", self._set_filter)
+        for output, name in (("record", "Record"), ("stream", "Stream")):
+            self.on(f"Get{name}Status", lambda d, o=output: ok({"outputActive": self.outputs[o]}))
+            self.on(f"Start{name}", lambda d, o=output: self._set_output(o, True))
+            self.on(f"Stop{name}", lambda d, o=output: self._set_output(o, False))
+            self.on(f"Toggle{name}", lambda d, o=output: self._set_output(o, None))
+
+    def _set_scene(self, d):
+        name = d.get("sceneName")
+        if name not in self.scenes:
+            return False, None
+        self.program_scene = name
+        self.emit("CurrentProgramSceneChanged", {"sceneName": name})
+        return True, None
+
+    def _with_input(self, d, func):
+        info = self.inputs.get(d.get("inputName"))
+        if info is None:
+            return False, None
+        return func(info)
+
+    def _set_mute(self, d, muted):
+        def apply(info):
+            info["muted"] = (not info["muted"]) if muted is None else bool(muted)
+            self.emit("InputMuteStateChanged", {
+                "inputName": d.get("inputName"), "inputMuted": info["muted"],
+            })
+            return True, {"inputMuted": info["muted"]} if muted is None else None
+        return self._with_input(d, apply)
+
+    def _set_volume(self, d):
+        def apply(info):
+            info["volume_db"] = float(d.get("inputVolumeDb", info["volume_db"]))
+            self.emit("InputVolumeChanged", {
+                "inputName": d.get("inputName"), "inputVolumeDb": info["volume_db"],
+            })
+            return True, None
+        return self._with_input(d, apply)
+
+    def _set_transition_duration(self, d):
+        self.transition_duration = int(d.get("transitionDuration", self.transition_duration))
+        return True, None
+
+    def _scene_item_id(self, d):
+        item = self.scene_items.get(d.get("sceneName"), {}).get(d.get("sourceName"))
+        if item is None:
+            return False, None
+        return True, {"sceneItemId": item["id"]}
+
+    def _with_scene_item(self, d, func):
+        for item in self.scene_items.get(d.get("sceneName"), {}).values():
+            if item["id"] == d.get("sceneItemId"):
+                return func(item)
+        return False, None
+
+    def _set_transform(self, d):
+        def apply(item):
+            item["transform"].update(d.get("sceneItemTransform") or {})
+            return True, None
+        return self._with_scene_item(d, apply)
+
+    def _filter_list(self, d):
+        source = d.get("sourceName")
+        if source not in self.filters and source not in self.inputs and source not in self.scenes:
+            return False, None
+        filters = self.filters.get(source, {})
+        return True, {"filters": [
+            {"filterName": name, "filterEnabled": enabled, "filterIndex": i}
+            for i, (name, enabled) in enumerate(filters.items())
+        ]}
+
+    def _get_filter(self, d):
+        filters = self.filters.get(d.get("sourceName"), {})
+        if d.get("filterName") not in filters:
+            return False, None
+        return True, {"filterEnabled": filters[d["filterName"]]}
+
+    def _set_filter(self, d):
+        filters = self.filters.get(d.get("sourceName"), {})
+        if d.get("filterName") not in filters:
+            return False, None
+        filters[d["filterName"]] = bool(d.get("filterEnabled"))
+        self.emit("SourceFilterEnableStateChanged", {
+            "sourceName": d["sourceName"], "filterName": d["filterName"],
+            "filterEnabled": filters[d["filterName"]],
+        })
+        return True, None
+
+    def _screenshot(self, d):
+        source = d.get("sourceName")
+        if source not in self.scenes and source not in self.inputs:
+            return False, None
+        if d.get("imageFormat") != "png":
+            return False, None
+        # OBS keeps the 16:9 canvas aspect when only one side is given
+        width = d.get("imageWidth") or round(d.get("imageHeight", 1080) * 16 / 9)
+        height = d.get("imageHeight") or round(width * 9 / 16)
+        rgb = hashlib.sha1(source.encode()).digest()[:3]
+        data = base64.b64encode(solid_png(width, height, rgb)).decode()
+        return True, {"imageData": "data:image/png;base64," + data}
+
+    def _set_output(self, output, active):
+        # Like OBS, refuse to start a running output, stop a stopped one or
+        # touch one that is still starting or stopping
+        if output in self._transitions:
+            return False, None
+        active = (not self.outputs[output]) if active is None else active
+        if active == self.outputs[output]:
+            return False, None
+        event = "RecordStateChanged" if output == "record" else "StreamStateChanged"
+        if not self.output_delay:
+            self._finish_output(output, active, event)
+            return True, {"outputActive": active}
+        self._transitions.add(output)
+        self._broadcast(event, {
+            "outputActive": self.outputs[output],
+            "outputState": "OBS_WEBSOCKET_OUTPUT_STARTING" if active else "OBS_WEBSOCKET_OUTPUT_STOPPING",
+        })
+        self._loop.call_later(self.output_delay, self._finish_output, output, active, event)
+        return True, {"outputActive": active}
+
+    def _finish_output(self, output, active, event):
+        self._transitions.discard(output)
+        self.outputs[output] = active
+        state = "OBS_WEBSOCKET_OUTPUT_STARTED" if active else "OBS_WEBSOCKET_OUTPUT_STOPPED"
+        self.emit(event, {"outputActive": active, "outputState": state})
@@ -0,0 +1,192 @@
+"""Tap, double-tap and long-press on one key.
+
+A key entry can carry a second and third action besides its own:
+
+    {"action": "Scene 1",
+     "double_tap": {"action": "Scene 2"},
+     "long_press": {"action": "Toggle Recording",
+                    "follow_up": {"delay": 5, "action": "Toggle Recording"}},
+     "long_press_ms": 800}
+
+and any action can have a ``follow_up`` that runs ``delay`` seconds after
+it, such as going back to the previous scene. Keys without ``double_tap``
+or ``long_press`` never come here: they still fire on key-down.
+"""
+import threading
+
+GESTURES = ("double_tap", "long_press")
+# Entry fields kept alongside the action's own (see ActionCompiler)
+GESTURE_FIELDS = GESTURES + ("double_tap_ms", "long_press_ms", "follow_up")
+DEFAULT_DOUBLE_TAP_MS = 300
+DEFAULT_LONG_PRESS_MS = 500
+# Follow-up only action: switch back to the scene that was live before
+PREVIOUS_SCENE = "Previous Scene"
+MAX_FOLLOW_UP_S = 24 * 60 * 60
+MAX_GESTURE_MS = 5000
+
+
+class Gestures:
+    """The extra bindings of one key, with its thresholds in seconds
+    (None to use the engine's)."""
+
+    __slots__ = ("double_tap", "long_press", "double_tap_s", "long_press_s")
+
+    def __init__(self, double_tap=None, long_press=None, double_tap_s=None, long_press_s=None):
+        self.double_tap = double_tap
+        self.long_press = long_press
+        self.double_tap_s = double_tap_s
+        self.long_press_s = long_press_s
+
+
+class _KeyState:
+    __slots__ = ("binding", "held", "waiting", "generation", "timer", "dones")
+
+    def __init__(self):
+        self.binding = None
+        self.held = False
+        # Released once, waiting to see if a second press follows
+        self.waiting = False
+        # Bumped by every transition, so a timer that fires late is ignored
+        self.generation = 0
+        self.timer = None
+        self.dones = []
+
+
+class GestureEngine:
+    """Classifies key-down/up into tap, double-tap and long-press.
+
+    ``down`` and ``up`` come from the input threads and only update the
+    key's state and arm or cancel a timer on the ``TimerWheel``; the
+    decision is made on the next input event or when the timer fires, and
+    the chosen binding goes to ``run(binding, done)``.
+
+    - A press held past the long-press threshold runs ``long_press`` while
+      still held; its release does nothing.
+    - A release of a key with ``double_tap`` waits for the double-tap
+      window: a second press inside it runs ``double_tap``, otherwise the
+      tap runs when the window closes.
+    - Otherwise the release runs the key's own action.
+
+    The binding is taken at key-down, so a layer switch mid-gesture does
+    not mix up two keys' actions.
+    """
+
+    def __init__(self, timers, run, double_tap=DEFAULT_DOUBLE_TAP_MS / 1000,
+                 long_press=DEFAULT_LONG_PRESS_MS / 1000):
+        self.timers = timers
+        self.run = run
+        self.double_tap = double_tap
+        self.long_press = long_press
+        self.taps = 0
+        self.double_taps = 0
+        self.long_presses = 0
+        self._keys = {}
+        self._lock = threading.Lock()
+
+    def down(self, index, binding, done=None):
+        """Key ``index`` went down with ``binding`` (which has gestures)."""
+        fire = None
+        with self._lock:
+            state = self._keys.get(index)
+            if state is None:
+                state = self._keys[index] = _KeyState()
+            self._cancel_timer(state)
+            if state.waiting and state.binding is binding:
+                # Second press inside the window
+                state.waiting = False
+                self.double_taps += 1
+                if done is not None:
+                    state.dones.append(done)
+                fire = self._take(state, binding.gestures.double_tap)
+            else:
+                if state.waiting or state.held:
+                    # A different binding (layer switch) or a lost release:
+                    # settle what was pending as a tap first
+                    self.taps += 1
+                    fire = self._take(state, state.binding)
+                if done is not None:
+                    state.dones.append(done)
+                state.binding = binding
+                state.held = True
+                state.waiting = False
+                gestures = binding.gestures
+                if gestures.long_press is not None:
+                    state.timer = self.timers.schedule(
+                        gestures.long_press_s or self.long_press,
+                        self._timeout_callback(state),
+                    )
+        if fire is not None:
+            self._fire(*fire)
+
+    def up(self, index):
+        """Key ``index`` was released; ignored for keys without gestures."""
+        state = self._keys.get(index)
+        if state is None or not state.held:
+            return
+        fire = None
+        with self._lock:
+            if not state.held:
+                return
+            state.held = False
+            self._cancel_timer(state)
+            gestures = state.binding.gestures
+            if gestures.double_tap is not None:
+                state.waiting = True
+                state.timer = self.timers.schedule(
+                    gestures.double_tap_s or self.double_tap,
+                    self._timeout_callback(state),
+                )
+            else:
+                self.taps += 1
+                fire = self._take(state, state.binding)
+        if fire is not None:
+            self._fire(*fire)
+
+    def _timeout_callback(self, state):
+        generation = state.generation
+        return lambda: self._on_timeout(state, generation)
+
+    def _on_timeout(self, state, generation):
+        """Long-press threshold reached, or the double-tap window closed."""
+        with self._lock:
+            if state.generation != generation:
+                return
+            state.timer = None
+            if state.held:
+                # Still down: a long press; the release is then ignored
+                state.held = False
+                self.long_presses += 1
+                fire = self._take(state, state.binding.gestures.long_press)
+            elif state.waiting:
+                state.waiting = False
+                self.taps += 1
+                fire = self._take(state, state.binding)
+            else:
+                return
+        self._fire(*fire)
+
+    def _cancel_timer(self, state):
+        state.generation += 1
+        if state.timer is not None:
+            state.timer.cancel()
+            state.timer = None
+
+    @staticmethod
+    def _take(state, binding):
+        dones, state.dones = state.dones, []
+        return binding, dones
+
+    def _fire(self, binding, dones):
+        done = None
+        if dones:
+            def done(error):
+                for callback in dones:
+                    callback(error)
+        self.run(binding, done)
+
+    def stats(self):
+        return {
+            "taps": self.taps,
+            "double_taps": self.double_taps,
+            "long_presses": self.long_presses,
+        }
@@ -1,90 +1,51 @@
-import tkinter as tk
-from tkinter import ttk, messagebox
-from obs_client import OBSClient
-import os
-import keyboard
-import subprocess
-import pystray
-from PIL import Image, ImageDraw
-import json
 import time
 
-class KeyButton(tk.Canvas):
-    def __init__(self, master, label):
-        width, height = 80, 60
-        super().__init__(master, width=width, height=height, highlightthickness=0, bd=0, bg="#121212")
-        self.label = label
-        self.action_name = None
-        self.action = None
-        self.meta = None
-
-        self.radius = 12
-        self.bg_color = "#1e1e1e"
-        self.hover_color = "#333333"
-        self.text_color = "white"
-
-        self.rect = self._rounded_rect(2, 2, width-2, height-2, self.radius, fill=self.bg_color, outline=self.bg_color)
-        self.text_item = self.create_text(width/2, height/2, text=label, fill=self.text_color)
-
-        self.bind("<ButtonRelease-1>", lambda e: self.trigger())
-        self.bind("<Enter>", lambda e: self.itemconfig(self.rect, fill=self.hover_color))
-        self.bind("<Leave>", lambda e: self.itemconfig(self.rect, fill=self.bg_color))
-
-    def _rounded_rect(self, x1, y1, x2, y2, r=25, **kwargs):
-        points = [
-            x1+r, y1,
-            x2-r, y1,
-            x2, y1,
-            x2, y1+r,
-            x2, y2-r,
-            x2, y2,
-            x2-r, y2,
-            x1+r, y2,
-            x1, y2,
-            x1, y2-r,
-            x1, y1+r,
-            x1, y1
-        ]
-        return self.create_polygon(points, smooth=True, **kwargs)
-
-    def assign(self, action_name, action_func, meta=None):
-        self.action_name = action_name
-        self.action = action_func
-        self.meta = meta
-        self.itemconfig(self.text_item, text=f"{self.label}\n{action_name}")
-
-    def trigger(self):
-        if callable(self.action):
-            self.action()
-        elif isinstance(self.action, str) and self.action:
-            try:
-                subprocess.Popen(self.action, shell=True)
-            except Exception as e:
-                print(f"Failed to run command '{self.action}': {e}")
-        else:
-            print(f"No action assigned to {self.label}")
+# Reference point for the startup timings reported by KeyboardGUI
+_STARTUP_T0 = time.perf_counter()
 
+import tkinter as tk
+from tkinter import ttk, messagebox, simpledialog
+from controller import Controller
+from actions import ACTION_FIELDS, LOCAL_ACTIONS
+from gestures import GESTURE_FIELDS
+from obs_targets import BROADCAST
+from encoders import ENCODER_ACTIONS, TRANSFORM_PROPERTIES
+from connection_supervisor import STATE_CONNECTED
+from macros import EXECUTION_MODES, parse_macro
+from config_store import DEFAULT_LAYER
+from hotkeys import ENCODER_COUNT, PRESS_CONTROLS
+from key_grid import KeyGrid, KEY_WIDTH
+from thumbnails import ThumbnailCache, ThumbnailFetcher, thumbnail_source
+from metrics import metrics, STAGE_TOTAL
+from event_log import setup_logging, shutdown_logging
+import logging
+import os
+import queue
+import threading
 
-class DoubleClickIcon(pystray.Icon):
-    """System tray icon that triggers a callback on double click."""
+log = logging.getLogger(__name__)
 
-    def __init__(self, *args, on_double_click=None, **kwargs):
-        self._on_double_click = on_double_click
-        super().__init__(*args, **kwargs)
-        self._last_click = 0
+# Target picker choice that sends an action to every OBS
+ALL_TARGETS = "All targets"
+# Lines kept in the log panel; older ones stay in the log file
+LOG_PANEL_LINES = 200
+LOG_COLORS = {"WARNING": "#ffb74d", "ERROR": "#e57373", "CRITICAL": "#e57373", "DEBUG": "#666666"}
 
-    def __call__(self):
-        now = time.time()
-        if now - self._last_click < 0.5:
-            if callable(self._on_double_click):
-                self._on_double_click()
-        self._last_click = now
 
 class KeyboardGUI(tk.Tk):
     def __init__(self):
+        # Startup runs in stages: the window and key grid are built first,
+        # OBS and hotkeys come up in the background once it is on screen
+        self.startup_timings = {}
+        self._startup_last = _STARTUP_T0
+        self.mark_startup("imports")
+        # Everything is logged through a queue; the panel below reads the
+        # newest entries from its ring buffer
+        self.event_log = setup_logging()
+
         super().__init__()
         self.title("QMK Keyboard Controller")
-        self.geometry("700x400")
+        self.geometry("700x480")
         self.resizable(False, False)
         self.configure(bg="#121212")
 
@@ -120,31 +81,62 @@ class KeyboardGUI(tk.Tk):
             btn.bind("<Enter>", lambda e, b=btn: b.configure(bg="#333333"))
             btn.bind("<Leave>", lambda e, b=btn: b.configure(bg="#1e1e1e"))
 
+        self.status_var = tk.StringVar(value="OBS: disconnected")
+        self.status_label = tk.Label(
+            self.title_bar, textvariable=self.status_var,
+            fg="#888888", bg="#1e1e1e"
+        )
+        self.status_label.pack(side=tk.LEFT, padx=8)
+
+        self.layer_var = tk.StringVar(value=DEFAULT_LAYER)
+        self.layer_box = ttk.Combobox(
+            self.title_bar, textvariable=self.layer_var, width=10, state="readonly"
+        )
+        self.layer_box.bind("<<ComboboxSelected>>", lambda e: self.controller.switch_layer(self.layer_var.get()))
+        tk.Button(
+            self.title_bar, text="+", command=self.new_layer, **btn_cfg
+        ).pack(side=tk.RIGHT, padx=2, pady=2)
+        self.layer_box.pack(side=tk.RIGHT, padx=2)
+        tk.Label(self.title_bar, text="Layer", fg="#888888", bg="#1e1e1e").pack(side=tk.RIGHT)
+
         self.title_bar.bind("<ButtonPress-1>", self.start_move)
         self.title_bar.bind("<B1-Motion>", self.do_move)
 
-        self.config_file = "keyboard_config.json"
+        # OBS, the action queue, layers, config and input live in the
+        # controller, which the headless daemon shares
+        self.controller = Controller("keyboard_config.json")
+        self.controller.add_listener(self.on_controller_event)
+        # Keys changed by controller events since the Tk thread last looked
+        self._changed_keys = set()
+        self._changed_lock = threading.Lock()
+        self.config_file = self.controller.config_file
+        self.executor = self.controller.executor
+        self.obs = self.controller.obs
+        self.obs_state = self.controller.obs_state
+        self.inventory = self.controller.inventory
+        self.supervisor = self.controller.supervisor
+        self.launcher = self.controller.launcher
+        self.coalescer = self.controller.coalescer
+        self.hotkeys = self.controller.hotkeys
         self.programs = {
             "Firefox": "firefox",
             "Calculator": "calc" if os.name == "nt" else "gnome-calculator",
             "Notepad": "notepad" if os.name == "nt" else "gedit",
         }
 
+        # Callbacks from worker threads are handed to the Tk loop through here
+        self._ui_calls = queue.SimpleQueue()
+        self.after(20, self._drain_ui_calls)
+
         self.protocol("WM_DELETE_WINDOW", self.on_exit)
         self.bind("<Unmap>", self.on_minimize)
 
-        self.tray_icon = self.create_tray_icon()
+        # Built on first hide so pystray/PIL are not imported at startup
+        self.tray_icon = None
 
-        # Initialize OBS client but don't require connection on startup
-        self.obs = OBSClient(
-            host=os.getenv("OBS_HOST", "localhost"),
-            port=int(os.getenv("OBS_PORT", 4455)),
-            password=os.getenv("OBS_PASSWORD", "your_password")
-        )
-        try:
-            self.obs.connect()
-        except Exception as e:
-            print(f"OBS connection error: {e}. Will retry when actions are used.")
+        self.update_connection_status()
+
+        self.mark_startup("window")
 
         content = tk.Frame(self, bg="#121212")
         content.pack(fill=tk.BOTH, expand=True)
@@ -153,46 +145,64 @@ class KeyboardGUI(tk.Tk):
         self.keyboard_frame = tk.Frame(content, bg="#121212")
         self.keyboard_frame.pack(side=tk.LEFT, padx=10)
 
-        self.keys = []
-        self.encoders = []
-        # Encoders on a dedicated top row
-        for i in range(3):
-            btn = KeyButton(self.keyboard_frame, f"Enc {i+1}")
-            btn.grid(row=0, column=i+1, padx=5, pady=5)
-            btn.bind('<Button-1>', lambda e, b=btn: self.select_key(b))
-            self.encoders.append(btn)
-            self.keys.append(btn)
-
-        # 15 keys in three rows below the encoders
-        index = 1
-        for r in range(1, 4):
-            for c in range(5):
-                btn = KeyButton(self.keyboard_frame, f"Key {index}")
-                btn.grid(row=r, column=c, padx=5, pady=5)
-                btn.bind('<Button-1>', lambda e, b=btn: self.select_key(b))
-                self.keys.append(btn)
-                index += 1
+        # Encoders on a top row, 15 keys in three rows below, all drawn on
+        # one canvas that repaints changed keys at most once per frame
+        self.key_grid = KeyGrid(
+            self.keyboard_frame, self.controller.press, self.controller.rotate,
+            select=self.select_key, release=self.controller.release,
+        )
+        self.key_grid.pack(padx=5, pady=5)
+
+        self.log_text = tk.Text(
+            self.keyboard_frame, height=6, width=1, font=("TkFixedFont", 8),
+            bg="#1e1e1e", fg="#cccccc", relief=tk.FLAT, wrap=tk.NONE,
+        )
+        for level, color in LOG_COLORS.items():
+            self.log_text.tag_configure(level, foreground=color)
+        self.log_text.configure(state=tk.DISABLED)
+        self.log_text.pack(fill=tk.X, padx=5, pady=(0, 5))
+        self._log_seq = 0
+
+        # Optional scene/source previews on the keys, refreshed every
+        # KEYBOARD_THUMBNAILS seconds while the window is visible
+        self.thumbnails = None
+        self._photos = {}
+        self._thumbnail_sources = [None] * len(PRESS_CONTROLS)
+        interval = float(os.getenv("KEYBOARD_THUMBNAILS", 0))
+        if interval > 0:
+            cache = ThumbnailCache(
+                int(float(os.getenv("KEYBOARD_THUMBNAIL_CACHE_MB", 8)) * 1024 * 1024)
+            )
+            self.thumbnails = ThumbnailFetcher(
+                self.obs, cache,
+                lambda source: self.call_soon(lambda: self._show_thumbnail(source)),
+                interval=interval, width=KEY_WIDTH - 4,
+            )
+
+        # Optional level meters on mic and volume keys, redrawn
+        # KEYBOARD_METERS times a second
+        self.meters = None
+        self._meter_inputs = [None] * len(PRESS_CONTROLS)
+        self._meter_job = None
+        self._shown_levels = None
+        rate = float(os.getenv("KEYBOARD_METERS", 0))
+        if rate > 0:
+            # Imported here so NumPy is only needed when meters are on
+            from volume_meters import VolumeMeters
+            self.meters = VolumeMeters(self.obs)
+            self._meter_interval_ms = max(1, round(1000 / rate))
+
+        self.mark_startup("keys")
 
         # Sidebar for actions
         sidebar = tk.Frame(content, bg="#121212")
         sidebar.pack(side=tk.RIGHT, fill=tk.Y, padx=10)
         tk.Label(sidebar, text="Action", fg="white", bg="#121212").pack(pady=5)
 
-        actions = {
-            "Toggle Stream": self.obs.toggle_streaming,
-            "Toggle Recording": self.obs.toggle_recording,
-            "Toggle Mic": self.obs.toggle_mic,
-            "Scene 1": lambda: self.obs.set_scene("Scene 1"),
-            "Scene 2": lambda: self.obs.set_scene("Scene 2"),
-            "Toggle Filter": None,
-            "Run Program": None,
-        }
-        self.actions = actions
-
         self.action_var = tk.StringVar()
         self.action_box = ttk.Combobox(
             sidebar, textvariable=self.action_var,
-            values=list(actions.keys()), state="readonly"
+            values=list(self.controller.compiler.builtins) + list(ACTION_FIELDS), state="readonly"
         )
         self.action_box.pack(pady=5)
         self.action_var.trace_add("write", self.update_action_ui)
@@ -210,6 +220,46 @@ class KeyboardGUI(tk.Tk):
             bg="#1e1e1e", fg="white", insertbackground="white"
         )
 
+        self.launch_options_label = tk.Label(sidebar, text="Options", fg="white", bg="#121212")
+        self.launch_options = tk.Frame(sidebar, bg="#121212")
+        self.shell_var = tk.BooleanVar(value=False)
+        self.single_instance_var = tk.BooleanVar(value=False)
+        for text, var in (("Use shell", self.shell_var), ("Single instance", self.single_instance_var)):
+            tk.Checkbutton(
+                self.launch_options, text=text, variable=var,
+                fg="white", bg="#121212", selectcolor="#1e1e1e",
+                activebackground="#121212", activeforeground="white"
+            ).pack(anchor=tk.W)
+
+        self.input_label = tk.Label(sidebar, text="Input", fg="white", bg="#121212")
+        self.input_var = tk.StringVar()
+        self.input_box = ttk.Combobox(sidebar, textvariable=self.input_var, state="readonly")
+
+        self.scene_label = tk.Label(sidebar, text="Scene", fg="white", bg="#121212")
+        self.scene_var = tk.StringVar()
+        self.scene_box = ttk.Combobox(sidebar, textvariable=self.scene_var, state="readonly")
+
+        self.item_label = tk.Label(sidebar, text="Scene item source", fg="white", bg="#121212")
+        self.item_var = tk.StringVar()
+        self.item_entry = tk.Entry(
+            sidebar, textvariable=self.item_var,
+            bg="#1e1e1e", fg="white", insertbackground="white"
+        )
+
+        self.property_label = tk.Label(sidebar, text="Property", fg="white", bg="#121212")
+        self.property_var = tk.StringVar(value="positionX")
+        self.property_box = ttk.Combobox(
+            sidebar, textvariable=self.property_var,
+            values=list(TRANSFORM_PROPERTIES), state="readonly"
+        )
+
+        self.step_label = tk.Label(sidebar, text="Step per tick (blank for default)", fg="white", bg="#121212")
+        self.step_var = tk.StringVar()
+        self.step_entry = tk.Entry(
+            sidebar, textvariable=self.step_var,
+            bg="#1e1e1e", fg="white", insertbackground="white"
+        )
+
         self.source_label = tk.Label(sidebar, text="Source", fg="white", bg="#121212")
         self.source_var = tk.StringVar()
         self.source_box = ttk.Combobox(sidebar, textvariable=self.source_var, state="readonly")
@@ -219,110 +269,518 @@ class KeyboardGUI(tk.Tk):
         self.filter_var = tk.StringVar()
         self.filter_box = ttk.Combobox(sidebar, textvariable=self.filter_var, state="readonly")
 
-        # Initially hide program and command widgets until an action is chosen
-        self.program_label.pack_forget()
-        self.program_box.pack_forget()
-        self.command_label.pack_forget()
-        self.command_entry.pack_forget()
-        self.source_label.pack_forget()
-        self.source_box.pack_forget()
-        self.filter_label.pack_forget()
-        self.filter_box.pack_forget()
+        self.macro_label = tk.Label(
+            sidebar, text="Steps (RequestType {json})", fg="white", bg="#121212"
+        )
+        self.macro_text = tk.Text(
+            sidebar, width=30, height=5,
+            bg="#1e1e1e", fg="white", insertbackground="white"
+        )
+        self.execution_label = tk.Label(sidebar, text="Execution", fg="white", bg="#121212")
+        self.execution_var = tk.StringVar(value="serial")
+        self.execution_box = ttk.Combobox(
+            sidebar, textvariable=self.execution_var,
+            values=list(EXECUTION_MODES.keys()), state="readonly"
+        )
 
-        assign_btn = tk.Button(sidebar, text="Assign", command=self.assign_action, bg="#1e1e1e", fg="white", relief=tk.FLAT, activebackground="#333333")
-        assign_btn.pack(pady=5)
+        self.target_layer_label = tk.Label(sidebar, text="Layer", fg="white", bg="#121212")
+        self.target_layer_var = tk.StringVar()
+        self.target_layer_box = ttk.Combobox(
+            sidebar, textvariable=self.target_layer_var, state="readonly"
+        )
 
-        self.selected_key = None
+        # Only shown when OBS_TARGETS names more than one OBS
+        self.obs_target_label = tk.Label(sidebar, text="OBS", fg="white", bg="#121212")
+        self.obs_target_var = tk.StringVar(value=self.controller.targets.primary.name)
+        self.obs_target_box = ttk.Combobox(
+            sidebar, textvariable=self.obs_target_var,
+            values=self.controller.targets.names() + [ALL_TARGETS], state="readonly"
+        )
 
-        self.load_config()
+        # Extra input widgets shown for each action, as (label, widget) pairs
+        self.option_widgets = {
+            "Run Program": [
+                (self.program_label, self.program_box),
+                (self.command_label, self.command_entry),
+                (self.launch_options_label, self.launch_options),
+            ],
+            "Toggle Filter": [
+                (self.source_label, self.source_box),
+                (self.filter_label, self.filter_box),
+            ],
+            "Macro": [
+                (self.macro_label, self.macro_text),
+                (self.execution_label, self.execution_box),
+            ],
+            "Switch Layer": [
+                (self.target_layer_label, self.target_layer_box),
+            ],
+            "Volume": [
+                (self.input_label, self.input_box),
+                (self.step_label, self.step_entry),
+            ],
+            "Transition Duration": [
+                (self.step_label, self.step_entry),
+            ],
+            "Nudge Transform": [
+                (self.scene_label, self.scene_box),
+                (self.item_label, self.item_entry),
+                (self.property_label, self.property_box),
+                (self.step_label, self.step_entry),
+            ],
+        }
 
-        # Register global hotkeys for each button
-        self.setup_hotkeys()
+        assign_btn = tk.Button(sidebar, text="Assign", command=self.assign_action, bg="#1e1e1e", fg="white", relief=tk.FLAT, activebackground="#333333")
+        assign_btn.pack(pady=5)
 
-    def select_key(self, key_btn):
-        self.selected_key = key_btn
-        print(f"Selected {key_btn.label}")
+        self.queue_stats_var = tk.StringVar()
+        tk.Label(
+            sidebar, textvariable=self.queue_stats_var,
+            fg="#888888", bg="#121212", justify=tk.LEFT
+        ).pack(side=tk.BOTTOM, pady=5)
+        self.update_queue_stats()
+
+        # Latency stats panel; only populated when KEYBOARD_METRICS=1
+        self.metrics_var = tk.StringVar(value="Metrics off (KEYBOARD_METRICS=1)")
+        if metrics.enabled:
+            tk.Button(
+                sidebar, text="Dump Stats", command=self.dump_metrics,
+                bg="#1e1e1e", fg="white", relief=tk.FLAT, activebackground="#333333"
+            ).pack(side=tk.BOTTOM, pady=2)
+        tk.Label(
+            sidebar, textvariable=self.metrics_var, font=("TkFixedFont", 8),
+            fg="#888888", bg="#121212", justify=tk.LEFT
+        ).pack(side=tk.BOTTOM, pady=5)
+        if metrics.enabled:
+            self.update_metrics_panel()
+        self.update_log_panel()
+
+        self.selected_key = None
+        self.mark_startup("sidebar")
+
+        self.controller.load_config()
+        self.show_layer()
+        self.mark_startup("config")
+
+        # Runs once the first frame has been drawn
+        self.after_idle(self.start_background_services)
+
+    def mark_startup(self, phase):
+        """Record how long the startup phase that just finished took."""
+        now = time.perf_counter()
+        self.startup_timings[phase] = (now - self._startup_last) * 1000
+        self._startup_last = now
+
+    def start_background_services(self):
+        """Connect to OBS and register hotkeys without holding up the window."""
+        self.mark_startup("first_paint")
+        total = (self._startup_last - _STARTUP_T0) * 1000
+        phases = ", ".join(f"{k} {v:.0f} ms" for k, v in self.startup_timings.items())
+        log.info("🚀 Window ready in %.0f ms (%s)", total, phases)
+
+        # Tracked filters are known now, so the first resync covers them
+        connect_started = time.perf_counter()
+
+        def on_first_connect(state, info):
+            if state == STATE_CONNECTED and "obs_connect" not in self.startup_timings:
+                elapsed = (time.perf_counter() - connect_started) * 1000
+                self.startup_timings["obs_connect"] = elapsed
+                log.info("🚀 OBS connected %.0f ms after the window appeared", elapsed)
+
+        self.supervisor.add_listener(on_first_connect)
+        self.controller.start()
+        if self.thumbnails is not None:
+            self.thumbnails.start()
+        self._start_meters()
+
+    def select_key(self, index):
+        self.selected_key = index
+        log.debug("Selected %s", PRESS_CONTROLS[index])
 
     def assign_action(self):
-        if not self.selected_key:
+        if self.selected_key is None:
             return
         action_name = self.action_var.get()
         if not action_name:
             return
+        entry = {"action": action_name}
+        if action_name in ENCODER_ACTIONS and self.selected_key >= ENCODER_COUNT:
+            messagebox.showwarning("Not an Encoder", f"{action_name} can only be assigned to an encoder.")
+            return
+        if action_name in ENCODER_ACTIONS and self.step_var.get().strip():
+            try:
+                step = float(self.step_var.get())
+            except ValueError:
+                step = 0
+            if not step:
+                messagebox.showwarning("Invalid Step", "The step must be a non-zero number.")
+                return
+            entry["step"] = step
         if action_name == "Run Program":
-            cmd_text = self.command_var.get().strip()
-            if cmd_text:
-                self.selected_key.assign(action_name, cmd_text)
-            else:
-                program_label = self.program_var.get().strip()
-                cmd = self.programs.get(program_label)
-                if cmd:
-                    self.selected_key.assign(action_name, cmd)
-                else:
-                    messagebox.showwarning(
-                        "No Program",
-                        "Please choose a program or enter a command to run."
-                    )
+            cmd = self.command_var.get().strip() or self.programs.get(self.program_var.get().strip())
+            if not cmd:
+                messagebox.showwarning(
+                    "No Program",
+                    "Please choose a program or enter a command to run."
+                )
+                return
+            entry["command"] = cmd
+            # Only stored when set, so plain commands keep the old format
+            if self.shell_var.get():
+                entry["shell"] = True
+            if self.single_instance_var.get():
+                entry["single_instance"] = True
         elif action_name == "Toggle Filter":
             source = self.source_var.get().strip()
             flt = self.filter_var.get().strip()
-            if source and flt:
-                func = lambda s=source, f=flt: self.obs.toggle_filter(s, f)
-                self.selected_key.assign(action_name, func, {"source": source, "filter": flt})
-            else:
+            if not (source and flt):
                 messagebox.showwarning(
                     "Missing Info",
                     "Please select both a source and filter."
                 )
                 return
+            entry.update(source=source, filter=flt)
+        elif action_name == "Macro":
+            try:
+                steps = parse_macro(self.macro_text.get("1.0", tk.END))
+            except ValueError as e:
+                messagebox.showwarning("Invalid Macro", str(e))
+                return
+            if not steps:
+                messagebox.showwarning("Empty Macro", "Please enter at least one step.")
+                return
+            entry.update(steps=steps, execution=self.execution_var.get() or "serial")
+        elif action_name == "Switch Layer":
+            layer = self.target_layer_var.get()
+            if layer not in self.controller.layers:
+                messagebox.showwarning("No Layer", "Please choose a layer to switch to.")
+                return
+            entry["layer"] = layer
+        elif action_name == "Volume":
+            if not self.input_var.get():
+                messagebox.showwarning("Missing Info", "Please select an input.")
+                return
+            entry["input"] = self.input_var.get()
+        elif action_name == "Nudge Transform":
+            scene, source = self.scene_var.get(), self.item_var.get().strip()
+            if not (scene and source):
+                messagebox.showwarning("Missing Info", "Please select a scene and enter a source.")
+                return
+            entry.update(scene=scene, source=source, property=self.property_var.get())
+        if len(self.controller.targets) > 1 and action_name not in LOCAL_ACTIONS:
+            target = self.obs_target_var.get()
+            if target == ALL_TARGETS:
+                if action_name in ENCODER_ACTIONS:
+                    messagebox.showwarning("One OBS Only", "Encoders can only adjust one OBS at a time.")
+                    return
+                entry["target"] = BROADCAST
+            elif target != self.controller.targets.primary.name:
+                # The primary is the default, so it is not stored
+                entry["target"] = target
+        # Gestures and follow-ups are set in the config file; keep them
+        current = self.controller.layers[self.controller.active_layer][self.selected_key]
+        entry.update((field, current[field]) for field in GESTURE_FIELDS if field in current)
+
+        self.controller.assign(self.selected_key, entry)
+
+    def refresh_layer_lists(self):
+        layers = list(self.controller.layers)
+        self.layer_box["values"] = layers
+        self.target_layer_box["values"] = layers
+        self.layer_var.set(self.controller.active_layer)
+
+    def new_layer(self):
+        name = simpledialog.askstring("New Layer", "Layer name:", parent=self)
+        name = (name or "").strip()
+        if not name:
+            return
+        if name in self.controller.layers:
+            messagebox.showwarning("Layer Exists", f"There is already a layer named '{name}'.")
+            return
+        self.controller.add_layer(name)
+        self.controller.switch_layer(name)
+
+    def show_layer(self):
+        """Repaint the keys with the active layer's bindings."""
+        self.refresh_layer_lists()
+        for index, binding in enumerate(self.controller.dispatch_table):
+            self.key_grid.set_binding(index, binding)
+            self.key_grid.set_active(index, self.controller.key_active(index))
+        self._update_thumbnails(range(len(PRESS_CONTROLS)))
+        self._update_meter_inputs(range(len(PRESS_CONTROLS)))
+
+    def on_controller_event(self, event, *args):
+        """Controller listener; runs on whichever thread made the change.
+
+        A burst of OBS events touching the same keys is handed to the Tk
+        thread as a single call.
+        """
+        if event == "key":
+            with self._changed_lock:
+                first = not self._changed_keys
+                self._changed_keys.add(args[0])
+            if first:
+                self.call_soon(self._show_changed_keys)
+        elif event == "layers":
+            self.call_soon(self.show_layer)
+
+    def _show_changed_keys(self):
+        with self._changed_lock:
+            changed, self._changed_keys = self._changed_keys, set()
+        for index in changed:
+            self.key_grid.set_binding(index, self.controller.dispatch_table[index])
+            self.key_grid.set_active(index, self.controller.key_active(index))
+        self._update_thumbnails(changed)
+        self._update_meter_inputs(changed)
+
+    def _update_thumbnails(self, indices):
+        """Point the keys at the previews for their current bindings."""
+        if self.thumbnails is None:
+            return
+        for index in indices:
+            source = thumbnail_source(self.controller.dispatch_table[index])
+            self._thumbnail_sources[index] = source
+            self.key_grid.set_image(index, self._photo_for(source) if source else None)
+        wanted = set(self._thumbnail_sources)
+        for source in [s for s in self._photos if s not in wanted]:
+            del self._photos[source]
+        self.thumbnails.set_sources(wanted)
+
+    def _photo_for(self, source):
+        photo = self._photos.get(source)
+        if photo is None:
+            data = self.thumbnails.cache.get(source)
+            if data is not None:
+                photo = self._photos[source] = tk.PhotoImage(data=data)
+        return photo
+
+    def _show_thumbnail(self, source):
+        """Show a freshly fetched preview on every key using it."""
+        if source not in self._thumbnail_sources:
+            return
+        data = self.thumbnails.cache.get(source)
+        if data is None:
+            return
+        photo = self._photos[source] = tk.PhotoImage(data=data)
+        for index, shown in enumerate(self._thumbnail_sources):
+            if shown == source:
+                self.key_grid.set_image(index, photo)
+
+    def _update_meter_inputs(self, indices):
+        """Note which input each key's meter follows; None removes the meter."""
+        if self.meters is None:
+            return
+        from volume_meters import meter_input
+        for index in indices:
+            name = meter_input(self.controller.dispatch_table[index])
+            self._meter_inputs[index] = name
+            if name is None:
+                self.key_grid.set_meter(index, None)
+        # Redraw every meter on the next tick
+        self._shown_levels = None
+
+    def _start_meters(self):
+        if self.meters is None or self._meter_job is not None:
+            return
+        self.meters.start()
+        self._meter_job = self.after(self._meter_interval_ms, self._update_meters)
+
+    def _stop_meters(self):
+        if self._meter_job is not None:
+            self.after_cancel(self._meter_job)
+            self._meter_job = None
+        if self.meters is not None:
+            # OBS stops sending the levels altogether
+            self.meters.stop()
+
+    def _update_meters(self):
+        levels = self.meters.levels()
+        if levels is not self._shown_levels:
+            for index, name in enumerate(self._meter_inputs):
+                if name is not None:
+                    self.key_grid.set_meter(index, levels.get(name))
+            self._shown_levels = levels
+        self._meter_job = self.after(self._meter_interval_ms, self._update_meters)
+
+    def call_soon(self, func):
+        """Run ``func`` on the Tk thread; safe to call from any thread."""
+        self._ui_calls.put(func)
+
+    def _drain_ui_calls(self):
+        while True:
+            try:
+                func = self._ui_calls.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                func()
+            except Exception as e:
+                log.error("UI callback failed: %s", e)
+        self.after(20, self._drain_ui_calls)
+
+    def update_queue_stats(self):
+        """Refresh the action queue depth and wait time shown in the sidebar."""
+        stats = self.executor.stats()
+        cache = self.inventory.stats()
+        launches = self.launcher.stats()
+        text = (
+            f"Queue: {stats['queue_depth']}  Dropped: {stats['dropped']}\n"
+            f"Wait: {stats['last_wait_ms']:.1f} ms (max {stats['max_wait_ms']:.1f})\n"
+            f"Cache: {cache['hits']} hits / {cache['misses']} misses"
+        )
+        if self.controller.hid is not None:
+            hid = self.controller.hid.stats()
+            text += f"\nHID: {hid['reports']} reports, {hid['avg_us']:.1f} µs each"
+        hook = self.hotkeys.stats()
+        if hook["events"]:
+            text += f"\nHook: {hook['avg_us']:.1f} µs/event (max {hook['max_us']:.0f})"
+        if self.thumbnails is not None:
+            thumbs = self.thumbnails.stats()
+            text += (
+                f"\nThumbs: {thumbs['entries']} cached, {thumbs['bytes'] // 1024} kB, "
+                f"{thumbs['avg_fetch_ms']:.0f} ms/fetch{' (paused)' if thumbs['paused'] else ''}"
+            )
+        if self.meters is not None:
+            meters = self.meters.stats()
+            text += (
+                f"\nMeters: {meters['inputs']} inputs, {meters['messages']} updates, "
+                f"{meters['avg_frame_ms']:.2f} ms/frame"
+            )
+        grid = self.key_grid.stats()
+        if grid["frames"]:
+            text += f"\nRedraw: {grid['avg_frame_ms']:.2f} ms/frame (max {grid['max_frame_ms']:.1f})"
+        gestures = self.controller.gestures.stats()
+        if gestures["double_taps"] or gestures["long_presses"]:
+            timers = self.controller.timers.stats()
+            text += (
+                f"\nGestures: {gestures['double_taps']} double, {gestures['long_presses']} long, "
+                f"timers {timers['p99_late_ms']:.1f} ms late (p99)"
+            )
+        toggles = self.controller.toggles.stats()
+        if toggles["presses"]:
+            text += f"\nToggles: {toggles['presses']} presses, {toggles['requests']} requests"
+        encoders = self.coalescer.stats()
+        if encoders["ticks"]:
+            text += f"\nEncoders: {encoders['ticks']} ticks, {encoders['flushes']} requests"
+        if len(self.controller.targets) > 1:
+            for name, target in self.controller.targets.stats().items():
+                text += (
+                    f"\n{name}: {target['state']}, {target['avg_ms']:.0f} ms avg, "
+                    f"{target['failures']} failed ({target['timeouts']} timed out)"
+                )
+        if launches["last_latency_ms"] is not None:
+            text += (
+                f"\nLaunch: {launches['last_latency_ms']:.1f} ms, "
+                f"{launches['running']} running"
+            )
+        self.queue_stats_var.set(text)
+        self.after(500, self.update_queue_stats)
+
+    def update_metrics_panel(self):
+        """Show press-to-ack percentiles per action in the sidebar."""
+        snapshot = metrics.snapshot()
+        lines = ["action        p50/p95/p99 ms"]
+        for action, stages in snapshot["actions"].items():
+            total = stages.get(STAGE_TOTAL)
+            if not total:
+                continue
+            lines.append(
+                f"{action[:13]:<13} {total['p50_ms']:.0f}/{total['p95_ms']:.0f}/{total['p99_ms']:.0f}"
+            )
+        errors = sum(snapshot["errors"].values())
+        reconnects = snapshot["counters"].get("reconnects", 0)
+        lines.append(f"errors {errors}  reconnects {reconnects}")
+        self.metrics_var.set("\n".join(lines))
+        self.after(1000, self.update_metrics_panel)
+
+    def update_log_panel(self):
+        """Append the entries logged since the last refresh to the log panel."""
+        # Nothing to show while hidden; the ring buffer keeps the newest
+        if self.state() != "withdrawn":
+            entries = self.event_log.ring.since(self._log_seq)
+            if entries:
+                self._log_seq = entries[-1]["seq"]
+                self.log_text.configure(state=tk.NORMAL)
+                for entry in entries[-LOG_PANEL_LINES:]:
+                    stamp = time.strftime("%H:%M:%S", time.localtime(entry["time"]))
+                    self.log_text.insert(tk.END, f"{stamp} {entry['message']}\n", entry["level"])
+                lines = int(self.log_text.index("end-1c").split(".")[0]) - 1
+                if lines > LOG_PANEL_LINES:
+                    self.log_text.delete("1.0", f"{lines - LOG_PANEL_LINES + 1}.0")
+                self.log_text.see(tk.END)
+                self.log_text.configure(state=tk.DISABLED)
+        self.after(250, self.update_log_panel)
+
+    def dump_metrics(self):
+        path = os.getenv("KEYBOARD_METRICS_FILE", "keyboard_metrics")
+        try:
+            json_path, prom_path = metrics.dump(path)
+        except OSError as e:
+            log.error("Failed to dump metrics: %s", e)
+            return
+        log.info("📈 Metrics written to %s and %s", json_path, prom_path)
+
+    def update_connection_status(self):
+        """Show the OBS link state and reconnect timing in the title bar."""
+        info = self.supervisor.info()
+        state = info["state"]
+        if state == STATE_CONNECTED:
+            text = "OBS: connected"
+            if info["last_reconnect_duration"] is not None and info["reconnects"]:
+                text += f" (reconnected in {info['last_reconnect_duration']:.1f}s)"
+            color = "#4caf50"
+        elif info["retry_in"] is not None:
+            text = f"OBS: offline, retry in {info['retry_in']:.0f}s"
+            color = "#e57373"
         else:
-            self.selected_key.assign(action_name, self.actions[action_name])
-
-        self.save_config()
+            text = f"OBS: {state}..."
+            color = "#ffb74d"
+        if info["pending"]:
+            text += f"  [{info['pending']} queued]"
+        self.status_var.set(text)
+        self.status_label.configure(fg=color)
+        self.after(500, self.update_connection_status)
 
     def update_action_ui(self, *args):
         """Adjust input widgets based on selected action."""
         action = self.action_var.get()
-        if action == "Run Program":
-            self.program_label.pack(pady=(10, 0))
-            self.program_box.pack(pady=5, fill=tk.X)
-            self.command_label.pack(pady=(10, 0))
-            self.command_entry.pack(pady=5, fill=tk.X)
-            self.source_label.pack_forget()
-            self.source_box.pack_forget()
-            self.filter_label.pack_forget()
-            self.filter_box.pack_forget()
-        elif action == "Toggle Filter":
-            self.program_label.pack_forget()
-            self.program_box.pack_forget()
-            self.command_label.pack_forget()
-            self.command_entry.pack_forget()
+        for pairs in self.option_widgets.values():
+            for label, widget in pairs:
+                label.pack_forget()
+                widget.pack_forget()
+        if action == "Toggle Filter":
             self.populate_sources()
-            self.source_label.pack(pady=(10, 0))
-            self.source_box.pack(pady=5, fill=tk.X)
-            self.filter_label.pack(pady=(10, 0))
-            self.filter_box.pack(pady=5, fill=tk.X)
-        else:
-            self.program_label.pack_forget()
-            self.program_box.pack_forget()
-            self.command_label.pack_forget()
-            self.command_entry.pack_forget()
-            self.source_label.pack_forget()
-            self.source_box.pack_forget()
-            self.filter_label.pack_forget()
-            self.filter_box.pack_forget()
+        elif action == "Switch Layer":
+            self.target_layer_box["values"] = list(self.controller.layers)
+        elif action == "Volume":
+            self.inventory.get_inputs(
+                lambda inputs: self.call_soon(lambda: self.input_box.configure(values=inputs))
+            )
+        elif action == "Nudge Transform":
+            self.inventory.get_scenes(
+                lambda scenes: self.call_soon(lambda: self.scene_box.configure(values=scenes))
+            )
+        self.obs_target_label.pack_forget()
+        self.obs_target_box.pack_forget()
+        pairs = list(self.option_widgets.get(action, []))
+        if action and action not in LOCAL_ACTIONS and len(self.controller.targets) > 1:
+            pairs.append((self.obs_target_label, self.obs_target_box))
+        for label, widget in pairs:
+            label.pack(pady=(10, 0))
+            widget.pack(pady=5, fill=tk.X)
 
     def populate_sources(self):
         """Load available OBS sources into the combobox."""
-        try:
-            sources = self.obs.list_inputs()
-        except Exception as e:
-            print(f"Failed to get sources: {e}")
-            sources = []
-        self.source_box["values"] = sources
+        self.source_box["values"] = []
         self.source_var.set("")
         self.filter_box["values"] = []
         self.filter_var.set("")
+        self.inventory.get_inputs(
+            lambda sources: self.call_soon(lambda: self._set_sources(sources))
+        )
+
+    def _set_sources(self, sources):
+        self.source_box["values"] = sources
 
     def update_filter_options(self, *args):
         source = self.source_var.get()
@@ -330,81 +788,33 @@ class KeyboardGUI(tk.Tk):
             self.filter_box["values"] = []
             self.filter_var.set("")
             return
-        try:
-            filters = self.obs.list_filters(source)
-        except Exception as e:
-            print(f"Failed to get filters for {source}: {e}")
-            filters = []
+        self.inventory.get_filters(
+            source,
+            lambda filters: self.call_soon(lambda: self._set_filters(source, filters))
+        )
+
+    def _set_filters(self, source, filters):
+        # Ignore answers for a source that is no longer selected
+        if source != self.source_var.get():
+            return
         self.filter_box["values"] = filters
         if filters:
             self.filter_var.set(filters[0])
 
-    def save_config(self):
-        data = []
-        for btn in self.keys:
-            entry = {"action": btn.action_name}
-            if btn.action_name == "Run Program":
-                entry["command"] = btn.action
-            elif btn.action_name == "Toggle Filter" and btn.meta:
-                entry["source"] = btn.meta.get("source")
-                entry["filter"] = btn.meta.get("filter")
-            data.append(entry)
-        try:
-            with open(self.config_file, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2)
-        except Exception as e:
-            print(f"Failed to save config: {e}")
-
-    def load_config(self):
-        try:
-            with open(self.config_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-        except FileNotFoundError:
-            return
-        except Exception as e:
-            print(f"Failed to load config: {e}")
-            return
-
-        for btn, info in zip(self.keys, data):
-            action = info.get("action")
-            if not action:
-                continue
-            if action == "Run Program":
-                cmd = info.get("command")
-                btn.assign(action, cmd)
-            elif action == "Toggle Filter":
-                source = info.get("source")
-                flt = info.get("filter")
-                func = lambda s=source, f=flt: self.obs.toggle_filter(s, f)
-                btn.assign(action, func, {"source": source, "filter": flt})
-            else:
-                btn.assign(action, self.actions.get(action))
-
-    def setup_hotkeys(self):
-        """Bind F13–F24 to the first 12 numbered keys."""
-        for idx, key_btn in enumerate(self.keys[3:15], start=13):
-            hotkey = f"f{idx}"
-            keyboard.add_hotkey(hotkey, key_btn.trigger)
-        print("⌨️ Hotkeys registered: F13–F24")
-
     def create_tray_icon(self):
         """Create the system tray icon."""
-        size = 64
-        image = Image.new("RGB", (size, size), "#1e1e1e")
-        draw = ImageDraw.Draw(image)
-        draw.text((size // 3, size // 4), "K", fill="white")
-        menu = pystray.Menu(
-            pystray.MenuItem("Open", self.show_window, default=True),
-            pystray.MenuItem("Quit", self.on_exit)
-        )
-        return DoubleClickIcon(
-            "keyboard", image, "Keyboard", menu,
-            on_double_click=self.show_window
-        )
+        from tray import create_tray_icon
+        return create_tray_icon(self.show_window, self.on_exit)
 
     def hide_to_tray(self, *args):
         """Hide the window and show the tray icon."""
         self.withdraw()
+        if self.thumbnails is not None:
+            # Nothing to look at, so nothing to fetch
+            self.thumbnails.pause()
+        self._stop_meters()
+        if self.tray_icon is None:
+            self.tray_icon = self.create_tray_icon()
         if not self.tray_icon.visible:
             self.tray_icon.run_detached()
 
@@ -441,18 +851,24 @@ class KeyboardGUI(tk.Tk):
 
     def show_window(self, icon=None, item=None):
         self.deiconify()
-        if self.tray_icon.visible:
+        if self.thumbnails is not None:
+            self.thumbnails.resume()
+        self.call_soon(self._start_meters)
+        if self.tray_icon is not None and self.tray_icon.visible:
             self.tray_icon.stop()
 
     def on_exit(self, icon=None, item=None):
         """Disconnect from OBS if connected and close the application."""
-        if getattr(self, "obs", None):
-            try:
-                self.obs.disconnect()
-            except Exception as e:
-                print(f"OBS disconnect error: {e}")
-        if self.tray_icon.visible:
+        if getattr(self, "thumbnails", None):
+            self.thumbnails.stop()
+        if getattr(self, "meters", None):
+            self._stop_meters()
+        if getattr(self, "controller", None):
+            self.controller.stop()
+        if self.tray_icon is not None and self.tray_icon.visible:
             self.tray_icon.stop()
+        # Writes out whatever is still queued
+        shutdown_logging()
         self.destroy()
 
     # Backwards compatibility for older tray icons that may still reference
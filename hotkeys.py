@@ -0,0 +1,203 @@
+import time
+from functools import partial
+
+# Controls in the order of KeyboardGUI.keys: encoders first, then keys
+ENCODER_COUNT = 3
+KEY_COUNT = 15
+PRESS_CONTROLS = (
+    [f"Enc {i}" for i in range(1, ENCODER_COUNT + 1)]
+    + [f"Key {i}" for i in range(1, KEY_COUNT + 1)]
+)
+# Encoder turns as (encoder index, direction)
+TURN_CONTROLS = {
+    f"Enc {i + 1} {name}": (i, direction)
+    for i in range(ENCODER_COUNT)
+    for name, direction in (("CCW", -1), ("CW", 1))
+}
+
+
+def _default_hotkeys():
+    """F13–F24 for keys 1–12, Shift+F13–F18 for keys 13–15 and encoder
+    presses, Ctrl+F13–F18 for encoder turns."""
+    hotkeys = {f"Key {i + 1}": f"f{13 + i}" for i in range(12)}
+    for i in range(3):
+        hotkeys[f"Key {i + 13}"] = f"shift+f{13 + i}"
+        hotkeys[f"Enc {i + 1}"] = f"shift+f{16 + i}"
+        hotkeys[f"Enc {i + 1} CCW"] = f"ctrl+f{13 + 2 * i}"
+        hotkeys[f"Enc {i + 1} CW"] = f"ctrl+f{14 + 2 * i}"
+    return hotkeys
+
+
+DEFAULT_HOTKEYS = _default_hotkeys()
+
+MODIFIERS = {"ctrl": 1, "shift": 2, "alt": 4, "windows": 8}
+
+
+def _scan_codes(resolve, name):
+    try:
+        return resolve(name)
+    except ValueError:
+        return ()
+
+
+def parse_hotkey(text):
+    """Split "ctrl+shift+f13" into a modifier mask and the key name."""
+    *mods, key = [part.strip().lower() for part in text.split("+")]
+    mask = 0
+    for mod in mods:
+        if mod not in MODIFIERS:
+            raise ValueError(f"Unknown modifier '{mod}' in hotkey '{text}'")
+        mask |= MODIFIERS[mod]
+    if not key:
+        raise ValueError(f"Missing key in hotkey '{text}'")
+    return mask, key
+
+
+class HotkeyHook:
+    """One low-level keyboard hook for every control.
+
+    The hotkey mapping is compiled into a dict from ``(scan_code,
+    modifiers)`` to a ready-made handler, so each event costs a couple of
+    dict lookups. Presses are debounced per key and fire once on key-down;
+    OS auto-repeat while a key is held is ignored until it is released.
+    Encoder turns are not debounced, since fast spins arrive as quick taps.
+    With ``release``, the key-up of a press that was dispatched is passed
+    on too (for long-press and double-tap), whatever the modifiers are by
+    then.
+    """
+
+    def __init__(self, dispatch, rotate, debounce=0.03, resolve=None, release=None):
+        self.dispatch = dispatch
+        self.rotate = rotate
+        self.release = release
+        self.debounce = debounce
+        self._resolve = resolve
+        self._keyboard = None
+        self._mapping = dict(DEFAULT_HOTKEYS)
+        self._table = {}
+        self._mod_bits = {}
+        # Scan code -> control index to release, or None
+        self._held = {}
+        self._held_mods = set()
+        self._mods = 0
+        self._last_press = {}
+        self.events = 0
+        self.dispatched = 0
+        self.repeats = 0
+        self.bounces = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+
+    def start(self):
+        """Resolve the mapping and install the hook (needs ``keyboard``).
+
+        Returns the problems reported by ``set_mapping``.
+        """
+        if self._resolve is None:
+            import keyboard
+            self._keyboard = keyboard
+            self._resolve = keyboard.key_to_scan_codes
+        problems = self.set_mapping(self._mapping)
+        if self._keyboard is not None:
+            self._keyboard.hook(self.on_event)
+        return problems
+
+    def stop(self):
+        if self._keyboard is not None:
+            self._keyboard.unhook(self.on_event)
+            self._keyboard = None
+
+    def set_mapping(self, mapping):
+        """Replace the control -> hotkey mapping; the hook stays installed.
+
+        Returns a list of problems with entries that were skipped.
+        """
+        self._mapping = dict(mapping)
+        if self._resolve is None:
+            return []
+        table, problems = {}, []
+        for control, hotkey in self._mapping.items():
+            if not hotkey:
+                continue
+            if control in TURN_CONTROLS:
+                handler = partial(self.rotate, *TURN_CONTROLS[control])
+                debounce = 0.0
+                index = None
+            elif control in PRESS_CONTROLS:
+                index = PRESS_CONTROLS.index(control)
+                handler = partial(self.dispatch, index)
+                debounce = self.debounce
+            else:
+                problems.append(f"unknown control '{control}'")
+                continue
+            try:
+                mask, key = parse_hotkey(hotkey)
+            except ValueError as e:
+                problems.append(str(e))
+                continue
+            codes = _scan_codes(self._resolve, key)
+            if not codes:
+                problems.append(f"unknown key '{key}' for {control}")
+            for code in codes:
+                table[(code, mask)] = (handler, debounce, index)
+        mod_bits = {}
+        for name, bit in MODIFIERS.items():
+            for variant in (name, f"left {name}", f"right {name}"):
+                for code in _scan_codes(self._resolve, variant):
+                    mod_bits[code] = bit
+        # Plain assignments, so the hook thread sees the old or new table
+        self._mod_bits = mod_bits
+        self._table = table
+        return problems
+
+    def mapping(self):
+        return dict(self._mapping)
+
+    def on_event(self, event):
+        """Hook callback; runs on the keyboard listener thread."""
+        started = time.perf_counter()
+        self.events += 1
+        code = event.scan_code
+        down = event.event_type == "down"
+        bit = self._mod_bits.get(code)
+        if bit is not None:
+            if down:
+                self._held_mods.add(code)
+            else:
+                self._held_mods.discard(code)
+            mods = 0
+            for held in self._held_mods:
+                mods |= self._mod_bits.get(held, 0)
+            self._mods = mods
+        elif not down:
+            index = self._held.pop(code, None)
+            if index is not None and self.release is not None:
+                self.release(index)
+        elif code in self._held:
+            self.repeats += 1
+        else:
+            self._held[code] = None
+            entry = self._table.get((code, self._mods))
+            if entry is not None:
+                handler, debounce, index = entry
+                if debounce and started - self._last_press.get(code, 0.0) < debounce:
+                    self.bounces += 1
+                else:
+                    self._last_press[code] = started
+                    self.dispatched += 1
+                    self._held[code] = index
+                    handler()
+        elapsed = time.perf_counter() - started
+        self.total_s += elapsed
+        if elapsed > self.max_s:
+            self.max_s = elapsed
+
+    def stats(self):
+        return {
+            "events": self.events,
+            "dispatched": self.dispatched,
+            "repeats_suppressed": self.repeats,
+            "bounces_suppressed": self.bounces,
+            "avg_us": self.total_s / self.events * 1e6 if self.events else 0.0,
+            "max_us": self.max_s * 1e6,
+        }
@@ -0,0 +1,295 @@
+import time
+import tkinter as tk
+
+from hotkeys import ENCODER_COUNT, PRESS_CONTROLS
+
+KEY_WIDTH, KEY_HEIGHT = 80, 60
+KEY_PAD = 5
+KEY_RADIUS = 12
+KEY_COLUMNS = 5
+# Repaint at most this often; changes in between are drawn together
+FRAME_INTERVAL_MS = 16
+
+BG_COLOR = "#121212"
+KEY_COLOR = "#1e1e1e"
+HOVER_COLOR = "#333333"
+ACTIVE_COLOR = "#4caf50"
+TEXT_COLOR = "white"
+METER_COLORS = ((-20, "#4caf50"), (-6, "#ffc107"))
+CLIP_COLOR = "#f44336"
+# Level meters span this range, in dB
+METER_FLOOR_DB = -60.0
+
+
+def key_cell(index):
+    """Grid (row, column) of control ``index``: encoders centred on top."""
+    if index < ENCODER_COUNT:
+        return 0, index + 1
+    return 1 + (index - ENCODER_COUNT) // KEY_COLUMNS, (index - ENCODER_COUNT) % KEY_COLUMNS
+
+
+class _Key:
+    __slots__ = (
+        "label", "text", "active", "hover", "image", "meter",
+        "rect", "text_item", "image_item", "meter_item", "hold_item",
+        "drawn", "drawn_image", "drawn_meter",
+    )
+
+    def __init__(self, label):
+        self.label = label
+        self.text = label
+        self.active = False
+        self.hover = False
+        self.image = None
+        self.meter = None
+        self.rect = None
+        self.text_item = None
+        self.image_item = None
+        self.meter_item = None
+        self.hold_item = None
+        # (fill, outline, width, text) and the image as last handed to Tk
+        self.drawn = (None, None, None, None)
+        self.drawn_image = None
+        self.drawn_meter = None
+
+
+class KeyGrid(tk.Canvas):
+    """All 18 controls drawn on one canvas.
+
+    ``set_binding``/``set_active`` only record the new look and mark the key
+    dirty; a single repaint per frame then reconfigures just the canvas
+    items whose fill, outline or text actually changed. A burst of OBS
+    events therefore costs one repaint, however many keys it touches.
+    Clicks behave like the hardware keys: ``press`` on button-down and
+    ``release`` on button-up, so long-press and double-tap work with the
+    mouse too. Call from the Tk thread only.
+    """
+
+    def __init__(self, master, press, rotate, select=None, release=None):
+        rows = 1 + -(-(len(PRESS_CONTROLS) - ENCODER_COUNT) // KEY_COLUMNS)
+        super().__init__(
+            master, width=KEY_COLUMNS * (KEY_WIDTH + 2 * KEY_PAD),
+            height=rows * (KEY_HEIGHT + 2 * KEY_PAD),
+            highlightthickness=0, bd=0, bg=BG_COLOR,
+        )
+        self.press = press
+        self.rotate = rotate
+        self.select = select
+        self.release = release
+        self.keys = [_Key(label) for label in PRESS_CONTROLS]
+        self._dirty = set()
+        self._frame_pending = False
+        self._hover = None
+        self._pressed = None
+        self.updates = 0
+        self.frames = 0
+        self.painted = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+
+        for index, key in enumerate(self.keys):
+            x1, y1, x2, y2 = self.key_bounds(index)
+            key.rect = self._rounded_rect(x1, y1, x2, y2, KEY_RADIUS, fill=KEY_COLOR, outline=KEY_COLOR)
+            key.text_item = self.create_text((x1 + x2) / 2, (y1 + y2) / 2, text=key.label, fill=TEXT_COLOR)
+            key.drawn = (KEY_COLOR, KEY_COLOR, 1, key.label)
+
+        self.bind("<ButtonPress-1>", self._on_press)
+        self.bind("<ButtonRelease-1>", self._on_release)
+        self.bind("<Motion>", lambda e: self._set_hover(self.key_at(e.x, e.y)))
+        self.bind("<Leave>", lambda e: self._set_hover(None))
+        # Scrolling over an encoder turns it (Button-4/5 on X11)
+        self.bind("<MouseWheel>", lambda e: self._on_wheel(e, 1 if e.delta > 0 else -1))
+        self.bind("<Button-4>", lambda e: self._on_wheel(e, 1))
+        self.bind("<Button-5>", lambda e: self._on_wheel(e, -1))
+
+    def key_bounds(self, index):
+        row, column = key_cell(index)
+        x = column * (KEY_WIDTH + 2 * KEY_PAD) + KEY_PAD
+        y = row * (KEY_HEIGHT + 2 * KEY_PAD) + KEY_PAD
+        return x + 2, y + 2, x + KEY_WIDTH - 2, y + KEY_HEIGHT - 2
+
+    def key_at(self, x, y):
+        """Index of the control under canvas point ``(x, y)``, or None."""
+        column, cx = divmod(int(x), KEY_WIDTH + 2 * KEY_PAD)
+        row, cy = divmod(int(y), KEY_HEIGHT + 2 * KEY_PAD)
+        if not (KEY_PAD <= cx < KEY_PAD + KEY_WIDTH and KEY_PAD <= cy < KEY_PAD + KEY_HEIGHT):
+            return None
+        if row == 0:
+            index = column - 1
+            return index if 0 <= index < ENCODER_COUNT else None
+        index = ENCODER_COUNT + (row - 1) * KEY_COLUMNS + column
+        return index if column < KEY_COLUMNS and index < len(self.keys) else None
+
+    def _rounded_rect(self, x1, y1, x2, y2, r=25, **kwargs):
+        points = [
+            x1+r, y1,
+            x2-r, y1,
+            x2, y1,
+            x2, y1+r,
+            x2, y2-r,
+            x2, y2,
+            x2-r, y2,
+            x1+r, y2,
+            x1, y2,
+            x1, y2-r,
+            x1, y1+r,
+            x1, y1
+        ]
+        return self.create_polygon(points, smooth=True, **kwargs)
+
+    # -- state ---------------------------------------------------------------
+
+    def set_binding(self, index, binding):
+        """Show the binding control ``index`` has on the active layer."""
+        key = self.keys[index]
+        key.text = f"{key.label}\n{binding.action_name}" if binding else key.label
+        self._mark(index)
+
+    def set_active(self, index, active):
+        """Outline the key while its OBS state is on (or the scene is live)."""
+        self.keys[index].active = bool(active)
+        self._mark(index)
+
+    def set_image(self, index, image):
+        """Show a ``PhotoImage`` behind the key's label, or None to clear it.
+
+        The grid keeps a reference, so Tk does not free the image while it
+        is shown.
+        """
+        key = self.keys[index]
+        if key.image is not image:
+            key.image = image
+            self._mark(index)
+
+    def set_meter(self, index, level):
+        """Show an input level meter along the bottom of the key.
+
+        ``level`` is ``(rms_db, peak_db, hold_db, clipping)`` as returned by
+        ``VolumeMeters.levels``, or None to remove the meter. The key is only
+        repainted when the meter moves by at least a pixel.
+        """
+        key = self.keys[index]
+        meter = None
+        if level is not None:
+            rms_db, peak_db, hold_db, clipping = level
+            if clipping:
+                color = CLIP_COLOR
+            else:
+                color = next((c for limit, c in METER_COLORS if peak_db < limit), CLIP_COLOR)
+            meter = (self._meter_width(rms_db), self._meter_width(hold_db), color)
+        if meter != key.meter:
+            key.meter = meter
+            self._mark(index)
+
+    @staticmethod
+    def _meter_width(db):
+        fraction = min(1.0, max(0.0, 1 - db / METER_FLOOR_DB))
+        return round(fraction * (KEY_WIDTH - 20))
+
+    def _set_hover(self, index):
+        if index == self._hover:
+            return
+        if self._hover is not None:
+            self.keys[self._hover].hover = False
+            self._mark(self._hover)
+        self._hover = index
+        if index is not None:
+            self.keys[index].hover = True
+            self._mark(index)
+
+    def _mark(self, index):
+        self.updates += 1
+        self._dirty.add(index)
+        if not self._frame_pending:
+            self._frame_pending = True
+            self.after(FRAME_INTERVAL_MS, self.paint)
+
+    def paint(self):
+        """Redraw the dirty keys; normally run once per frame by ``_mark``."""
+        self._frame_pending = False
+        if not self._dirty:
+            return
+        started = time.perf_counter()
+        dirty, self._dirty = self._dirty, set()
+        for index in dirty:
+            key = self.keys[index]
+            fill = HOVER_COLOR if key.hover else KEY_COLOR
+            outline, width = (ACTIVE_COLOR, 2) if key.active else (KEY_COLOR, 1)
+            old_fill, old_outline, old_width, old_text = key.drawn
+            if (fill, outline, width) != (old_fill, old_outline, old_width):
+                self.itemconfig(key.rect, fill=fill, outline=outline, width=width)
+                self.painted += 1
+            if key.text != old_text:
+                self.itemconfig(key.text_item, text=key.text)
+                self.painted += 1
+            key.drawn = (fill, outline, width, key.text)
+            if key.image is not key.drawn_image:
+                self._paint_image(index, key)
+            if key.meter != key.drawn_meter:
+                self._paint_meter(index, key)
+        elapsed = time.perf_counter() - started
+        self.frames += 1
+        self.total_s += elapsed
+        if elapsed > self.max_s:
+            self.max_s = elapsed
+
+    def _paint_image(self, index, key):
+        if key.image is None:
+            self.itemconfig(key.image_item, image="", state=tk.HIDDEN)
+        elif key.image_item is None:
+            x1, y1, x2, y2 = self.key_bounds(index)
+            key.image_item = self.create_image((x1 + x2) / 2, (y1 + y2) / 2, image=key.image)
+            # Above the key background, below its label
+            self.tag_raise(key.text_item, key.image_item)
+        else:
+            self.itemconfig(key.image_item, image=key.image, state=tk.NORMAL)
+        key.drawn_image = key.image
+        self.painted += 1
+
+    def _paint_meter(self, index, key):
+        if key.meter is None:
+            self.itemconfig(key.meter_item, state=tk.HIDDEN)
+            self.itemconfig(key.hold_item, state=tk.HIDDEN)
+        else:
+            x1, _, _, y2 = self.key_bounds(index)
+            left, top, bottom = x1 + 8, y2 - 9, y2 - 5
+            width, hold, color = key.meter
+            if key.meter_item is None:
+                key.meter_item = self.create_rectangle(0, 0, 0, 0, width=0)
+                key.hold_item = self.create_line(0, 0, 0, 0, width=2)
+            self.coords(key.meter_item, left, top, left + width, bottom)
+            self.itemconfig(key.meter_item, fill=color, state=tk.NORMAL)
+            self.coords(key.hold_item, left + hold, top - 1, left + hold, bottom + 1)
+            self.itemconfig(key.hold_item, fill=color, state=tk.NORMAL)
+        key.drawn_meter = key.meter
+        self.painted += 1
+
+    def stats(self):
+        return {
+            "updates": self.updates,
+            "frames": self.frames,
+            "items_painted": self.painted,
+            "avg_frame_ms": self.total_s / self.frames * 1000 if self.frames else 0.0,
+            "max_frame_ms": self.max_s * 1000,
+        }
+
+    # -- input ---------------------------------------------------------------
+
+    def _on_press(self, event):
+        self._pressed = self.key_at(event.x, event.y)
+        if self._pressed is None:
+            return
+        if self.select is not None:
+            self.select(self._pressed)
+        self.press(self._pressed)
+
+    def _on_release(self, event):
+        # Released wherever the pointer is now, like a key that was let go
+        if self._pressed is not None and self.release is not None:
+            self.release(self._pressed)
+        self._pressed = None
+
+    def _on_wheel(self, event, delta):
+        index = self.key_at(event.x, event.y)
+        if index is not None and index < ENCODER_COUNT:
+            self.rotate(index, delta)
@@ -0,0 +1,140 @@
+"""Compact traces of key presses and encoder turns, for replaying later.
+
+A trace is a short header followed by one 6 byte record per event: the
+time since the previous event in microseconds, the control index, and the
+number of encoder ticks (0 for a press, ``RELEASE`` for a key-up). Ten
+hours of steady use fit in a few megabytes.
+"""
+import logging
+import random
+import struct
+import threading
+import time
+
+from hotkeys import ENCODER_COUNT, PRESS_CONTROLS
+
+log = logging.getLogger(__name__)
+
+TRACE_MAGIC = b"KBTRACE1"
+_RECORD = struct.Struct("<IBb")
+# Ticks value of a key release; turns are clamped to -127..127
+RELEASE = -128
+# Longest gap one record can hold (about 71 minutes); longer ones are clamped
+MAX_GAP_US = 2 ** 32 - 1
+# Records written between flushes, so a crash loses at most this many
+FLUSH_EVERY = 256
+
+
+class TraceRecorder:
+    """Writes the events passing through the input callbacks to ``path``.
+
+    ``wrap`` returns press/turn/release callbacks that record each event
+    and then call the real ones. Recording costs a struct pack and a
+    buffered write under a lock, on the input thread.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.events = 0
+        self._file = None
+        self._last = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "wb")
+                self._file.write(TRACE_MAGIC)
+                self._last = time.perf_counter()
+        log.info("🔴 Recording input to %s", self.path)
+
+    def stop(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        log.info("⏹️ Recorded %s input events to %s", self.events, self.path)
+
+    def record(self, index, ticks=0):
+        now = time.perf_counter()
+        with self._lock:
+            if self._file is None:
+                return
+            gap = min(MAX_GAP_US, round((now - self._last) * 1e6))
+            self._last = now
+            self._file.write(_RECORD.pack(gap, index, ticks))
+            self.events += 1
+            if self.events % FLUSH_EVERY == 0:
+                self._file.flush()
+
+    def wrap(self, dispatch, rotate, release):
+        def press(index):
+            self.record(index)
+            return dispatch(index)
+
+        def turn(index, delta):
+            self.record(index, max(-127, min(127, delta)))
+            return rotate(index, delta)
+
+        def key_up(index):
+            self.record(index, RELEASE)
+            return release(index)
+
+        return press, turn, key_up
+
+
+def read_trace(path):
+    """Return the events of a trace as ``[(seconds from start, index, ticks)]``."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(TRACE_MAGIC):
+        raise ValueError(f"{path} is not a key trace")
+    events = []
+    elapsed = 0
+    body = memoryview(data)[len(TRACE_MAGIC):]
+    usable = len(body) - len(body) % _RECORD.size
+    for gap, index, ticks in _RECORD.iter_unpack(body[:usable]):
+        elapsed += gap
+        if index >= len(PRESS_CONTROLS):
+            raise ValueError(f"{path}: control {index} out of range")
+        events.append((elapsed / 1e6, index, ticks))
+    return events
+
+
+def write_trace(path, events):
+    """Write ``[(seconds, index, ticks)]`` events as a trace file."""
+    with open(path, "wb") as f:
+        f.write(TRACE_MAGIC)
+        last = 0
+        for seconds, index, ticks in events:
+            us = round(seconds * 1e6)
+            f.write(_RECORD.pack(min(MAX_GAP_US, us - last), index, ticks))
+            last = us
+
+
+def synthetic_trace(count, rate=5.0, seed=0):
+    """A made-up session: presses on every key and bursts of encoder ticks.
+
+    Events come ``rate`` per second on average, like an operator who keeps
+    busy without hammering the keys. Every press is released again, most
+    after a short tap and some after a long hold.
+    """
+    rng = random.Random(seed)
+    events = []
+    now = 0.0
+    while len(events) < count:
+        now += rng.expovariate(rate)
+        if rng.random() < 0.3:
+            encoder = rng.randrange(ENCODER_COUNT)
+            direction = rng.choice((-1, 1))
+            for _ in range(rng.randint(1, 8)):
+                events.append((now, encoder, direction))
+                now += 0.01
+        else:
+            key = rng.randrange(ENCODER_COUNT, len(PRESS_CONTROLS))
+            held = rng.uniform(0.6, 1.2) if rng.random() < 0.1 else rng.uniform(0.05, 0.15)
+            events.append((now, key, 0))
+            events.append((now + held, key, RELEASE))
+    # Releases can land after the next events
+    events.sort(key=lambda event: event[0])
+    return events[:count]
@@ -0,0 +1,263 @@
+"""Program launcher for the Run Program action.
+
+Commands are started from a long-lived helper process (this module run as a
+script) so the GUI process never forks per key press. The helper starts
+programs directly from their argv, keeps track of them and reaps them when
+they exit. Requests and replies are JSON lines over the helper's stdin and
+stdout.
+"""
+import itertools
+import json
+import logging
+import os
+import shlex
+import subprocess
+import sys
+import threading
+import time
+
+from metrics import metrics, STAGE_LAUNCH
+
+log = logging.getLogger(__name__)
+
+REAP_INTERVAL = 0.5
+
+
+def split_command(command):
+    """Split a command line into argv the way the platform's shell would."""
+    return shlex.split(command, posix=os.name != "nt")
+
+
+class ProcessTable:
+    """Starts programs, reaps them and remembers which are still running.
+
+    Used inside the helper process, and directly in-process when the helper
+    cannot be started.
+    """
+
+    def __init__(self):
+        self.children = {}
+        self.reaped = 0
+        self._lock = threading.Lock()
+
+    def launch(self, command, shell=False, single_instance=False):
+        if single_instance:
+            with self._lock:
+                for proc, cmd in self.children.items():
+                    if cmd == command and proc.poll() is None:
+                        return {"ok": True, "pid": proc.pid, "already_running": True}
+        started = time.perf_counter()
+        try:
+            args = command if shell else split_command(command)
+            if not args:
+                raise ValueError("empty command")
+            # Never inherit the helper's stdout: it carries the JSON replies,
+            # and a program still writing to it after the app exits would
+            # be killed by SIGPIPE
+            kwargs = {
+                "stdin": subprocess.DEVNULL,
+                "stdout": subprocess.DEVNULL,
+                "stderr": subprocess.DEVNULL,
+            }
+            if os.name == "nt":
+                kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
+            else:
+                # Keep programs running when the keyboard app exits
+                kwargs["start_new_session"] = True
+            proc = subprocess.Popen(args, shell=shell, **kwargs)
+        except (OSError, ValueError) as e:
+            return {"ok": False, "error": str(e)}
+        spawn_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self.children[proc] = command
+        return {"ok": True, "pid": proc.pid, "spawn_ms": spawn_ms}
+
+    def reap(self):
+        """Collect children that have exited so they do not linger as zombies."""
+        with self._lock:
+            for proc in [p for p in self.children if p.poll() is not None]:
+                del self.children[proc]
+                self.reaped += 1
+
+    def stats(self):
+        with self._lock:
+            return {"running": len(self.children), "reaped": self.reaped}
+
+
+def serve(infile, outfile):
+    """Helper process main loop: one JSON request per line until EOF."""
+    table = ProcessTable()
+    stop = threading.Event()
+
+    def reaper():
+        while not stop.wait(REAP_INTERVAL):
+            table.reap()
+
+    threading.Thread(target=reaper, name="reaper", daemon=True).start()
+    for line in infile:
+        try:
+            request = json.loads(line)
+        except ValueError:
+            continue
+        table.reap()
+        reply = table.launch(
+            request.get("command", ""),
+            shell=bool(request.get("shell")),
+            single_instance=bool(request.get("single_instance")),
+        )
+        reply.update(table.stats(), id=request.get("id"))
+        outfile.write(json.dumps(reply) + "\n")
+        outfile.flush()
+    stop.set()
+
+
+class Launcher:
+    """Client side of the launcher helper, used by the Run Program action.
+
+    The helper is started on the first launch and restarted if it dies.
+    ``launch`` blocks until the helper has started the program, so call it
+    from an action queue worker.
+    """
+
+    def __init__(self, use_helper=True, timeout=5):
+        self.use_helper = use_helper
+        self.timeout = timeout
+        self.launches = 0
+        self.failures = 0
+        self.skipped = 0
+        self.running = 0
+        self.reaped = 0
+        self.last_latency_ms = None
+        self.max_latency_ms = 0.0
+        self._proc = None
+        self._local = None
+        self._ids = itertools.count(1)
+        # Requests waiting for a reply from the current helper, by id
+        self._waiting = {}
+        self._lock = threading.Lock()
+
+    def _ensure_helper(self):
+        if self._proc is not None and self._proc.poll() is None:
+            return True
+        try:
+            self._proc = subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__)],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                text=True, bufsize=1,
+            )
+        except OSError as e:
+            log.warning("Launcher helper unavailable, launching in-process: %s", e)
+            self.use_helper = False
+            return False
+        # Each helper gets its own table, so one that dies only fails the
+        # requests that were sent to it
+        self._waiting = {}
+        threading.Thread(
+            target=self._read_replies, args=(self._proc, self._waiting),
+            name="launcher-reader", daemon=True,
+        ).start()
+        return True
+
+    def _read_replies(self, proc, waiting):
+        for line in proc.stdout:
+            try:
+                reply = json.loads(line)
+            except ValueError:
+                continue
+            waiter = waiting.pop(reply.get("id"), None)
+            if waiter is not None:
+                waiter.append(reply)
+                waiter[0].set()
+        # The helper exited; fail whatever was still waiting on it
+        for waiter in list(waiting.values()):
+            waiter[0].set()
+
+    def _request(self, request):
+        with self._lock:
+            if not self._ensure_helper():
+                return None
+            request["id"] = next(self._ids)
+            waiter = [threading.Event()]
+            waiting = self._waiting
+            waiting[request["id"]] = waiter
+            try:
+                self._proc.stdin.write(json.dumps(request) + "\n")
+                self._proc.stdin.flush()
+            except OSError as e:
+                waiting.pop(request["id"], None)
+                return {"ok": False, "error": f"launcher helper: {e}"}
+        if not waiter[0].wait(self.timeout) or len(waiter) < 2:
+            waiting.pop(request["id"], None)
+            return {"ok": False, "error": "launcher helper did not answer"}
+        return waiter[1]
+
+    def launch(self, command, shell=False, single_instance=False):
+        """Start ``command`` and return the helper's reply as a dict."""
+        started = time.perf_counter()
+        request = {"command": command, "shell": shell, "single_instance": single_instance}
+        reply = self._request(request) if self.use_helper else None
+        if reply is None:
+            # Without the helper, exited children are reaped on each launch
+            if self._local is None:
+                self._local = ProcessTable()
+            self._local.reap()
+            reply = self._local.launch(command, shell, single_instance)
+            reply.update(self._local.stats())
+        elapsed = time.perf_counter() - started
+        self._record(reply, elapsed)
+        return reply
+
+    def _record(self, reply, elapsed):
+        self.last_latency_ms = elapsed * 1000
+        self.max_latency_ms = max(self.max_latency_ms, self.last_latency_ms)
+        self.running = reply.get("running", self.running)
+        self.reaped = reply.get("reaped", self.reaped)
+        if not reply.get("ok"):
+            self.failures += 1
+        elif reply.get("already_running"):
+            self.skipped += 1
+        else:
+            self.launches += 1
+        if metrics.enabled:
+            metrics.record("Run Program", STAGE_LAUNCH, elapsed)
+            if not reply.get("ok"):
+                metrics.error("Run Program")
+
+    def run(self, command, shell=False, single_instance=False):
+        """Launch and report the outcome on the console."""
+        reply = self.launch(command, shell, single_instance)
+        if not reply.get("ok"):
+            log.error("Failed to run command '%s': %s", command, reply.get("error"))
+        elif reply.get("already_running"):
+            log.info("▶️ '%s' is already running (pid %s)", command, reply['pid'])
+        else:
+            log.info(
+                "▶️ Started '%s' (pid %s, %.1f ms)",
+                command, reply['pid'], self.last_latency_ms,
+            )
+
+    def stats(self):
+        return {
+            "launches": self.launches,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "running": self.running,
+            "reaped": self.reaped,
+            "last_latency_ms": self.last_latency_ms,
+            "max_latency_ms": self.max_latency_ms,
+        }
+
+    def stop(self):
+        """Close the helper; programs it started keep running."""
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()
+            proc.wait(2)
+        except (OSError, subprocess.TimeoutExpired):
+            proc.kill()
+
+
+if __name__ == "__main__":
+    serve(sys.stdin, sys.stdout)
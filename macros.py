@@ -0,0 +1,56 @@
+import json
+
+# Values of RequestBatchExecutionType, by the names used in the config file
+EXECUTION_MODES = {
+    "serial": 0,
+    "frame": 1,
+    "parallel": 2,
+}
+
+
+def parse_macro(text):
+    """Parse macro steps, one ``RequestType {json data}`` per line.
+
+    Blank lines and lines starting with ``#`` are ignored. Raises
+    ValueError with the offending line number on bad input.
+    """
+    steps = []
+    for number, line in enumerate(text.splitlines(), start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        request_type, _, data_text = line.partition(" ")
+        data = {}
+        if data_text.strip():
+            try:
+                data = json.loads(data_text)
+            except ValueError as e:
+                raise ValueError(f"Line {number}: invalid JSON ({e})")
+            if not isinstance(data, dict):
+                raise ValueError(f"Line {number}: request data must be an object")
+        steps.append({"requestType": request_type, "requestData": data})
+    return steps
+
+
+def format_macro(steps):
+    """Return macro steps in the text form accepted by parse_macro."""
+    lines = []
+    for step in steps:
+        data = step.get("requestData") or {}
+        line = step["requestType"]
+        if data:
+            line += " " + json.dumps(data)
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def validate_steps(steps):
+    """Return True if ``steps`` has the shape stored in the config file."""
+    if not isinstance(steps, list):
+        return False
+    for step in steps:
+        if not isinstance(step, dict) or not isinstance(step.get("requestType"), str):
+            return False
+        if not isinstance(step.get("requestData", {}), dict):
+            return False
+    return True
@@ -1,7 +1,13 @@
 # main.py
-from gui import KeyboardGUI
+import sys
+
 
 def main():
+    if "--daemon" in sys.argv[1:]:
+        # Headless: Tk is never imported
+        from daemon import main as daemon_main
+        sys.exit(daemon_main([arg for arg in sys.argv[1:] if arg != "--daemon"]))
+    from gui import KeyboardGUI
     gui = KeyboardGUI()
     gui.run()
 
@@ -0,0 +1,164 @@
+import bisect
+import json
+import os
+import threading
+import time
+
+# Histogram bucket upper bounds in seconds: 10 µs to ~40 s, 1.25x apart
+BUCKETS = []
+_bound = 1e-5
+while _bound < 40:
+    BUCKETS.append(_bound)
+    _bound *= 1.25
+del _bound
+
+# Stages of a key press, in order
+STAGE_HOOK = "hook"    # hotkey/click callback until the action is queued
+STAGE_QUEUE = "queue"  # waiting in the action queue
+STAGE_OBS = "obs"      # one OBS request round trip, keyed by request type
+STAGE_TOTAL = "total"  # press until the action (and its OBS acks) finished
+STAGE_LAUNCH = "launch"  # Run Program request until the program was started
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with approximate percentiles."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q):
+        """Return the bucket bound below which ``q`` of the samples fall."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return min(BUCKETS[i], self.max) if i < len(BUCKETS) else self.max
+        return self.max
+
+
+class Metrics:
+    """Per-action latency histograms and error/reconnect counters.
+
+    Callers check ``enabled`` before taking any timestamps, so a disabled
+    instance costs one attribute lookup per instrumented point.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._histograms = {}
+        self._errors = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def record(self, action, stage, seconds):
+        with self._lock:
+            hist = self._histograms.get((action, stage))
+            if hist is None:
+                hist = self._histograms[(action, stage)] = LatencyHistogram()
+            hist.record(seconds)
+
+    def error(self, action):
+        with self._lock:
+            self._errors[action] = self._errors.get(action, 0) + 1
+
+    def increment(self, name):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + 1
+
+    def wrap_call(self, call):
+        """Return ``call`` timed per request type as the ``obs`` stage."""
+        def timed_call(req, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                resp = call(req, *args, **kwargs)
+            except Exception:
+                self.error(req.name)
+                raise
+            self.record(req.name, STAGE_OBS, time.perf_counter() - start)
+            if resp.status is False:
+                self.error(req.name)
+            return resp
+        return timed_call
+
+    def snapshot(self):
+        """Return percentiles (in ms) per action and stage, plus counters."""
+        with self._lock:
+            actions = {}
+            for (action, stage), hist in sorted(self._histograms.items()):
+                actions.setdefault(action, {})[stage] = {
+                    "count": hist.count,
+                    "p50_ms": hist.percentile(0.50) * 1000,
+                    "p95_ms": hist.percentile(0.95) * 1000,
+                    "p99_ms": hist.percentile(0.99) * 1000,
+                    "max_ms": hist.max * 1000,
+                    "mean_ms": hist.sum / hist.count * 1000,
+                }
+            return {
+                "actions": actions,
+                "errors": dict(self._errors),
+                "counters": dict(self._counters),
+            }
+
+    def prometheus_text(self):
+        """Return the metrics in the Prometheus text exposition format."""
+        lines = [
+            "# HELP keyboard_action_latency_seconds Key press latency by stage.",
+            "# TYPE keyboard_action_latency_seconds histogram",
+        ]
+        with self._lock:
+            for (action, stage), hist in sorted(self._histograms.items()):
+                labels = f'action="{_escape(action)}",stage="{stage}"'
+                cumulative = 0
+                for bound, n in zip(BUCKETS, hist.counts):
+                    cumulative += n
+                    lines.append(
+                        f'keyboard_action_latency_seconds_bucket{{{labels},le="{bound:.6g}"}} {cumulative}'
+                    )
+                lines.append(
+                    f'keyboard_action_latency_seconds_bucket{{{labels},le="+Inf"}} {hist.count}'
+                )
+                lines.append(f"keyboard_action_latency_seconds_sum{{{labels}}} {hist.sum:.9f}")
+                lines.append(f"keyboard_action_latency_seconds_count{{{labels}}} {hist.count}")
+            lines.append("# TYPE keyboard_action_errors_total counter")
+            for action, n in sorted(self._errors.items()):
+                lines.append(f'keyboard_action_errors_total{{action="{_escape(action)}"}} {n}')
+            for name, n in sorted(self._counters.items()):
+                lines.append(f"# TYPE keyboard_{name}_total counter")
+                lines.append(f"keyboard_{name}_total {n}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path_prefix):
+        """Write ``<prefix>.json`` and ``<prefix>.prom``; return both paths."""
+        json_path = path_prefix + ".json"
+        prom_path = path_prefix + ".prom"
+        _write_atomic(json_path, json.dumps(self.snapshot(), indent=2))
+        _write_atomic(prom_path, self.prometheus_text())
+        return json_path, prom_path
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _write_atomic(path, text):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+# Shared instance used by the GUI, executor and OBS client
+metrics = Metrics(enabled=os.getenv("KEYBOARD_METRICS") == "1")
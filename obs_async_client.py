@@ -0,0 +1,379 @@
+import asyncio
+import base64
+import hashlib
+import itertools
+import json
+import logging
+import threading
+
+import websockets
+from obswebsocket import events, exceptions
+
+log = logging.getLogger(__name__)
+
+# obs-websocket v5 opcodes
+OP_HELLO = 0
+OP_IDENTIFY = 1
+OP_IDENTIFIED = 2
+OP_REIDENTIFY = 3
+OP_EVENT = 5
+OP_REQUEST = 6
+OP_REQUEST_RESPONSE = 7
+OP_REQUEST_BATCH = 8
+OP_REQUEST_BATCH_RESPONSE = 9
+
+# RequestBatchExecutionType
+EXECUTION_SERIAL_REALTIME = 0
+EXECUTION_SERIAL_FRAME = 1
+EXECUTION_PARALLEL = 2
+
+# EventSubscription::All, without the high-volume categories
+EVENT_SUBSCRIPTION_ALL = 1023
+# High-volume: levels of every input, several times a second
+EVENT_SUBSCRIPTION_INPUT_VOLUME_METERS = 1 << 16
+
+
+def build_auth_string(password, salt, challenge):
+    """Return the obs-websocket v5 authentication string."""
+    secret = base64.b64encode(
+        hashlib.sha256((password + salt).encode("utf-8")).digest()
+    )
+    return base64.b64encode(
+        hashlib.sha256(secret + challenge.encode("utf-8")).digest()
+    ).decode("utf-8")
+
+
+class AsyncOBSClient:
+    """Asyncio obs-websocket v5 client.
+
+    Requests are written as soon as they are made and matched to their
+    replies by ``requestId``, so any number of them can be in flight on the
+    single connection at once.
+    """
+
+    def __init__(self, host="localhost", port=4455, password="", timeout=10,
+                 event_subscriptions=EVENT_SUBSCRIPTION_ALL):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.timeout = timeout
+        self.event_subscriptions = event_subscriptions
+        self.server_version = None
+
+        self._ws = None
+        self._reader_task = None
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._event_handlers = []
+        self._close_handlers = []
+
+    @property
+    def connected(self):
+        return self._reader_task is not None and not self._reader_task.done()
+
+    async def connect(self):
+        url = f"ws://{self.host}:{self.port}"
+        try:
+            self._ws = await asyncio.wait_for(
+                websockets.connect(url, max_size=None), self.timeout
+            )
+            await asyncio.wait_for(self._identify(), self.timeout)
+        except (OSError, asyncio.TimeoutError, websockets.WebSocketException) as e:
+            await self._close_socket()
+            raise exceptions.ConnectionFailure(str(e) or type(e).__name__)
+        self._reader_task = asyncio.get_running_loop().create_task(self._reader())
+
+    async def _identify(self):
+        hello = json.loads(await self._ws.recv())
+        if hello.get("op") != OP_HELLO:
+            raise exceptions.ConnectionFailure("Invalid Hello message.")
+        self.server_version = hello["d"].get("obsWebSocketVersion")
+
+        identify = {
+            "rpcVersion": 1,
+            "eventSubscriptions": self.event_subscriptions,
+        }
+        challenge = hello["d"].get("authentication")
+        if challenge:
+            identify["authentication"] = build_auth_string(
+                self.password, challenge["salt"], challenge["challenge"]
+            )
+        await self._ws.send(json.dumps({"op": OP_IDENTIFY, "d": identify}))
+
+        identified = json.loads(await self._ws.recv())
+        if identified.get("op") != OP_IDENTIFIED:
+            raise exceptions.ConnectionFailure("Invalid Identified message.")
+
+    async def reidentify(self, event_subscriptions):
+        """Change the event subscriptions, now and for later connects."""
+        self.event_subscriptions = event_subscriptions
+        if self.connected:
+            await self._ws.send(json.dumps({
+                "op": OP_REIDENTIFY, "d": {"eventSubscriptions": event_subscriptions},
+            }))
+
+    async def disconnect(self):
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except asyncio.CancelledError:
+                pass
+            self._reader_task = None
+        await self._close_socket()
+        self._fail_pending(exceptions.ConnectionFailure("Disconnected"))
+
+    async def _close_socket(self):
+        if self._ws is not None:
+            try:
+                await self._ws.close()
+            except Exception:
+                pass
+            self._ws = None
+
+    async def request(self, request_type, data=None, timeout=None):
+        """Send one request and return its response ``d`` payload.
+
+        Cancelling the awaiting task abandons the request; a late reply is
+        simply dropped by the reader.
+        """
+        request_id = str(next(self._ids))
+        payload = {
+            "op": OP_REQUEST,
+            "d": {
+                "requestType": request_type,
+                "requestId": request_id,
+                "requestData": data or {},
+            },
+        }
+        return await self._send_and_wait(request_id, payload, request_type, timeout)
+
+    async def request_batch(self, reqs, execution_type=EXECUTION_SERIAL_REALTIME,
+                            halt_on_failure=False, timeout=None):
+        """Send ``(request_type, data)`` pairs as one RequestBatch message.
+
+        Returns the list of per-request results from the batch response, in
+        request order. With ``halt_on_failure`` the list stops at the first
+        failed request.
+        """
+        request_id = str(next(self._ids))
+        payload = {
+            "op": OP_REQUEST_BATCH,
+            "d": {
+                "requestId": request_id,
+                "haltOnFailure": halt_on_failure,
+                "executionType": execution_type,
+                "requests": [
+                    {"requestType": t, "requestData": d or {}} for t, d in reqs
+                ],
+            },
+        }
+        d = await self._send_and_wait(request_id, payload, "RequestBatch", timeout)
+        return d.get("results", [])
+
+    async def _send_and_wait(self, request_id, payload, label, timeout):
+        if not self.connected:
+            raise exceptions.ConnectionFailure("Not connected")
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            await self._ws.send(json.dumps(payload))
+            return await asyncio.wait_for(
+                future, timeout if timeout is not None else self.timeout
+            )
+        except asyncio.TimeoutError:
+            raise exceptions.MessageTimeout(f"No answer for {label} ({request_id})")
+        except websockets.ConnectionClosed as e:
+            raise exceptions.ConnectionFailure(str(e))
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def _reader(self):
+        error = exceptions.ConnectionFailure("Connection closed")
+        try:
+            async for message in self._ws:
+                try:
+                    msg = json.loads(message)
+                except ValueError:
+                    continue
+                try:
+                    self._dispatch(msg.get("op"), msg.get("d") or {})
+                except Exception as e:
+                    # One bad message must not end the reader
+                    log.error("❌ Failed to handle OBS message: %s", e)
+        except websockets.ConnectionClosed as e:
+            error = exceptions.ConnectionFailure(str(e))
+        except Exception as e:
+            log.error("❌ OBS reader stopped: %s", e)
+            error = exceptions.ConnectionFailure(str(e) or type(e).__name__)
+        finally:
+            # Also on errors and cancellation, so nobody waits out a timeout
+            # on a connection that is gone
+            self._fail_pending(error)
+            for handler in list(self._close_handlers):
+                try:
+                    handler()
+                except Exception as e:
+                    log.error("❌ OBS close handler failed: %s", e)
+
+    def _dispatch(self, op, d):
+        if op in (OP_REQUEST_RESPONSE, OP_REQUEST_BATCH_RESPONSE):
+            future = self._pending.get(d.get("requestId"))
+            if future is not None and not future.done():
+                future.set_result(d)
+        elif op == OP_EVENT:
+            event_type = d.get("eventType")
+            for handler in list(self._event_handlers):
+                try:
+                    handler(event_type, d.get("eventData") or {})
+                except Exception as e:
+                    log.error("❌ OBS event handler failed on %s: %s", event_type, e)
+
+    def _fail_pending(self, error):
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self._pending.clear()
+
+    def add_event_handler(self, handler):
+        """Call ``handler(event_type, event_data)`` for every OBS event."""
+        self._event_handlers.append(handler)
+
+    def add_close_handler(self, handler):
+        """Call ``handler()`` when the connection drops."""
+        self._close_handlers.append(handler)
+
+
+class AsyncOBSBackend:
+    """Drop-in replacement for ``obsws`` backed by :class:`AsyncOBSClient`.
+
+    The client runs on a private event loop thread. ``call`` accepts the
+    same ``obswebsocket.requests`` objects as ``obsws.call`` and is safe to
+    use from several threads at once; their requests share the connection
+    instead of queueing behind each other.
+    """
+
+    def __init__(self, host="localhost", port=4455, password="", timeout=10,
+                 on_connect=None, on_disconnect=None):
+        self.timeout = timeout
+        self.on_connect = on_connect
+        self.on_disconnect = on_disconnect
+        self.client = AsyncOBSClient(host, port, password, timeout=timeout)
+        self.client.add_event_handler(self._on_event)
+        self.client.add_close_handler(self._on_close)
+        self._handlers = []
+        self._loop = None
+        self._thread = None
+        self._closing = False
+
+    def _ensure_loop(self):
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(
+                target=self._loop.run_forever, name="obs-asyncio", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self, coro, timeout=None):
+        self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    def connect(self):
+        self._closing = False
+        self._run(self.client.connect())
+        if self.on_connect:
+            self.on_connect(self)
+
+    def disconnect(self):
+        if self._loop is None:
+            return
+        self._closing = True
+        self._run(self.client.disconnect())
+        if self.on_disconnect:
+            self.on_disconnect(self)
+
+    def call(self, obj, timeout=None):
+        """Send an ``obswebsocket`` request object and fill in its response."""
+        timeout = timeout if timeout is not None else self.timeout
+        d = self._run(self.client.request(obj.name, obj.data(), timeout), timeout + 1)
+        obj.input(d.get("responseData") or {}, d["requestStatus"]["result"])
+        return obj
+
+    def call_many(self, objs, timeout=None):
+        """Send all requests at once and wait for every reply.
+
+        The requests are pipelined over the connection, so the total cost
+        is roughly one round trip. Failed requests come back as exceptions
+        in the result list instead of aborting the others.
+        """
+        timeout = timeout if timeout is not None else self.timeout
+
+        async def gather():
+            return await asyncio.gather(
+                *(self.client.request(o.name, o.data(), timeout) for o in objs),
+                return_exceptions=True,
+            )
+
+        results = []
+        for obj, d in zip(objs, self._run(gather(), timeout + 1)):
+            if isinstance(d, BaseException):
+                results.append(d)
+                continue
+            obj.input(d.get("responseData") or {}, d["requestStatus"]["result"])
+            results.append(obj)
+        return results
+
+    def call_batch(self, objs, execution_type=EXECUTION_SERIAL_REALTIME,
+                   halt_on_failure=False, timeout=None):
+        """Send request objects as a single RequestBatch and fill them in.
+
+        Requests skipped because an earlier one failed (``halt_on_failure``)
+        are left unanswered, with ``status`` still None.
+        """
+        timeout = timeout if timeout is not None else self.timeout
+        reqs = [(o.name, o.data()) for o in objs]
+        results = self._run(
+            self.client.request_batch(reqs, execution_type, halt_on_failure, timeout),
+            timeout + 1,
+        )
+        for obj, d in zip(objs, results):
+            obj.input(d.get("responseData") or {}, d["requestStatus"]["result"])
+        return objs
+
+    def set_event_subscriptions(self, event_subscriptions):
+        self._run(self.client.reidentify(event_subscriptions), self.timeout)
+
+    def register(self, func, event=None):
+        self._handlers.append((func, event))
+
+    def unregister(self, func, event=None):
+        self._handlers = [
+            (f, e) for f, e in self._handlers
+            if not (f == func and (event is None or e == event))
+        ]
+
+    def _on_event(self, event_type, event_data):
+        if not self._handlers:
+            return
+        event_class = getattr(events, event_type or "", None)
+        if event_class is None:
+            # Newer OBS versions send events obswebsocket does not know yet
+            log.debug("Ignoring unknown OBS event %s", event_type)
+            return
+        obj = event_class()
+        obj.input(event_data)
+        for func, event in list(self._handlers):
+            if event is None or isinstance(obj, event):
+                try:
+                    func(obj)
+                except Exception as e:
+                    log.error("❌ OBS event handler failed on %s: %s", event_type, e)
+
+    def _on_close(self):
+        if not self._closing and self.on_disconnect:
+            self.on_disconnect(self)
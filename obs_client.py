@@ -1,87 +1,285 @@
 # obs_client.py
-from obswebsocket import obsws, requests
+from obswebsocket import base_classes, exceptions, obsws, requests
+from functools import partial
+from macros import EXECUTION_MODES
+from metrics import metrics
+from obs_state import RECORD, STREAM, mute_key
+import json
+import logging
 import os
+import threading
+
+log = logging.getLogger(__name__)
+
+# obs-websocket v5 EventSubscription: everything except the high-volume
+# categories, and the input level meters (one of those)
+EVENT_SUBSCRIPTION_ALL = 1023
+EVENT_SUBSCRIPTION_INPUT_VOLUME_METERS = 1 << 16
+OP_REIDENTIFY = 3
+
+
+class ThreadSafeObsws(obsws):
+    """``obsws`` whose ``call`` can be used from several threads at once.
+
+    ``obsws.call`` hands out request ids without a lock, so two threads can
+    send the same id and get each other's answer. Here only handing out the
+    id and sending hold ``send_lock``; waiting for the answer does not, so
+    requests from different threads are still in flight together.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.send_lock = threading.Lock()
+
+    def call(self, obj):
+        if self.legacy:
+            # obs-websocket v4: not worth a copy of its message format
+            with self.send_lock:
+                return super().call(obj)
+        if not isinstance(obj, base_classes.Baserequests):
+            raise exceptions.ObjectError("Call parameter is not a request object")
+        payload = {"op": 6, "d": {"requestType": obj.name, "requestData": obj.data()}}
+        event = threading.Event()
+        with self.send_lock:
+            message_id = payload["d"]["requestId"] = str(self.id)
+            self.id += 1
+            self.events[message_id] = event
+            self.ws.send(json.dumps(payload))
+        event.wait(self.timeout)
+        self.events.pop(message_id, None)
+        answer = self.answers.pop(message_id, None)
+        if answer is None:
+            raise exceptions.MessageTimeout(f"No answer for message {message_id}")
+        obj.input(answer.get("responseData", {}), answer["requestStatus"]["result"])
+        return obj
+
 
 class OBSClient:
-    def __init__(self, host=None, port=None, password=None):
+    def __init__(self, host=None, port=None, password=None, backend=None, timeout=5):
         host = host if host is not None else os.getenv("OBS_HOST", "localhost")
         env_port = os.getenv("OBS_PORT")
         if port is None:
             port = int(env_port) if env_port is not None else 4455
         password = password if password is not None else os.getenv("OBS_PASSWORD", "")
+        backend = backend if backend is not None else os.getenv("OBS_BACKEND", "obsws")
 
-        self.ws = obsws(host, port, password)
+        if backend == "asyncio":
+            # Imported lazily so the default backend does not need websockets
+            from obs_async_client import AsyncOBSBackend
+            self.ws = AsyncOBSBackend(
+                host, port, password, timeout=timeout,
+                on_disconnect=self._on_socket_closed
+            )
+        elif backend == "obsws":
+            self.ws = ThreadSafeObsws(
+                host, port, password, timeout=timeout,
+                on_disconnect=self._on_socket_closed
+            )
+        else:
+            raise ValueError(f"Unknown OBS backend: {backend}")
+        if metrics.enabled:
+            # Time every request round trip; skipped entirely when disabled
+            self.ws.call = metrics.wrap_call(self.ws.call)
+        self.backend = backend
         self.connected = False
-    
+        self.event_subscriptions = EVENT_SUBSCRIPTION_ALL
+        # Set by ConnectionSupervisor when it owns the connection
+        self.supervisor = None
+        # Set by OBSStateMirror when event-fed state is available
+        self.state = None
+        # Set by ToggleReconciler; toggles then only record the press
+        self.reconciler = None
+
     def connect(self):
         self.ws.connect()
         self.connected = True
-        print("✅ Connected to OBS WebSocket")
-    
+        if self.event_subscriptions != EVENT_SUBSCRIPTION_ALL:
+            # obsws always identifies with the defaults
+            self._send_event_subscriptions()
+        log.info("✅ Connected to OBS WebSocket")
+
     def disconnect(self):
         if self.connected:
+            self.connected = False
             self.ws.disconnect()
+            log.info("❌ Disconnected from OBS WebSocket")
+
+    def reconnect(self):
+        """Drop whatever is left of the old socket and connect again."""
+        self.connected = False
+        try:
+            self.ws.disconnect()
+        except Exception:
+            pass
+        self.connect()
+
+    def _on_socket_closed(self, ws):
+        # Called by the backend for both explicit and unexpected disconnects;
+        # only the latter still has connected set.
+        if self.connected:
             self.connected = False
-            print("❌ Disconnected from OBS WebSocket")
+            log.warning("⚠️ Lost connection to OBS WebSocket")
+            if self.supervisor is not None:
+                self.supervisor.connection_lost()
+
+    def subscribe_volume_meters(self, enabled=True):
+        """Turn the InputVolumeMeters events on or off, kept across reconnects."""
+        if enabled:
+            self.event_subscriptions |= EVENT_SUBSCRIPTION_INPUT_VOLUME_METERS
+        else:
+            self.event_subscriptions &= ~EVENT_SUBSCRIPTION_INPUT_VOLUME_METERS
+        if self.connected:
+            self._send_event_subscriptions()
+
+    def _send_event_subscriptions(self):
+        if hasattr(self.ws, "set_event_subscriptions"):
+            self.ws.set_event_subscriptions(self.event_subscriptions)
+        else:
+            with self.ws.send_lock:
+                self.ws.ws.send(json.dumps({
+                    "op": OP_REIDENTIFY, "d": {"eventSubscriptions": self.event_subscriptions},
+                }))
+
+    def ping(self):
+        """Send a cheap request; raises if OBS does not answer in time."""
+        self.ws.call(requests.GetVersion())
+
+    def ensure_connection(self, retry=None):
+        """Return True if OBS is reachable.
+
+        With a supervisor attached this never blocks: the supervisor decides
+        whether ``retry`` is dropped or replayed after reconnecting.
+        """
+        if self.connected:
+            return True
+        if self.supervisor is not None:
+            self.supervisor.connection_unavailable(retry)
+            return False
+        try:
+            self.connect()
+        except Exception as e:
+            log.warning("OBS connection failed: %s", e)
+            return False
+        return True
+
+    def call_many(self, reqs):
+        """Send several requests, pipelined when the backend supports it.
 
-    def ensure_connection(self):
-        if not self.connected:
+        Returns one entry per request: the answered request object, or the
+        exception raised for it.
+        """
+        if not self.ensure_connection():
+            return []
+        if hasattr(self.ws, "call_many"):
+            return self.ws.call_many(reqs)
+        results = []
+        for req in reqs:
             try:
-                self.connect()
+                results.append(self.ws.call(req))
             except Exception as e:
-                print(f"OBS connection failed: {e}")
-                return False
-        return True
-    
+                results.append(e)
+        return results
+
+    def call_batch(self, reqs, execution="serial", halt_on_failure=False):
+        """Send requests as one RequestBatch when the backend supports it.
+
+        The obsws backend has no batch support, so it falls back to sending
+        the requests one after another. Requests that were never run are
+        left with ``status`` None.
+        """
+        if hasattr(self.ws, "call_batch"):
+            return self.ws.call_batch(reqs, EXECUTION_MODES[execution], halt_on_failure)
+        for req in reqs:
+            self.ws.call(req)
+            if halt_on_failure and not req.status:
+                break
+        return reqs
+
+    def run_macro(self, steps, execution="serial"):
+        """Run macro steps as a single batch and report each step's result."""
+        if not self.ensure_connection(partial(self.run_macro, steps, execution)):
+            return []
+        reqs = [
+            getattr(requests, step["requestType"])(**step.get("requestData", {}))
+            for step in steps
+        ]
+        self.call_batch(reqs, execution)
+        results = []
+        for number, req in enumerate(reqs, start=1):
+            if req.status is None:
+                log.info("  %s. %s: skipped", number, req.name)
+            elif req.status:
+                log.info("  %s. %s: ok", number, req.name)
+            else:
+                log.warning("  %s. %s: failed", number, req.name)
+            results.append((req.name, req.status, req.datain))
+        ok = sum(1 for _, status, _ in results if status)
+        log.info("🧩 Macro finished: %s/%s steps succeeded", ok, len(results))
+        return results
+
     def set_scene(self, scene_name):
-        if not self.ensure_connection():
+        if not self.ensure_connection(partial(self.set_scene, scene_name)):
             return
         self.ws.call(requests.SetCurrentProgramScene(sceneName=scene_name))
-        print(f"🎬 Switched to scene: {scene_name}")
+        log.info("🎬 Switched to scene: %s", scene_name)
     
     def toggle_mic(self):
-        if not self.ensure_connection():
+        if not self.ensure_connection(self.toggle_mic):
+            return
+        if self.reconciler is not None:
+            self.reconciler.press(self, mute_key("Mic/Aux"))
             return
         self.ws.call(requests.ToggleInputMute(inputName='Mic/Aux'))
-        print("🎙️ Toggled Mic Mute")
+        log.info("🎙️ Toggled Mic Mute")
     
     def start_recording(self):
-        if not self.ensure_connection():
+        if not self.ensure_connection(self.start_recording):
             return
         self.ws.call(requests.StartRecord())
-        print("⏺️ Recording Started")
+        log.info("⏺️ Recording Started")
 
     def stop_recording(self):
-        if not self.ensure_connection():
+        if not self.ensure_connection(self.stop_recording):
             return
         self.ws.call(requests.StopRecord())
-        print("⏹️ Recording Stopped")
+        log.info("⏹️ Recording Stopped")
 
     def start_streaming(self):
-        if not self.ensure_connection():
+        if not self.ensure_connection(self.start_streaming):
             return
-        self.ws.call(requests.StartStreaming())
-        print("📡 Streaming Started")
+        self.ws.call(requests.StartStream())
+        log.info("📡 Streaming Started")
 
     def stop_streaming(self):
-        if not self.ensure_connection():
+        if not self.ensure_connection(self.stop_streaming):
             return
-        self.ws.call(requests.StopStreaming())
-        print("🛑 Streaming Stopped")
+        self.ws.call(requests.StopStream())
+        log.info("🛑 Streaming Stopped")
 
     def toggle_streaming(self):
         """Start or stop streaming depending on current state."""
-        if not self.ensure_connection():
+        if not self.ensure_connection(self.toggle_streaming):
+            return
+        if self.reconciler is not None:
+            self.reconciler.press(self, STREAM)
             return
         self.ws.call(requests.ToggleStream())
-        print("🔀 Streaming Toggled")
+        log.info("🔀 Streaming Toggled")
 
     def toggle_filter(self, source_name, filter_name):
-        # Retrieve current filter state
-        if not self.ensure_connection():
+        if not self.ensure_connection(partial(self.toggle_filter, source_name, filter_name)):
             return
-        resp = self.ws.call(requests.GetSourceFilter(sourceName=source_name, filterName=filter_name))
-        current_state = resp.datain.get("filterEnabled")
+        key = ("filter", source_name, filter_name)
+        current_state = self.state.get(key) if self.state is not None else None
+        if current_state is None:
+            # Not mirrored yet: retrieve the current filter state first
+            resp = self.ws.call(requests.GetSourceFilter(sourceName=source_name, filterName=filter_name))
+            current_state = resp.datain.get("filterEnabled")
+            if self.state is not None:
+                self.state.track_filter(source_name, filter_name)
+        elif self.state is not None:
+            # Update the mirror right away so a quick second press toggles back
+            self.state.set(key, not current_state)
 
         # Toggle the filter state
         resp = self.ws.call(
@@ -90,18 +288,134 @@ class OBSClient:
                 filterEnabled=not current_state
             )
         )
+        if self.state is not None:
+            self.state.set(key, not current_state if resp.status else current_state)
 
         if resp.status:
-            print(f"✨ Toggled filter '{filter_name}' on {source_name}")
+            log.info("✨ Toggled filter '%s' on %s", filter_name, source_name)
         else:
-            print(f"❌ Failed to toggle filter '{filter_name}' on {source_name}")
+            log.error("❌ Failed to toggle filter '%s' on %s", filter_name, source_name)
 
     def toggle_recording(self):
         """Start or stop recording depending on current state."""
-        if not self.ensure_connection():
+        if not self.ensure_connection(self.toggle_recording):
+            return
+        if self.reconciler is not None:
+            self.reconciler.press(self, RECORD)
             return
         self.ws.call(requests.ToggleRecord())
-        print("🔀 Recording Toggled")
+        log.info("🔀 Recording Toggled")
+
+    # Encoder helpers: called many times a second, so they do not print and
+    # are never queued for replay while OBS is offline
+
+    def get_input_volume(self, input_name):
+        """Return the input's volume in dB, or None if unavailable."""
+        if not self.ensure_connection():
+            return None
+        resp = self.ws.call(requests.GetInputVolume(inputName=input_name))
+        return resp.datain.get("inputVolumeDb") if resp.status else None
+
+    def set_input_volume(self, input_name, volume_db):
+        if not self.ensure_connection():
+            return False
+        resp = self.ws.call(requests.SetInputVolume(inputName=input_name, inputVolumeDb=volume_db))
+        return bool(resp.status)
+
+    def get_transition_duration(self):
+        """Return the current transition's duration in ms, or None."""
+        if not self.ensure_connection():
+            return None
+        resp = self.ws.call(requests.GetCurrentSceneTransition())
+        return resp.datain.get("transitionDuration") if resp.status else None
+
+    def set_transition_duration(self, duration_ms):
+        if not self.ensure_connection():
+            return False
+        resp = self.ws.call(requests.SetCurrentSceneTransitionDuration(transitionDuration=duration_ms))
+        return bool(resp.status)
+
+    def get_scene_item_transform(self, scene_name, source_name):
+        """Return ``(scene_item_id, transform)``, or ``(None, None)``."""
+        if not self.ensure_connection():
+            return None, None
+        resp = self.ws.call(requests.GetSceneItemId(sceneName=scene_name, sourceName=source_name))
+        if not resp.status:
+            return None, None
+        item_id = resp.datain.get("sceneItemId")
+        resp = self.ws.call(requests.GetSceneItemTransform(sceneName=scene_name, sceneItemId=item_id))
+        if not resp.status:
+            return None, None
+        return item_id, resp.datain.get("sceneItemTransform", {})
+
+    def set_scene_item_transform(self, scene_name, item_id, transform):
+        if not self.ensure_connection():
+            return False
+        resp = self.ws.call(requests.SetSceneItemTransform(
+            sceneName=scene_name, sceneItemId=item_id, sceneItemTransform=transform
+        ))
+        return bool(resp.status)
+
+    def get_frame_interval(self):
+        """Return the duration of one OBS video frame in seconds, or None."""
+        if not self.ensure_connection():
+            return None
+        resp = self.ws.call(requests.GetVideoSettings())
+        if not resp.status or not resp.datain.get("fpsNumerator"):
+            return None
+        return resp.datain["fpsDenominator"] / resp.datain["fpsNumerator"]
+
+    def get_output_active(self, output):
+        """Return whether ``"record"`` or ``"stream"`` is running, or None."""
+        if not self.ensure_connection():
+            return None
+        req = requests.GetRecordStatus() if output == "record" else requests.GetStreamStatus()
+        resp = self.ws.call(req)
+        return resp.datain.get("outputActive") if resp.status else None
+
+    def set_output_active(self, output, active):
+        """Start or stop recording or streaming; False if OBS refused."""
+        if not self.ensure_connection():
+            return False
+        if output == "record":
+            req = requests.StartRecord() if active else requests.StopRecord()
+        else:
+            req = requests.StartStream() if active else requests.StopStream()
+        return bool(self.ws.call(req).status)
+
+    def get_input_mute(self, input_name):
+        if not self.ensure_connection():
+            return None
+        resp = self.ws.call(requests.GetInputMute(inputName=input_name))
+        return resp.datain.get("inputMuted") if resp.status else None
+
+    def set_input_mute(self, input_name, muted):
+        if not self.ensure_connection():
+            return False
+        resp = self.ws.call(requests.SetInputMute(inputName=input_name, inputMuted=muted))
+        return bool(resp.status)
+
+    def get_source_screenshot(self, source_name, width=None, height=None):
+        """Return a PNG of the source, base64 encoded, or None.
+
+        OBS scales the image; give one side to keep the aspect ratio. Like
+        the encoder helpers this is polled, so it neither prints nor queues.
+        """
+        if not self.ensure_connection():
+            return None
+        size = {}
+        if width:
+            size["imageWidth"] = width
+        if height:
+            size["imageHeight"] = height
+        resp = self.ws.call(requests.GetSourceScreenshot(
+            sourceName=source_name, imageFormat="png", **size
+        ))
+        if not resp.status:
+            return None
+        data = resp.datain.get("imageData", "")
+        # Sent as a data URL: "data:image/png;base64,...."
+        return data.partition(",")[2] or None
 
     def list_inputs(self):
         """Return a list of available input names."""
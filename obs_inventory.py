@@ -0,0 +1,220 @@
+import logging
+import threading
+
+from obswebsocket import events, requests
+
+log = logging.getLogger(__name__)
+
+INPUTS = ("inputs",)
+SCENES = ("scenes",)
+
+
+def filters_key(source_name):
+    return ("filters", source_name)
+
+
+class OBSInventory:
+    """Cache of OBS input, scene and filter names for the source pickers.
+
+    ``prefetch`` loads everything in bulk after connecting; OBS create,
+    remove and rename events then patch the cached lists in place. Lookups
+    answer through a callback: immediately on a hit, from a background
+    thread after fetching on a miss.
+    """
+
+    def __init__(self, obs):
+        self.obs = obs
+        self._cache = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.prefetches = 0
+
+        handlers = (
+            (self._on_input_created, events.InputCreated),
+            (self._on_input_removed, events.InputRemoved),
+            (self._on_input_renamed, events.InputNameChanged),
+            (self._on_scene_created, events.SceneCreated),
+            (self._on_scene_removed, events.SceneRemoved),
+            (self._on_scene_renamed, events.SceneNameChanged),
+            (self._on_filter_created, events.SourceFilterCreated),
+            (self._on_filter_removed, events.SourceFilterRemoved),
+            (self._on_filter_renamed, events.SourceFilterNameChanged),
+        )
+        for func, event in handlers:
+            obs.ws.register(func, event)
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "prefetches": self.prefetches,
+            "entries": len(self._cache),
+        }
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def get_inputs(self, callback):
+        self._lookup(INPUTS, self._fetch_inputs, callback)
+
+    def get_scenes(self, callback):
+        self._lookup(SCENES, self._fetch_scenes, callback)
+
+    def get_filters(self, source_name, callback):
+        self._lookup(
+            filters_key(source_name),
+            lambda: self._fetch_filters(source_name),
+            callback,
+        )
+
+    def prefetch(self):
+        """Load inputs, scenes and every source's filters in two batches."""
+        if not self.obs.connected:
+            return False
+        results = self.obs.call_many([requests.GetInputList(), requests.GetSceneList()])
+        if len(results) != 2 or any(isinstance(r, Exception) for r in results):
+            return False
+        inputs_req, scenes_req = results
+        inputs = [i.get("inputName") for i in inputs_req.datain.get("inputs", [])]
+        # GetSceneList lists scenes bottom-up; show them as OBS does
+        scenes = [s.get("sceneName") for s in reversed(scenes_req.datain.get("scenes", []))]
+
+        sources = inputs + scenes
+        results = self.obs.call_many(
+            [requests.GetSourceFilterList(sourceName=name) for name in sources]
+        )
+        cache = {INPUTS: inputs, SCENES: scenes}
+        for name, resp in zip(sources, results):
+            if isinstance(resp, Exception) or not resp.status:
+                continue
+            cache[filters_key(name)] = [
+                f.get("filterName") for f in resp.datain.get("filters", [])
+            ]
+        with self._lock:
+            self._cache = cache
+        self.prefetches += 1
+        return True
+
+    def _lookup(self, key, fetch, callback):
+        with self._lock:
+            value = self._cache.get(key)
+            if value is not None:
+                self.hits += 1
+                value = list(value)
+            else:
+                self.misses += 1
+                waiters = self._inflight.get(key)
+                if waiters is not None:
+                    waiters.append(callback)
+                    return
+                self._inflight[key] = [callback]
+        if value is not None:
+            callback(value)
+            return
+        threading.Thread(target=self._fill, args=(key, fetch), daemon=True).start()
+
+    def _fill(self, key, fetch):
+        try:
+            value = fetch()
+        except Exception as e:
+            log.warning("Failed to load %s: %s", " ".join(key), e)
+            value = None
+        with self._lock:
+            waiters = self._inflight.pop(key, [])
+            if value is not None:
+                self._cache[key] = value
+        for callback in waiters:
+            callback(list(value or []))
+
+    def _call(self, req):
+        if not self.obs.connected:
+            raise ConnectionError("OBS is not connected")
+        return self.obs.ws.call(req)
+
+    def _fetch_inputs(self):
+        resp = self._call(requests.GetInputList())
+        return [i.get("inputName") for i in resp.datain.get("inputs", [])]
+
+    def _fetch_scenes(self):
+        resp = self._call(requests.GetSceneList())
+        return [s.get("sceneName") for s in reversed(resp.datain.get("scenes", []))]
+
+    def _fetch_filters(self, source_name):
+        resp = self._call(requests.GetSourceFilterList(sourceName=source_name))
+        if not resp.status:
+            return None
+        return [f.get("filterName") for f in resp.datain.get("filters", [])]
+
+    def _edit(self, key, func):
+        with self._lock:
+            items = self._cache.get(key)
+            if items is not None:
+                func(items)
+
+    @staticmethod
+    def _rename(items, old, new):
+        if old in items:
+            items[items.index(old)] = new
+
+    def _on_input_created(self, event):
+        name = event.datain.get("inputName")
+        self._edit(INPUTS, lambda items: items.append(name))
+        with self._lock:
+            self._cache[filters_key(name)] = []
+
+    def _on_input_removed(self, event):
+        name = event.datain.get("inputName")
+        self._edit(INPUTS, lambda items: name in items and items.remove(name))
+        with self._lock:
+            self._cache.pop(filters_key(name), None)
+
+    def _on_input_renamed(self, event):
+        old, new = event.datain.get("oldInputName"), event.datain.get("inputName")
+        self._edit(INPUTS, lambda items: self._rename(items, old, new))
+        self._move_filters(old, new)
+
+    def _on_scene_created(self, event):
+        name = event.datain.get("sceneName")
+        self._edit(SCENES, lambda items: items.append(name))
+        with self._lock:
+            self._cache[filters_key(name)] = []
+
+    def _on_scene_removed(self, event):
+        name = event.datain.get("sceneName")
+        self._edit(SCENES, lambda items: name in items and items.remove(name))
+        with self._lock:
+            self._cache.pop(filters_key(name), None)
+
+    def _on_scene_renamed(self, event):
+        old, new = event.datain.get("oldSceneName"), event.datain.get("sceneName")
+        self._edit(SCENES, lambda items: self._rename(items, old, new))
+        self._move_filters(old, new)
+
+    def _move_filters(self, old, new):
+        with self._lock:
+            filters = self._cache.pop(filters_key(old), None)
+            if filters is not None:
+                self._cache[filters_key(new)] = filters
+
+    def _on_filter_created(self, event):
+        d = event.datain
+        name = d.get("filterName")
+        self._edit(filters_key(d.get("sourceName")), lambda items: items.append(name))
+
+    def _on_filter_removed(self, event):
+        d = event.datain
+        name = d.get("filterName")
+        self._edit(
+            filters_key(d.get("sourceName")),
+            lambda items: name in items and items.remove(name),
+        )
+
+    def _on_filter_renamed(self, event):
+        d = event.datain
+        self._edit(
+            filters_key(d.get("sourceName")),
+            lambda items: self._rename(items, d.get("oldFilterName"), d.get("filterName")),
+        )
@@ -0,0 +1,130 @@
+import logging
+import threading
+
+from obswebsocket import events, requests
+
+log = logging.getLogger(__name__)
+
+# State keys used by OBSStateMirror.get() and listeners
+SCENE = ("scene",)
+RECORD = ("output", "record")
+STREAM = ("output", "stream")
+
+
+def mute_key(input_name):
+    return ("mute", input_name)
+
+
+def filter_key(source_name, filter_name):
+    return ("filter", source_name, filter_name)
+
+
+class OBSStateMirror:
+    """Local copy of the OBS state the keys care about.
+
+    The mirror is fed by OBS events, so reading it costs nothing and
+    toggles can be computed locally and sent as a single request. Call
+    ``resync`` after every (re)connect to refill it from scratch.
+    """
+
+    def __init__(self, obs):
+        self.obs = obs
+        self._state = {}
+        self._inputs = set()
+        self._filters = set()
+        self._listeners = []
+        self._lock = threading.Lock()
+
+        handlers = (
+            (self._on_scene_changed, events.CurrentProgramSceneChanged),
+            (self._on_mute_changed, events.InputMuteStateChanged),
+            (self._on_filter_changed, events.SourceFilterEnableStateChanged),
+            (self._on_record_changed, events.RecordStateChanged),
+            (self._on_stream_changed, events.StreamStateChanged),
+        )
+        for func, event in handlers:
+            obs.ws.register(func, event)
+        obs.state = self
+
+    def add_listener(self, callback):
+        """Call ``callback(key, value)`` whenever a mirrored value changes."""
+        self._listeners.append(callback)
+
+    def get(self, key, default=None):
+        return self._state.get(key, default)
+
+    def set(self, key, value):
+        with self._lock:
+            if key in self._state and self._state[key] == value:
+                return
+            self._state[key] = value
+        for callback in list(self._listeners):
+            try:
+                callback(key, value)
+            except Exception as e:
+                log.error("State listener failed: %s", e)
+
+    def track_input(self, input_name):
+        """Include the input's mute state in future resyncs."""
+        self._inputs.add(input_name)
+
+    def track_filter(self, source_name, filter_name):
+        """Include the filter's enabled state in future resyncs."""
+        self._filters.add((source_name, filter_name))
+
+    def resync(self):
+        """Fetch every mirrored value again, pipelined where possible."""
+        inputs = sorted(self._inputs)
+        filters = sorted(self._filters)
+        reqs = [
+            requests.GetCurrentProgramScene(),
+            requests.GetRecordStatus(),
+            requests.GetStreamStatus(),
+        ]
+        reqs += [requests.GetInputMute(inputName=name) for name in inputs]
+        reqs += [
+            requests.GetSourceFilter(sourceName=s, filterName=f)
+            for s, f in filters
+        ]
+        results = self.obs.call_many(reqs)
+        if not results:
+            return False
+
+        def answered(resp):
+            return not isinstance(resp, Exception) and resp.status
+
+        scene, record, stream = results[:3]
+        if answered(scene):
+            self.set(SCENE, scene.datain.get("currentProgramSceneName"))
+        if answered(record):
+            self.set(RECORD, record.datain.get("outputActive"))
+        if answered(stream):
+            self.set(STREAM, stream.datain.get("outputActive"))
+        offset = 3
+        for name, resp in zip(inputs, results[offset:]):
+            if answered(resp):
+                self.set(mute_key(name), resp.datain.get("inputMuted"))
+        offset += len(inputs)
+        for (s, f), resp in zip(filters, results[offset:]):
+            if answered(resp):
+                self.set(filter_key(s, f), resp.datain.get("filterEnabled"))
+        return True
+
+    def _on_scene_changed(self, event):
+        self.set(SCENE, event.datain.get("sceneName"))
+
+    def _on_mute_changed(self, event):
+        self.set(mute_key(event.datain.get("inputName")), event.datain.get("inputMuted"))
+
+    def _on_filter_changed(self, event):
+        d = event.datain
+        self.set(
+            filter_key(d.get("sourceName"), d.get("filterName")),
+            d.get("filterEnabled"),
+        )
+
+    def _on_record_changed(self, event):
+        self.set(RECORD, event.datain.get("outputActive"))
+
+    def _on_stream_changed(self, event):
+        self.set(STREAM, event.datain.get("outputActive"))
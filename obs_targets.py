@@ -0,0 +1,226 @@
+import logging
+import os
+import re
+import threading
+import time
+
+from action_executor import ActionExecutor, PRIORITY_HIGH
+from connection_supervisor import ConnectionSupervisor
+from obs_client import OBSClient
+
+log = logging.getLogger(__name__)
+
+# Entry value that sends an action to every target
+BROADCAST = "*"
+# How long a fanned-out action waits for each target before giving up on it
+DEFAULT_TARGET_TIMEOUT = 2.0
+
+
+def parse_targets(text):
+    """Parse "main=localhost:4455,backup=10.0.0.5" into ``[(name, host, port)]``."""
+    targets = []
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, sep, address = part.partition("=")
+        name = name.strip()
+        if not sep or not name or name == BROADCAST:
+            raise ValueError(f"Expected name=host[:port] in OBS_TARGETS, got '{part}'")
+        host, _, port = address.strip().partition(":")
+        targets.append((name, host or "localhost", int(port) if port else 4455))
+    if len({name for name, _, _ in targets}) != len(targets):
+        raise ValueError("Duplicate target name in OBS_TARGETS")
+    return targets
+
+
+def password_for(name):
+    """``OBS_PASSWORD_<NAME>`` for the target, else ``OBS_PASSWORD``."""
+    variable = "OBS_PASSWORD_" + re.sub(r"\W", "_", name).upper()
+    return os.getenv(variable, os.getenv("OBS_PASSWORD", "your_password"))
+
+
+class OBSTarget:
+    """One OBS instance: its client, connection supervisor and call stats.
+
+    Calls for the target run on its own small worker pool, so a stalled
+    target only ever holds up its own requests. Calls for the same action
+    run in the order they were made.
+    """
+
+    def __init__(self, name, obs, dispatch=None, workers=2):
+        self.name = name
+        self.obs = obs
+        self.supervisor = ConnectionSupervisor(
+            obs,
+            policy=os.getenv("OBS_OFFLINE_POLICY", "fail"),
+            heartbeat_interval=float(os.getenv("OBS_HEARTBEAT", 5)),
+            dispatch=dispatch,
+        )
+        self.executor = ActionExecutor(workers=workers, max_queue=32)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+        self.last_s = None
+
+    def start(self):
+        self.executor.start()
+        self.supervisor.start()
+
+    def stop(self):
+        self.executor.stop()
+        self.supervisor.stop()
+        try:
+            self.obs.disconnect()
+        except Exception as e:
+            log.warning("OBS disconnect error (%s): %s", self.name, e, extra={"target": self.name})
+
+    def submit(self, func, name):
+        """Run ``func`` on this target's workers; returns a ``_Call`` to wait on."""
+        call = _Call()
+        if not self.obs.connected:
+            # Still called, so the offline policy can hold it for replay
+            call.error = "offline"
+        if not self.executor.submit(lambda: self._run(func, call), PRIORITY_HIGH, name, name):
+            call.error = "busy"
+            call.done.set()
+            self._record(call)
+        return call
+
+    def _run(self, func, call):
+        started = time.perf_counter()
+        try:
+            func()
+        except Exception as e:
+            call.error = str(e) or type(e).__name__
+        call.elapsed = time.perf_counter() - started
+        call.done.set()
+        self._record(call)
+
+    def _record(self, call):
+        with self._lock:
+            self.calls += 1
+            if call.error:
+                self.failures += 1
+            elif call.elapsed is not None:
+                self.total_s += call.elapsed
+                self.last_s = call.elapsed
+                self.max_s = max(self.max_s, call.elapsed)
+
+    def timed_out(self):
+        """Count a call that was given up on; it may still finish later."""
+        with self._lock:
+            self.timeouts += 1
+
+    def stats(self):
+        with self._lock:
+            timed = self.calls - self.failures
+            return {
+                "state": self.supervisor.state,
+                "calls": self.calls,
+                "failures": self.failures,
+                "timeouts": self.timeouts,
+                "avg_ms": self.total_s / timed * 1000 if timed > 0 else 0.0,
+                "last_ms": self.last_s * 1000 if self.last_s is not None else None,
+                "max_ms": self.max_s * 1000,
+            }
+
+
+class _Call:
+    __slots__ = ("done", "error", "elapsed")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.error = None
+        self.elapsed = None
+
+
+class OBSTargets:
+    """The OBS instances this controller drives, in configuration order.
+
+    ``OBS_TARGETS`` names them (``main=localhost:4455,backup=10.0.0.5``);
+    without it there is a single target from ``OBS_HOST``/``OBS_PORT``. The
+    first target is the primary: keys without a ``target`` go to it, and its
+    state is what the keys show.
+    """
+
+    def __init__(self, dispatch=None, timeout=None, spec=None):
+        self.timeout = timeout if timeout is not None else float(
+            os.getenv("OBS_TARGET_TIMEOUT", DEFAULT_TARGET_TIMEOUT)
+        )
+        spec = spec if spec is not None else os.getenv("OBS_TARGETS")
+        if spec:
+            addresses = parse_targets(spec)
+        else:
+            addresses = [("main", os.getenv("OBS_HOST", "localhost"), int(os.getenv("OBS_PORT", 4455)))]
+        self.targets = {}
+        for name, host, port in addresses:
+            obs = OBSClient(host=host, port=port, password=password_for(name))
+            self.targets[name] = OBSTarget(name, obs, dispatch)
+        self.primary = next(iter(self.targets.values()))
+
+    def __iter__(self):
+        return iter(self.targets.values())
+
+    def __len__(self):
+        return len(self.targets)
+
+    def names(self):
+        return list(self.targets)
+
+    def get(self, name):
+        return self.targets.get(name)
+
+    def resolve(self, target):
+        """Targets an entry's ``target`` refers to, or None if unknown."""
+        if target is None:
+            return [self.primary]
+        if target == BROADCAST:
+            return list(self.targets.values())
+        found = self.targets.get(target)
+        return [found] if found is not None else None
+
+    def start(self):
+        for target in self:
+            target.start()
+
+    def stop(self):
+        for target in self:
+            target.stop()
+
+    def fan_out(self, action_name, calls):
+        """Run ``calls`` (``[(target, func)]``) concurrently and wait for all.
+
+        Each target gets ``timeout`` seconds, counted from the same start,
+        so one slow or dead target never delays the others' results or
+        holds the key for longer than the timeout. Raises RuntimeError
+        naming the targets that failed or timed out.
+        """
+        started = time.perf_counter()
+        pending = [(target, target.submit(func, action_name)) for target, func in calls]
+        deadline = time.monotonic() + self.timeout
+        results, failed = [], []
+        for target, call in pending:
+            if not call.done.wait(max(0.0, deadline - time.monotonic())):
+                target.timed_out()
+                results.append(f"{target.name} timed out")
+                failed.append(target.name)
+            elif call.error:
+                results.append(f"{target.name} {call.error}")
+                failed.append(target.name)
+            else:
+                results.append(f"{target.name} {call.elapsed * 1000:.0f} ms")
+        if len(pending) > 1:
+            elapsed = (time.perf_counter() - started) * 1000
+            log.info(
+                "📡 %s → %s (%.0f ms)", action_name, ", ".join(results), elapsed,
+                extra={"action": action_name, "elapsed_ms": round(elapsed, 1)},
+            )
+        if failed:
+            raise RuntimeError(f"{action_name} failed on {', '.join(failed)}")
+
+    def stats(self):
+        return {target.name: target.stats() for target in self}
@@ -0,0 +1,214 @@
+"""QMK raw HID input backend.
+
+Reads 32-byte raw HID reports straight from the macropad (``/dev/hidraw*``
+on Linux) instead of going through OS key events, and sends LED feedback
+back. The firmware side sends and understands these reports:
+
+Device -> host
+    ``01 <control> <1=down|0=up>``  key press/release; controls are numbered
+    like ``KeyboardGUI.keys`` (0-2 encoders, 3-17 keys)
+    ``02 <encoder> <ticks>``        encoder turn; ticks is a signed byte,
+    negative for counter-clockwise
+
+Host -> device
+    ``10 <control> <0|1>``          LED off/on for one control
+
+Any file descriptor works as the device, so a pipe or pty can stand in for
+the keyboard in tests.
+"""
+import glob
+import logging
+import os
+import select
+import threading
+import time
+
+from hotkeys import ENCODER_COUNT, PRESS_CONTROLS
+
+log = logging.getLogger(__name__)
+
+REPORT_SIZE = 32
+REPORT_KEY = 0x01
+REPORT_ENCODER = 0x02
+REPORT_LED = 0x10
+# Usage page QMK uses for its raw HID interface
+QMK_USAGE_PAGE = b"\x06\x60\xff"
+REOPEN_INTERVAL = 2.0
+
+
+def find_qmk_device():
+    """Return the first /dev/hidraw* node exposing QMK's raw HID interface."""
+    for node in sorted(glob.glob("/sys/class/hidraw/hidraw*")):
+        try:
+            with open(os.path.join(node, "device", "report_descriptor"), "rb") as f:
+                descriptor = f.read()
+        except OSError:
+            continue
+        if descriptor.startswith(QMK_USAGE_PAGE):
+            return os.path.join("/dev", os.path.basename(node))
+    return None
+
+
+class QMKRawHID:
+    """Reader thread turning raw HID reports into dispatch/rotate calls.
+
+    Pass ``device`` (a path, reopened if the keyboard is unplugged and
+    plugged back in) or ``read_fd``/``write_fd`` (used as they are, e.g. the
+    ends of a pipe). ``report_id`` prefixes written reports with a zero
+    report ID, which hidraw expects for QMK's unnumbered reports. Key
+    releases go to ``release`` when it is given.
+    """
+
+    def __init__(self, dispatch, rotate, device=None, read_fd=None, write_fd=None,
+                 report_id=None, release=None):
+        if device is None and read_fd is None:
+            raise ValueError("need a device path or a file descriptor")
+        self.dispatch = dispatch
+        self.rotate = rotate
+        self.release = release
+        self.device = device
+        self.report_id = device is not None if report_id is None else report_id
+        self._read_fd = read_fd
+        self._write_fd = write_fd if write_fd is not None else read_fd
+        self._owns_fd = False
+        self._leds = {}
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake_r = self._wake_w = None
+        self._thread = None
+        self.reports = 0
+        self.malformed = 0
+        self.leds_sent = 0
+        self.leds_dropped = 0
+        self.total_s = 0.0
+
+    def start(self):
+        """Open the device and start the reader thread."""
+        if self.device is not None:
+            self._open()
+        os.set_blocking(self._read_fd, False)
+        os.set_blocking(self._write_fd, False)
+        self._wake_r, self._wake_w = os.pipe()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="qmk-hid", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2):
+        self._stop.set()
+        if self._wake_w is not None:
+            os.write(self._wake_w, b"x")
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        for fd in (self._wake_r, self._wake_w):
+            if fd is not None:
+                os.close(fd)
+        self._wake_r = self._wake_w = None
+        self._close()
+
+    def _open(self):
+        self._read_fd = self._write_fd = os.open(self.device, os.O_RDWR | os.O_NONBLOCK)
+        self._owns_fd = True
+
+    def _close(self):
+        with self._write_lock:
+            if self._owns_fd and self._read_fd is not None:
+                os.close(self._read_fd)
+                self._read_fd = self._write_fd = None
+                self._owns_fd = False
+
+    # -- input ---------------------------------------------------------------
+
+    def _run(self):
+        buffer = b""
+        while not self._stop.is_set():
+            if self._read_fd is None:
+                if self._stop.wait(REOPEN_INTERVAL):
+                    break
+                try:
+                    self._open()
+                except OSError:
+                    continue
+                log.info("🎹 Reconnected to %s", self.device)
+                self._resend_leds()
+            select.select([self._read_fd, self._wake_r], [], [])
+            if self._stop.is_set():
+                break
+            try:
+                data = os.read(self._read_fd, 4096)
+            except BlockingIOError:
+                continue
+            except OSError as e:
+                data = b""
+                log.warning("⚠️ Lost raw HID device: %s", e)
+            if not data:
+                # Unplugged, or the writing end of a pipe was closed
+                if self.device is None:
+                    break
+                self._close()
+                buffer = b""
+                continue
+            buffer += data
+            # hidraw returns whole reports; pipes may split or merge them
+            while len(buffer) >= REPORT_SIZE:
+                try:
+                    self.handle_report(buffer[:REPORT_SIZE])
+                except Exception:
+                    # A failing callback must not stop the reader thread
+                    log.exception("❌ Raw HID report %s failed", buffer[:3].hex())
+                buffer = buffer[REPORT_SIZE:]
+
+    def handle_report(self, report):
+        started = time.perf_counter()
+        self.reports += 1
+        kind, index, value = report[0], report[1], report[2]
+        if kind == REPORT_KEY and index < len(PRESS_CONTROLS):
+            if value:
+                self.dispatch(index)
+            elif self.release is not None:
+                self.release(index)
+        elif kind == REPORT_ENCODER and index < ENCODER_COUNT and value:
+            self.rotate(index, value - 256 if value > 127 else value)
+        else:
+            self.malformed += 1
+        self.total_s += time.perf_counter() - started
+
+    # -- LED feedback --------------------------------------------------------
+
+    def set_led(self, index, on):
+        """Light or clear the LED of control ``index``; skipped if unchanged."""
+        on = bool(on)
+        if self._leds.get(index) == on:
+            return
+        self._leds[index] = on
+        self._send_led(index, on)
+
+    def _send_led(self, index, on):
+        report = bytes([REPORT_LED, index, int(on)]).ljust(REPORT_SIZE, b"\0")
+        if self.report_id:
+            report = b"\0" + report
+        with self._write_lock:
+            fd = self._write_fd
+            if fd is None:
+                self.leds_dropped += 1
+                return
+            try:
+                os.write(fd, report)
+            except OSError:
+                # Feedback is best effort; the next change resends state
+                self.leds_dropped += 1
+                return
+        self.leds_sent += 1
+
+    def _resend_leds(self):
+        for index, on in list(self._leds.items()):
+            self._send_led(index, on)
+
+    def stats(self):
+        return {
+            "reports": self.reports,
+            "malformed": self.malformed,
+            "leds_sent": self.leds_sent,
+            "leds_dropped": self.leds_dropped,
+            "avg_us": self.total_s / self.reports * 1e6 if self.reports else 0.0,
+        }
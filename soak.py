@@ -0,0 +1,394 @@
+"""Soak test: replay a key trace through the controller against a fake OBS.
+
+Usage::
+
+    KEYBOARD_TRACE=session.kbt python main.py      # record while streaming
+    python soak.py session.kbt --speed 100          # replay 100 times faster
+    python soak.py --synthetic 200000 --speed 1000  # no recording needed
+    python soak.py session.kbt --config keyboard_config.json --repeat 5
+
+Events go into ``Controller.press``/``release``/``rotate``, the same path
+the keyboard hook and raw HID use: keys with gestures go through the
+gesture engine, the others straight to ``dispatch`` like the daemon's
+presses. ``fake_obs_server.py`` answers every request. The key assignments
+come from a copy of ``--config`` (the original is never written) or,
+without one, from a built-in layout that uses every kind of OBS action. Every ``--sample`` seconds the thread count,
+open file descriptors, resident memory and tracemalloc's traced memory are
+sampled along with the press latency. The report compares the start of the
+run with the end, and the exit status is 1 when threads, file descriptors
+or memory (``--max-growth-kb``) kept growing.
+"""
+import argparse
+import gc
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from event_log import setup_logging, shutdown_logging
+from key_trace import RELEASE, read_trace, synthetic_trace
+
+# Presses on the built-in layout, per key; encoders are the first three
+SOAK_LAYOUT = [
+    {"action": "Volume", "input": "Mic/Aux", "step": 1.0},
+    {"action": "Transition Duration", "step": 50},
+    {"action": "Nudge Transform", "scene": "Scene 1", "source": "Camera", "property": "positionX"},
+    {"action": "Scene 1"},
+    {"action": "Scene 2"},
+    {"action": "Toggle Mic"},
+    {"action": "Toggle Recording"},
+    {"action": "Toggle Stream"},
+    {"action": "Toggle Filter", "source": "Mic/Aux", "filter": "Noise Suppression"},
+    {"action": "Macro", "execution": "serial", "steps": [
+        {"requestType": "SetCurrentProgramScene", "requestData": {"sceneName": "Scene 2"}},
+        {"requestType": "SetInputMute", "requestData": {"inputName": "Mic/Aux", "inputMuted": False}},
+    ]},
+    {"action": "Switch Layer", "layer": "Alt"},
+    {"action": "Scene 1", "double_tap": {"action": "Scene 2"},
+     "follow_up": {"delay": 0.5, "action": "Previous Scene"}},
+    {"action": "Scene 2"},
+    {"action": "Toggle Mic"},
+    {"action": "Toggle Filter", "source": "Mic/Aux", "filter": "Noise Suppression",
+     "long_press": {"action": "Toggle Mic"}},
+    {"action": "Scene 1"},
+    {"action": "Scene 2"},
+    {"action": "Toggle Mic"},
+]
+# Threads and descriptors the run may end with beyond its start
+THREAD_SLACK = 2
+FD_SLACK = 4
+
+
+def soak_config():
+    alt = [dict(entry) for entry in SOAK_LAYOUT]
+    alt[10] = {"action": "Switch Layer", "layer": "Base"}
+    return {"version": 2, "active_layer": "Base", "layers": {"Base": SOAK_LAYOUT, "Alt": alt}}
+
+
+def open_fds():
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return None
+
+
+def rss_kb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class Sampler:
+    """Collects press latencies per window and samples process health."""
+
+    def __init__(self, controller, interval):
+        self.controller = controller
+        self.interval = interval
+        self.samples = []
+        self.completed = 0
+        self.failed = 0
+        self.refused = 0
+        self.dispatched = 0
+        self.max_lag = 0.0
+        self._latencies = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._started = None
+
+    def start(self):
+        self._started = time.monotonic()
+        self.sample()
+        self._thread = threading.Thread(target=self._run, name="soak-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.sample()
+
+    def done(self, submitted, error):
+        latency = time.perf_counter() - submitted
+        with self._lock:
+            self.completed += 1
+            if error is not None:
+                self.failed += 1
+            else:
+                self._latencies.append(latency)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        with self._lock:
+            latencies, self._latencies = self._latencies, []
+            completed = self.completed
+        self.samples.append({
+            "t_s": time.monotonic() - self._started,
+            "dispatched": self.dispatched,
+            "completed": completed,
+            "threads": threading.active_count(),
+            "fds": open_fds(),
+            "rss_kb": rss_kb(),
+            "traced_kb": tracemalloc.get_traced_memory()[0] // 1024,
+            "queue_depth": self.controller.executor.stats()["queue_depth"],
+            "p50_ms": percentile(latencies, 0.5) * 1000 if latencies else None,
+            "p99_ms": percentile(latencies, 0.99) * 1000 if latencies else None,
+        })
+
+
+def replay(controller, sampler, events, speed, repeat):
+    """Feed ``events`` to the controller on the trace's schedule, ``speed`` times faster."""
+    span = events[-1][0] + 0.001 if events else 0.0
+    started = time.perf_counter()
+    for round_number in range(repeat):
+        offset = round_number * span
+        for seconds, index, ticks in events:
+            due = started + (offset + seconds) / speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                sampler.max_lag = max(sampler.max_lag, -delay)
+            if ticks == RELEASE:
+                controller.release(index)
+                continue
+            if ticks:
+                controller.rotate(index, ticks)
+                continue
+            submitted = time.perf_counter()
+            sampler.dispatched += 1
+            if not controller.press(index, lambda error, s=submitted: sampler.done(s, error)):
+                sampler.refused += 1
+    return time.perf_counter() - started
+
+
+def wait_until_idle(controller, sampler, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        # Refused presses have had their done callback already
+        pending = sampler.dispatched - sampler.completed
+        # Open gestures and follow-ups still have timers set
+        idle = controller.executor.stats()["queue_depth"] == 0 and not controller.timers.stats()["pending"]
+        if pending <= 0 and idle:
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def top_growth(before, after, limit=5):
+    ignore = [tracemalloc.Filter(False, __file__), tracemalloc.Filter(False, tracemalloc.__file__)]
+    stats = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), "lineno")
+    return [
+        {"where": str(stat.traceback[0]), "size_kb": stat.size_diff / 1024, "count": stat.count_diff}
+        for stat in stats[:limit] if stat.size_diff > 0
+    ]
+
+
+def run(args):
+    if args.trace:
+        events = read_trace(args.trace)
+        source = args.trace
+    else:
+        events = synthetic_trace(args.synthetic, seed=args.seed)
+        source = f"synthetic ({args.synthetic} events)"
+    if not events:
+        raise SystemExit("trace has no events")
+
+    from fake_obs_server import FakeOBSServer
+
+    workdir = tempfile.mkdtemp(prefix="keyboard-soak-")
+    config_path = os.path.join(workdir, "keyboard_config.json")
+    if args.config:
+        shutil.copyfile(args.config, config_path)
+    else:
+        with open(config_path, "w") as f:
+            json.dump(soak_config(), f)
+
+    server = FakeOBSServer(latency=args.latency / 1000, seed=args.seed, output_delay=args.output_delay / 1000)
+    server.start()
+    # The controller reads its OBS address from the environment
+    for name in ("OBS_TARGETS", "KEYBOARD_TRACE", "QMK_HID_DEVICE"):
+        os.environ.pop(name, None)
+    os.environ.update(OBS_HOST="127.0.0.1", OBS_PORT=str(server.port), OBS_PASSWORD="")
+
+    tracemalloc.start(args.frames)
+    # Controller messages only go to the bounded in-memory log unless --verbose
+    event_log = setup_logging(console=args.verbose, log_file="")
+    try:
+        from controller import Controller
+        controller = Controller(config_path, max_queue=args.max_queue)
+        controller.load_config()
+        # Replay compresses time, so shrink the gesture thresholds with it
+        # or no hold would ever count as a long press
+        controller.gestures.double_tap /= args.speed
+        controller.gestures.long_press /= args.speed
+        controller.start(hotkeys=False)
+        deadline = time.monotonic() + 5
+        while not controller.obs.connected and time.monotonic() < deadline:
+            time.sleep(0.05)
+        if not controller.obs.connected:
+            raise SystemExit("could not connect to the fake OBS server")
+        # Let the first resync and prefetches finish before the baseline
+        time.sleep(0.5)
+        gc.collect()
+        before = tracemalloc.take_snapshot()
+
+        sampler = Sampler(controller, args.sample)
+        sampler.start()
+        elapsed = replay(controller, sampler, events, args.speed, args.repeat)
+        idle = wait_until_idle(controller, sampler)
+        gc.collect()
+        sampler.stop()
+        after = tracemalloc.take_snapshot()
+        executor = controller.executor.stats()
+        toggles = controller.toggles.stats()
+        gestures = dict(controller.gestures.stats(), timers=controller.timers.stats())
+        controller.stop()
+    finally:
+        logged = event_log.ring.seq
+        shutdown_logging()
+        server.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    samples = sampler.samples
+    first = next((s for s in samples if s["p50_ms"] is not None), samples[0])
+    last = next((s for s in reversed(samples) if s["p50_ms"] is not None), samples[-1])
+    start, end = samples[0], samples[-1]
+    trace_s = (events[-1][0] + 0.001) * args.repeat
+    presses = sampler.dispatched
+    return {
+        "config": {
+            "trace": source, "speed": args.speed, "repeat": args.repeat,
+            "latency_ms": args.latency, "output_delay_ms": args.output_delay,
+        },
+        "events": len(events) * args.repeat,
+        "presses": presses,
+        "completed": sampler.completed,
+        # Both include the refused presses
+        "failed": sampler.failed,
+        "refused": sampler.refused,
+        "drained": idle,
+        "trace_s": trace_s,
+        "elapsed_s": elapsed,
+        "events_per_s": len(events) * args.repeat / elapsed,
+        "max_lag_ms": sampler.max_lag * 1000,
+        "executor": executor,
+        "toggles": toggles,
+        "gestures": gestures,
+        "log_entries": logged,
+        "latency_start_p50_ms": first["p50_ms"],
+        "latency_start_p99_ms": first["p99_ms"],
+        "latency_end_p50_ms": last["p50_ms"],
+        "latency_end_p99_ms": last["p99_ms"],
+        "threads_start": start["threads"],
+        "threads_end": end["threads"],
+        "threads_max": max(s["threads"] for s in samples),
+        "fds_start": start["fds"],
+        "fds_end": end["fds"],
+        "rss_start_kb": start["rss_kb"],
+        "rss_end_kb": end["rss_kb"],
+        "traced_start_kb": start["traced_kb"],
+        "traced_end_kb": end["traced_kb"],
+        "top_growth": top_growth(before, after),
+        "samples": samples,
+    }
+
+
+def leaks(results, max_growth_kb):
+    """Return a description of every resource that grew past its allowance."""
+    found = []
+    if results["threads_end"] > results["threads_start"] + THREAD_SLACK:
+        found.append(f"threads {results['threads_start']} -> {results['threads_end']}")
+    if results["fds_start"] is not None and results["fds_end"] > results["fds_start"] + FD_SLACK:
+        found.append(f"file descriptors {results['fds_start']} -> {results['fds_end']}")
+    growth = results["traced_end_kb"] - results["traced_start_kb"]
+    if max_growth_kb is not None and growth > max_growth_kb:
+        found.append(f"traced memory +{growth} kB")
+    return found
+
+
+def print_report(results):
+    r = results
+    c = r["config"]
+    print(f"replayed {c['trace']} x{c['repeat']} at {c['speed']:g}x: "
+          f"{r['events']} events ({r['trace_s'] / 3600:.2f} h of input) in {r['elapsed_s']:.1f} s, "
+          f"{r['events_per_s']:.0f} events/s")
+    print(f"presses: {r['presses']} dispatched, {r['refused']} refused (queue full), "
+          f"{r['completed'] - r['refused']} ran, {r['failed'] - r['refused']} failed"
+          f"{'' if r['drained'] else ' (queue never drained)'}")
+    print(f"replay fell behind schedule by up to {r['max_lag_ms']:.1f} ms")
+    print(f"toggles: {r['toggles']['presses']} presses -> {r['toggles']['requests']} requests")
+    g = r["gestures"]
+    print(f"gestures: {g['taps']} taps, {g['double_taps']} double, {g['long_presses']} long; "
+          f"timers late p99 {g['timers']['p99_late_ms']:.2f} ms (max {g['timers']['max_late_ms']:.2f})")
+
+    def ms(value):
+        return f"{value:.1f}" if value is not None else "-"
+
+    print(f"latency p50/p99: start {ms(r['latency_start_p50_ms'])}/{ms(r['latency_start_p99_ms'])} ms, "
+          f"end {ms(r['latency_end_p50_ms'])}/{ms(r['latency_end_p99_ms'])} ms")
+    print(f"threads: {r['threads_start']} -> {r['threads_end']} (max {r['threads_max']})")
+    print(f"file descriptors: {r['fds_start']} -> {r['fds_end']}")
+    print(f"resident: {r['rss_start_kb']} -> {r['rss_end_kb']} kB")
+    print(f"traced memory: {r['traced_start_kb']} -> {r['traced_end_kb']} kB "
+          f"({r['traced_end_kb'] - r['traced_start_kb']:+d} kB)")
+    if r["top_growth"]:
+        print("largest growth:")
+        for site in r["top_growth"]:
+            print(f"  {site['size_kb']:+8.1f} kB {site['count']:+6d} blocks  {site['where']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("trace", nargs="?", help="trace recorded with KEYBOARD_TRACE")
+    parser.add_argument("--synthetic", type=int, default=20000,
+                        help="events of made-up input to replay when no trace is given")
+    parser.add_argument("--speed", type=float, default=100.0, help="replay speed, 1 to 1000")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--config", help="key assignments to use (copied, never modified)")
+    parser.add_argument("--latency", type=float, default=1.0, help="fake OBS latency in ms")
+    parser.add_argument("--output-delay", type=float, default=50.0,
+                        help="ms the fake OBS takes to start or stop recording/streaming")
+    parser.add_argument("--sample", type=float, default=1.0, help="seconds between samples")
+    parser.add_argument("--max-queue", type=int, default=256)
+    parser.add_argument("--frames", type=int, default=1, help="traceback depth kept by tracemalloc")
+    parser.add_argument("--max-growth-kb", type=int, help="fail when traced memory grows more")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="show the controller's output")
+    parser.add_argument("--json", help="write the results, with every sample, to this file")
+    args = parser.parse_args()
+    if not 1 <= args.speed <= 1000:
+        parser.error("--speed must be between 1 and 1000")
+
+    results = run(args)
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    found = leaks(results, args.max_growth_kb)
+    for leak in found:
+        print(f"LEAK {leak}")
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
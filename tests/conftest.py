@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+# The modules live flat in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_obs_server import FakeOBSServer  # noqa: E402
+
+
+@pytest.fixture
+def fake_obs():
+    with FakeOBSServer() as server:
+        yield server
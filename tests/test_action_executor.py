@@ -0,0 +1,119 @@
+import threading
+import time
+
+from action_executor import ActionExecutor, PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL
+from obs_client import OBSClient
+from obswebsocket import requests
+
+
+class SlowId(int):
+    def __str__(self):
+        time.sleep(0.001)
+        return int.__str__(self)
+
+    def __add__(self, other):
+        return SlowId(int(self) + other)
+
+
+def run_all(executor, submits, timeout=2):
+    """Submit ``(func, priority, order)`` items and wait for them to finish."""
+    for func, priority, order in submits:
+        assert executor.submit(func, priority, order=order)
+    deadline = time.monotonic() + timeout
+    while executor.stats()["completed"] < len(submits) and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+
+def test_higher_priority_is_taken_first():
+    executor = ActionExecutor(workers=1)
+    ran = []
+    gate = threading.Event()
+    # Keeps the only worker busy while the rest is queued
+    executor.submit(gate.wait)
+    executor.start()
+    for name, priority in (("low", PRIORITY_LOW), ("normal", PRIORITY_NORMAL), ("high", PRIORITY_HIGH)):
+        executor.submit(lambda n=name: ran.append(n), priority)
+    gate.set()
+    executor.stop()
+    assert ran == ["high", "normal", "low"]
+
+
+def test_same_order_key_runs_in_submit_order():
+    executor = ActionExecutor(workers=4)
+    executor.start()
+    ran = []
+    lock = threading.Lock()
+
+    def job(n):
+        def run():
+            # Earlier jobs take longer, so a parallel run would reorder them
+            time.sleep(0.02 * (5 - n))
+            with lock:
+                ran.append(n)
+        return run
+
+    run_all(executor, [(job(n), PRIORITY_NORMAL, "key") for n in range(5)])
+    executor.stop()
+    assert ran == [0, 1, 2, 3, 4]
+
+
+def test_different_order_keys_run_concurrently():
+    executor = ActionExecutor(workers=4)
+    executor.start()
+    barrier = threading.Barrier(4, timeout=1)
+    started = time.perf_counter()
+    # Only finishes if all four run at the same time
+    run_all(executor, [(barrier.wait, PRIORITY_NORMAL, n) for n in range(4)])
+    executor.stop()
+    assert executor.stats()["failed"] == 0
+    assert time.perf_counter() - started < 1
+
+
+def test_full_queue_drops_instead_of_blocking():
+    executor = ActionExecutor(workers=1, max_queue=2)
+    assert executor.submit(lambda: None)
+    assert executor.submit(lambda: None)
+    assert not executor.submit(lambda: None)
+    assert executor.stats()["dropped"] == 1
+
+
+def test_failing_action_is_counted_and_worker_survives():
+    executor = ActionExecutor(workers=1)
+    executor.start()
+    ran = []
+    run_all(executor, [(lambda: 1 / 0, PRIORITY_NORMAL, None), (lambda: ran.append(1), PRIORITY_NORMAL, None)])
+    executor.stop()
+    assert executor.stats()["failed"] == 1
+    assert ran == [1]
+
+
+def test_obsws_calls_from_many_threads_get_their_own_answers(fake_obs):
+    fake_obs.latency = 0.005
+    # Echoes the request back, so every answer can be matched to its caller
+    fake_obs.on("BroadcastCustomEvent", lambda data: (True, data["eventData"]))
+    client = OBSClient("127.0.0.1", fake_obs.port, "", backend="obsws", timeout=1)
+    client.connect()
+    # Widens the gap between reading and bumping the request id, where
+    # plain obsws lets two threads take the same id
+    client.ws.id = SlowId(client.ws.id)
+    errors = []
+
+    def caller(n):
+        for i in range(20):
+            try:
+                resp = client.ws.call(requests.BroadcastCustomEvent(eventData={"n": n, "i": i}))
+                assert resp.datain == {"n": n, "i": i}
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=caller, args=(n,)) for n in range(8)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    client.disconnect()
+    assert errors == []
+    # 160 requests of 5 ms one at a time would take 0.8 s
+    assert elapsed < 0.7
@@ -0,0 +1,69 @@
+import argparse
+import asyncio
+
+import pytest
+
+import benchmark
+from fake_obs_server import FakeOBSServer
+from obs_client import OBSClient
+
+ARGS = argparse.Namespace(iterations=20, warmup=2)
+
+
+def jitter_delays(monkeypatch, seed, count=20):
+    """Delays the fake server would add, without sleeping through them."""
+    server = FakeOBSServer(latency=0.002, jitter=0.001, seed=seed)
+    delays = []
+
+    async def record(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(asyncio, "sleep", record)
+    for _ in range(count):
+        asyncio.run(server._delay())
+    return delays
+
+
+def test_jitter_is_reproducible_with_a_seed(monkeypatch):
+    first = jitter_delays(monkeypatch, seed=1)
+    assert jitter_delays(monkeypatch, seed=1) == first
+    assert jitter_delays(monkeypatch, seed=2) != first
+    assert all(0.001 <= d <= 0.003 for d in first)
+
+
+@pytest.mark.parametrize("backend", benchmark.BACKENDS)
+def test_toggle_filter_request_counts(fake_obs, backend):
+    results = benchmark.bench_toggle_filter(fake_obs, backend, ARGS)
+    assert results["uncached"]["requests_per_toggle"] == 2
+    assert results["mirrored"]["requests_per_toggle"] == 1
+
+
+@pytest.mark.parametrize("backend", benchmark.BACKENDS)
+def test_encoder_spin_ends_on_the_exact_value(fake_obs, backend):
+    results = benchmark.bench_encoder(fake_obs, backend, ARGS, ticks=100, rate=1000)
+    assert results["exact"]
+    assert results["requests"] < 100
+
+
+def test_fake_server_tracks_state_like_obs(fake_obs):
+    client = OBSClient("127.0.0.1", fake_obs.port, "")
+    client.connect()
+    try:
+        client.set_scene("Scene 2")
+        client.toggle_mic()
+        client.toggle_filter("Mic/Aux", "Noise Suppression")
+    finally:
+        client.disconnect()
+    assert fake_obs.program_scene == "Scene 2"
+    assert fake_obs.inputs["Mic/Aux"]["muted"] is True
+    assert fake_obs.filters["Mic/Aux"]["Noise Suppression"] is False
+
+
+def test_compare_flags_only_regressions(capsys):
+    baseline = {"obsws": {"methods": {"set_scene": {"p50_ms": 1.0, "ops_per_s": 1000}}}}
+    better = {"obsws": {"methods": {"set_scene": {"p50_ms": 0.5, "ops_per_s": 2000}}}}
+    worse = {"obsws": {"methods": {"set_scene": {"p50_ms": 1.5, "ops_per_s": 500}}}}
+    assert benchmark.compare(baseline, better, 0.10) == 0
+    # Slower latency and lower throughput both count
+    assert benchmark.compare(baseline, worse, 0.10) == 2
+    assert "REGRESSION obsws.methods.set_scene.p50_ms" in capsys.readouterr().out
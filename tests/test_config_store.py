@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+from config_store import DEFAULT_LAYER, SCHEMA_VERSION, ConfigStore, migrate
+
+KEY_COUNT = 15
+
+
+def write(path, data):
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+
+def test_v0_list_becomes_the_base_layer(tmp_path):
+    path = tmp_path / "keyboard_config.json"
+    write(path, [{"action": "Scene 1"}, {"action": "Toggle Mic"}])
+    data = ConfigStore(str(path)).load(KEY_COUNT)
+    assert data["version"] == SCHEMA_VERSION
+    assert data["active_layer"] == DEFAULT_LAYER
+    keys = data["layers"][DEFAULT_LAYER]
+    assert keys[:2] == [{"action": "Scene 1"}, {"action": "Toggle Mic"}]
+    # Padded to the key count
+    assert len(keys) == KEY_COUNT
+    assert keys[2] == {"action": None}
+
+
+def test_v1_keys_become_the_base_layer():
+    data = migrate({"version": 1, "keys": [{"action": "Scene 2"}]})
+    assert data == {
+        "version": 2,
+        "active_layer": DEFAULT_LAYER,
+        "layers": {DEFAULT_LAYER: [{"action": "Scene 2"}]},
+    }
+
+
+def test_newer_version_is_refused():
+    with pytest.raises(ValueError):
+        migrate({"version": SCHEMA_VERSION + 1})
+
+
+def test_invalid_entries_are_cleared(tmp_path):
+    path = tmp_path / "keyboard_config.json"
+    write(path, [{"action": "Run Program"}, {"action": "Scene 1", "double_tap": "nope"}])
+    keys = ConfigStore(str(path)).load(KEY_COUNT)["layers"][DEFAULT_LAYER]
+    assert keys[0] == {"action": None}
+    assert keys[1] == {"action": None}
+
+
+def test_save_is_debounced_and_keeps_backups(tmp_path):
+    path = tmp_path / "keyboard_config.json"
+    store = ConfigStore(str(path), delay=60, backups=2)
+    for scene in ("Scene 1", "Scene 2", "Scene 1"):
+        store.save({"active_layer": DEFAULT_LAYER, "layers": {DEFAULT_LAYER: [{"action": scene}]}})
+    store.flush()
+    assert store.writes == 1
+    store.save({"active_layer": DEFAULT_LAYER, "layers": {DEFAULT_LAYER: [{"action": "Scene 2"}]}})
+    store.flush()
+    saved = json.loads(path.read_text(encoding="utf-8"))
+    assert saved["version"] == SCHEMA_VERSION
+    assert saved["layers"][DEFAULT_LAYER] == [{"action": "Scene 2"}]
+    backup = json.loads((tmp_path / "keyboard_config.json.bak1").read_text(encoding="utf-8"))
+    assert backup["layers"][DEFAULT_LAYER] == [{"action": "Scene 1"}]
+    assert not store.changed_externally()
+
+
+def test_corrupt_file_falls_back_to_the_backup(tmp_path):
+    path = tmp_path / "keyboard_config.json"
+    store = ConfigStore(str(path), delay=60)
+    store.save({"active_layer": DEFAULT_LAYER, "layers": {DEFAULT_LAYER: [{"action": "Scene 1"}]}})
+    store.flush()
+    store.save({"active_layer": DEFAULT_LAYER, "layers": {DEFAULT_LAYER: [{"action": "Scene 2"}]}})
+    store.flush()
+    path.write_text("{not json", encoding="utf-8")
+    data = store.load(KEY_COUNT)
+    assert data["layers"][DEFAULT_LAYER][0] == {"action": "Scene 1"}
+    assert store.load(KEY_COUNT, fallback=False) is None
@@ -0,0 +1,108 @@
+import json
+import socket
+import time
+
+import pytest
+
+from daemon import ControlServer
+
+
+@pytest.fixture
+def controller(fake_obs, tmp_path, monkeypatch):
+    for name in ("OBS_TARGETS", "KEYBOARD_TRACE", "QMK_HID_DEVICE"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("OBS_HOST", "127.0.0.1")
+    monkeypatch.setenv("OBS_PORT", str(fake_obs.port))
+    monkeypatch.setenv("OBS_PASSWORD", "")
+    config = tmp_path / "keyboard_config.json"
+    # Controls 0-2 are the encoders; Key 1 is control 3
+    keys = [{"action": None}] * 3 + [{"action": "Scene 2"}]
+    config.write_text(json.dumps(keys), encoding="utf-8")
+
+    from controller import Controller
+    controller = Controller(str(config))
+    controller.load_config()
+    controller.start(hotkeys=False)
+    deadline = time.monotonic() + 5
+    while not controller.obs.connected and time.monotonic() < deadline:
+        time.sleep(0.02)
+    yield controller
+    controller.stop()
+
+
+@pytest.fixture
+def client(controller, tmp_path):
+    server = ControlServer(controller, str(tmp_path / "control.sock"))
+    server.start()
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(5)
+    sock.connect(server.path)
+    stream = sock.makefile("rwb")
+
+    def request(message):
+        line = message if isinstance(message, bytes) else json.dumps(message).encode()
+        stream.write(line + b"\n")
+        stream.flush()
+        return json.loads(stream.readline())
+
+    request.server = server
+    yield request
+    stream.close()
+    sock.close()
+    server.stop()
+
+
+@pytest.mark.parametrize("message, error", [
+    ({"op": "press", "key": 99}, "key must be"),
+    ({"op": "press", "key": "Key 99"}, "key must be"),
+    ({"op": "turn", "encoder": 5}, "encoder must be"),
+    ({"op": "turn", "encoder": 0, "ticks": 0}, "ticks must be"),
+    ({"op": "run", "entry": {"action": "Run Program"}}, "invalid entry"),
+    ({"op": "run", "entry": {"action": "Nope"}}, "unknown action"),
+    ({"op": "batch", "entries": []}, "entries must be"),
+    ({"op": "layer", "name": [1]}, "unknown layer"),
+    ({"op": "layer", "name": "Missing"}, "unknown layer"),
+    ({"op": "log", "since": -1}, "since must be"),
+    ({"op": "explode"}, "unknown op"),
+    ([1, 2], "must be a JSON object"),
+])
+def test_invalid_requests_get_an_error_reply(client, message, error):
+    reply = client(dict(message, id=7) if isinstance(message, dict) else message)
+    assert reply["ok"] is False
+    assert error in reply["error"]
+    # The connection is still usable afterwards
+    assert client({"op": "status"})["ok"] is True
+
+
+def test_malformed_json_is_answered(client):
+    reply = client(b"{not json")
+    assert reply == {"id": None, "ok": False, "error": reply["error"]}
+    assert client({"op": "status"})["ok"] is True
+
+
+def test_internal_errors_keep_the_connection(client, controller, monkeypatch):
+    def broken(name):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(controller, "switch_layer", broken)
+    reply = client({"id": 1, "op": "layer", "name": "Base"})
+    assert reply["ok"] is False and "boom" in reply["error"]
+    assert client({"op": "status"})["ok"] is True
+    assert client.server.errors == 1
+
+
+def test_press_with_wait_runs_the_action(client, fake_obs):
+    reply = client({"id": "a", "op": "press", "key": 3, "wait": True})
+    assert reply == {"id": "a", "ok": True}
+    assert fake_obs.program_scene == "Scene 2"
+
+
+def test_run_and_batch(client, fake_obs):
+    assert client({"op": "run", "entry": {"action": "Scene 2"}, "wait": True})["ok"]
+    assert fake_obs.program_scene == "Scene 2"
+    before = fake_obs.request_counts["SetCurrentProgramScene"]
+    reply = client({"op": "batch", "wait": True, "entries": [
+        {"action": "Scene 1"}, {"action": "Scene 2"},
+    ]})
+    assert reply == {"id": None, "ok": True, "count": 2}
+    assert fake_obs.request_counts["SetCurrentProgramScene"] == before + 2
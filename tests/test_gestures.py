@@ -0,0 +1,202 @@
+import threading
+
+import pytest
+
+from actions import Binding
+from config_store import validate_entry
+from gestures import GestureEngine, Gestures
+from timer_wheel import TimerWheel
+
+DOUBLE_TAP = 0.3
+LONG_PRESS = 0.5
+
+
+class FakeTimer:
+    def __init__(self, deadline, callback):
+        self.deadline = deadline
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class FakeTimerWheel:
+    """Runs timers when the test moves the clock, not in real time."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.timers = []
+
+    def schedule(self, delay, callback):
+        timer = FakeTimer(self.now + delay, callback)
+        self.timers.append(timer)
+        return timer
+
+    def advance(self, seconds):
+        self.now += seconds
+        due = [t for t in self.timers if t.deadline <= self.now and not t.cancelled]
+        self.timers = [t for t in self.timers if t not in due and not t.cancelled]
+        for timer in sorted(due, key=lambda t: t.deadline):
+            timer.callback()
+
+    @property
+    def pending(self):
+        return [t for t in self.timers if not t.cancelled]
+
+
+def key(double_tap=True, long_press=True, **thresholds):
+    binding = Binding("tap", None)
+    binding.gestures = Gestures(
+        Binding("double", None) if double_tap else None,
+        Binding("long", None) if long_press else None,
+        **thresholds,
+    )
+    return binding
+
+
+@pytest.fixture
+def engine():
+    wheel = FakeTimerWheel()
+    ran = []
+    engine = GestureEngine(
+        wheel, lambda binding, done: ran.append((binding.action_name, done)),
+        double_tap=DOUBLE_TAP, long_press=LONG_PRESS,
+    )
+    engine.wheel = wheel
+    engine.ran = ran
+    return engine
+
+
+def names(engine):
+    return [name for name, _ in engine.ran]
+
+
+def test_tap_runs_once_the_double_tap_window_closes(engine):
+    binding = key()
+    engine.down(3, binding)
+    engine.wheel.advance(0.1)
+    engine.up(3)
+    engine.wheel.advance(DOUBLE_TAP - 0.01)
+    assert names(engine) == []
+    engine.wheel.advance(0.02)
+    assert names(engine) == ["tap"]
+    assert engine.stats() == {"taps": 1, "double_taps": 0, "long_presses": 0}
+
+
+def test_tap_without_double_tap_runs_on_release(engine):
+    binding = key(double_tap=False)
+    engine.down(3, binding)
+    engine.wheel.advance(0.1)
+    engine.up(3)
+    assert names(engine) == ["tap"]
+    # The long press timer was cancelled with the release
+    assert engine.wheel.pending == []
+
+
+def test_second_press_inside_the_window_is_a_double_tap(engine):
+    binding = key()
+    engine.down(3, binding)
+    engine.up(3)
+    engine.wheel.advance(DOUBLE_TAP / 2)
+    engine.down(3, binding)
+    engine.up(3)
+    engine.wheel.advance(1)
+    assert names(engine) == ["double"]
+    assert engine.stats()["double_taps"] == 1
+
+
+def test_second_press_after_the_window_is_two_taps(engine):
+    binding = key()
+    for _ in range(2):
+        engine.down(3, binding)
+        engine.up(3)
+        engine.wheel.advance(DOUBLE_TAP + 0.01)
+    assert names(engine) == ["tap", "tap"]
+
+
+def test_hold_past_the_threshold_is_a_long_press_while_held(engine):
+    binding = key()
+    engine.down(3, binding)
+    engine.wheel.advance(LONG_PRESS - 0.01)
+    assert names(engine) == []
+    engine.wheel.advance(0.02)
+    assert names(engine) == ["long"]
+    # The release after a long press does nothing
+    engine.up(3)
+    engine.wheel.advance(1)
+    assert names(engine) == ["long"]
+
+
+def test_per_key_thresholds_override_the_engine(engine):
+    binding = key(double_tap_s=0.1, long_press_s=1.0)
+    engine.down(3, binding)
+    engine.wheel.advance(0.6)
+    engine.up(3)
+    engine.wheel.advance(0.11)
+    assert names(engine) == ["tap"]
+
+
+def test_keys_are_independent(engine):
+    first, second = key(), key(double_tap=False)
+    engine.down(3, first)
+    engine.down(4, second)
+    engine.up(4)
+    engine.wheel.advance(LONG_PRESS + 0.01)
+    assert names(engine) == ["tap", "long"]
+
+
+def test_done_callbacks_hear_the_result_once(engine):
+    binding = key()
+    heard = []
+    engine.down(3, binding, heard.append)
+    engine.up(3)
+    engine.down(3, binding, heard.append)
+    engine.up(3)
+    (name, done), = engine.ran
+    assert name == "double"
+    done(None)
+    assert heard == [None, None]
+
+
+def test_engine_on_the_real_timer_wheel():
+    wheel = TimerWheel()
+    wheel.start()
+    fired = threading.Event()
+    engine = GestureEngine(wheel, lambda binding, done: fired.set(), long_press=0.02)
+    try:
+        engine.down(3, key(double_tap=False))
+        assert fired.wait(1)
+        assert engine.stats()["long_presses"] == 1
+    finally:
+        wheel.stop()
+
+
+def test_timer_wheel_fires_in_order_and_cancels():
+    wheel = TimerWheel()
+    wheel.start()
+    fired = []
+    done = threading.Event()
+    try:
+        wheel.schedule(0.03, lambda: (fired.append(3), done.set()))
+        wheel.schedule(0.01, lambda: fired.append(1))
+        wheel.schedule(0.02, lambda: fired.append(2)).cancel()
+        assert done.wait(1)
+    finally:
+        wheel.stop()
+    assert fired == [1, 3]
+    stats = wheel.stats()
+    assert stats["fired"] == 2 and stats["cancelled"] == 1 and stats["pending"] == 0
+
+
+@pytest.mark.parametrize("entry, valid", [
+    ({"action": "Scene 1", "double_tap": {"action": "Scene 2"}, "long_press_ms": 800}, True),
+    ({"action": "Scene 1", "follow_up": {"delay": 5, "action": "Previous Scene"}}, True),
+    ({"action": "Scene 1", "double_tap": {"action": "Scene 2", "long_press": {"action": "Scene 1"}}}, False),
+    ({"action": "Scene 1", "long_press_ms": 0}, False),
+    ({"action": "Scene 1", "follow_up": {"action": "Scene 2"}}, False),
+    ({"action": "Scene 1", "follow_up": {"delay": 1, "action": "Scene 2",
+                                         "follow_up": {"delay": 1, "action": "Scene 1"}}}, False),
+])
+def test_gesture_entries_are_validated(entry, valid):
+    assert (validate_entry(entry) is not None) == valid
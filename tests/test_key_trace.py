@@ -0,0 +1,71 @@
+import pytest
+
+from hotkeys import ENCODER_COUNT, PRESS_CONTROLS
+from key_trace import RELEASE, TRACE_MAGIC, TraceRecorder, read_trace, synthetic_trace, write_trace
+
+
+def test_write_and_read_round_trip(tmp_path):
+    path = str(tmp_path / "session.kbt")
+    events = [(0.0, 3, 0), (0.12, 3, RELEASE), (0.5, 1, -4), (0.51, 1, 127), (4000.0, 17, 0)]
+    write_trace(path, events)
+    assert read_trace(path) == events
+
+
+def test_synthetic_trace_round_trips(tmp_path):
+    path = str(tmp_path / "synthetic.kbt")
+    events = synthetic_trace(2000, seed=3)
+    write_trace(path, events)
+    replayed = read_trace(path)
+    assert [(i, t) for _, i, t in replayed] == [(i, t) for _, i, t in events]
+    # Times are stored in whole microseconds
+    assert all(abs(a[0] - b[0]) < 1e-6 for a, b in zip(replayed, events))
+    assert synthetic_trace(2000, seed=3) == events
+
+
+def test_synthetic_trace_releases_keys_and_turns_encoders():
+    events = synthetic_trace(5000, seed=0)
+    times = [t for t, _, _ in events]
+    assert times == sorted(times)
+    presses = [i for _, i, t in events if t == 0]
+    releases = [i for _, i, t in events if t == RELEASE]
+    turns = [i for _, i, t in events if t not in (0, RELEASE)]
+    assert presses and releases and turns
+    assert all(i >= ENCODER_COUNT for i in presses + releases)
+    assert all(i < ENCODER_COUNT for i in turns)
+
+
+def test_truncated_record_is_ignored(tmp_path):
+    path = tmp_path / "cut.kbt"
+    write_trace(str(path), [(0.0, 4, 0), (0.1, 4, RELEASE)])
+    path.write_bytes(path.read_bytes()[:-2])
+    assert read_trace(str(path)) == [(0.0, 4, 0)]
+
+
+def test_bad_files_are_rejected(tmp_path):
+    path = tmp_path / "bad.kbt"
+    path.write_bytes(b"not a trace")
+    with pytest.raises(ValueError):
+        read_trace(str(path))
+    path.write_bytes(TRACE_MAGIC + bytes([0, 0, 0, 0, len(PRESS_CONTROLS), 0]))
+    with pytest.raises(ValueError):
+        read_trace(str(path))
+
+
+def test_recorder_passes_events_through_and_records_them(tmp_path):
+    path = str(tmp_path / "recorded.kbt")
+    calls = []
+    recorder = TraceRecorder(path)
+    press, turn, release = recorder.wrap(
+        lambda i: calls.append(("press", i)),
+        lambda i, d: calls.append(("turn", i, d)),
+        lambda i: calls.append(("release", i)),
+    )
+    recorder.start()
+    press(5)
+    turn(0, 300)
+    release(5)
+    recorder.stop()
+    press(6)
+    assert calls == [("press", 5), ("turn", 0, 300), ("release", 5), ("press", 6)]
+    # Turns are clamped to what one record holds; stopped recorders write nothing
+    assert [(i, t) for _, i, t in read_trace(path)] == [(5, 0), (0, 127), (5, RELEASE)]
@@ -0,0 +1,84 @@
+import time
+
+from obs_async_client import AsyncOBSBackend
+from obswebsocket import requests
+
+
+def connect(server, **kwargs):
+    backend = AsyncOBSBackend("127.0.0.1", server.port, "", timeout=2, **kwargs)
+    backend.connect()
+    return backend
+
+
+def test_call_many_is_pipelined(fake_obs):
+    fake_obs.latency = 0.05
+    backend = connect(fake_obs)
+    try:
+        started = time.perf_counter()
+        results = backend.call_many([requests.GetVersion() for _ in range(20)])
+        elapsed = time.perf_counter() - started
+    finally:
+        backend.disconnect()
+    assert all(r.status for r in results)
+    # Twenty round trips one after another would take a second
+    assert elapsed < 0.5
+
+
+def test_answers_are_matched_by_request_id(fake_obs):
+    fake_obs.on("BroadcastCustomEvent", lambda data: (True, data["eventData"]))
+    backend = connect(fake_obs)
+    try:
+        results = backend.call_many(
+            [requests.BroadcastCustomEvent(eventData={"n": n}) for n in range(10)]
+        )
+    finally:
+        backend.disconnect()
+    assert [r.datain for r in results] == [{"n": n} for n in range(10)]
+
+
+def test_call_batch_fills_in_every_request(fake_obs):
+    backend = connect(fake_obs)
+    try:
+        reqs = backend.call_batch([
+            requests.SetCurrentProgramScene(sceneName="Scene 2"),
+            requests.GetCurrentProgramScene(),
+        ])
+    finally:
+        backend.disconnect()
+    assert all(r.status for r in reqs)
+    assert fake_obs.program_scene == "Scene 2"
+    assert fake_obs.request_counts["SetCurrentProgramScene"] == 1
+
+
+def test_failing_event_handler_does_not_stop_the_reader(fake_obs):
+    backend = connect(fake_obs)
+    seen = []
+
+    def handler(event):
+        seen.append(event.name)
+        raise RuntimeError("handler bug")
+
+    backend.register(handler)
+    try:
+        fake_obs.emit("CurrentProgramSceneChanged", {"sceneName": "Scene 2"})
+        fake_obs.emit("CurrentProgramSceneChanged", {"sceneName": "Scene 1"})
+        deadline = time.monotonic() + 2
+        while len(seen) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert len(seen) == 2
+        assert backend.client.connected
+        assert backend.call(requests.GetVersion()).status
+    finally:
+        backend.disconnect()
+
+
+def test_server_shutdown_runs_the_close_handlers(fake_obs):
+    closed = []
+    backend = connect(fake_obs, on_disconnect=lambda ws: closed.append(ws))
+    backend.client.add_close_handler(lambda: 1 / 0)
+    fake_obs.stop()
+    deadline = time.monotonic() + 2
+    while not closed and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert closed == [backend]
+    assert not backend.client.connected
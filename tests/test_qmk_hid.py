@@ -0,0 +1,105 @@
+import os
+import threading
+import time
+
+import pytest
+
+from qmk_hid import QMKRawHID, REPORT_ENCODER, REPORT_KEY, REPORT_LED, REPORT_SIZE
+
+
+def report(*data):
+    return bytes(data).ljust(REPORT_SIZE, b"\0")
+
+
+class Recorder:
+    def __init__(self, count):
+        self.events = []
+        self._done = threading.Event()
+        self._count = count
+
+    def add(self, *event):
+        self.events.append(event)
+        if len(self.events) >= self._count:
+            self._done.set()
+
+    def wait(self, timeout=2):
+        return self._done.wait(timeout)
+
+
+@pytest.fixture
+def pipes():
+    """(read fd, write fd) for input and (read fd, write fd) for LED reports."""
+    fds = os.pipe() + os.pipe()
+    yield fds
+    for fd in fds:
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+
+
+def start(pipes, recorder, **kwargs):
+    in_r, _, _, led_w = pipes
+    hid = QMKRawHID(
+        lambda i: recorder.add("press", i),
+        lambda i, d: recorder.add("turn", i, d),
+        read_fd=in_r, write_fd=led_w,
+        release=lambda i: recorder.add("release", i),
+        **kwargs,
+    )
+    hid.start()
+    return hid
+
+
+def test_reports_become_presses_releases_and_turns(pipes):
+    recorder = Recorder(4)
+    hid = start(pipes, recorder)
+    # Split and merged writes, like a pipe may deliver them
+    data = report(REPORT_KEY, 5, 1) + report(REPORT_KEY, 5, 0) + report(REPORT_ENCODER, 1, 3)
+    os.write(pipes[1], data[:10])
+    os.write(pipes[1], data[10:] + report(REPORT_ENCODER, 2, 0xFE))
+    assert recorder.wait()
+    hid.stop()
+    assert recorder.events == [("press", 5), ("release", 5), ("turn", 1, 3), ("turn", 2, -2)]
+    assert hid.stats()["reports"] == 4
+
+
+def test_malformed_reports_are_counted(pipes):
+    recorder = Recorder(1)
+    hid = start(pipes, recorder)
+    os.write(pipes[1], report(0x7F, 1, 1) + report(REPORT_KEY, 200, 1) + report(REPORT_KEY, 3, 1))
+    assert recorder.wait()
+    hid.stop()
+    assert recorder.events == [("press", 3)]
+    assert hid.stats()["malformed"] == 2
+
+
+def test_failing_callback_does_not_stop_the_reader(pipes):
+    recorder = Recorder(1)
+    in_r, _, _, led_w = pipes
+
+    def dispatch(index):
+        if index == 3:
+            raise RuntimeError("callback bug")
+        recorder.add("press", index)
+
+    hid = QMKRawHID(dispatch, lambda i, d: None, read_fd=in_r, write_fd=led_w)
+    hid.start()
+    os.write(pipes[1], report(REPORT_KEY, 3, 1) + report(REPORT_KEY, 4, 1))
+    assert recorder.wait()
+    hid.stop()
+    assert recorder.events == [("press", 4)]
+
+
+def test_leds_are_sent_only_when_they_change(pipes):
+    hid = start(pipes, Recorder(0))
+    hid.set_led(7, True)
+    hid.set_led(7, True)
+    hid.set_led(7, False)
+    deadline = time.monotonic() + 2
+    data = b""
+    while len(data) < 2 * REPORT_SIZE and time.monotonic() < deadline:
+        data += os.read(pipes[2], 4096)
+    hid.stop()
+    assert data == report(REPORT_LED, 7, 1) + report(REPORT_LED, 7, 0)
+    assert hid.stats()["leds_sent"] == 2
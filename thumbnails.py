@@ -0,0 +1,172 @@
+import threading
+import time
+from collections import OrderedDict
+
+# Default cache budget for encoded thumbnails
+DEFAULT_CACHE_BYTES = 8 * 1024 * 1024
+
+
+def thumbnail_source(binding):
+    """Scene or source whose picture a key should show, if any."""
+    if binding is None:
+        return None
+    if binding.action_name in ("Scene 1", "Scene 2"):
+        return binding.action_name
+    if binding.action_name in ("Toggle Filter", "Nudge Transform"):
+        return binding.meta.get("source")
+    return None
+
+
+class ThumbnailCache:
+    """LRU of encoded thumbnails, bounded by their total size in bytes.
+
+    Keyed by source name, so keys showing the same scene share one entry.
+    Safe to use from any thread.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, source):
+        with self._lock:
+            data = self._entries.get(source)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(source)
+            self.hits += 1
+            return data
+
+    def peek(self, source):
+        """Like ``get`` but without touching the LRU order or the counters."""
+        with self._lock:
+            return self._entries.get(source)
+
+    def put(self, source, data):
+        """Store ``data``; False if it alone is bigger than the whole cache."""
+        size = len(data)
+        if size > self.max_bytes:
+            return False
+        with self._lock:
+            old = self._entries.pop(source, None)
+            if old is not None:
+                self.bytes -= len(old)
+            self._entries[source] = data
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= len(evicted)
+                self.evictions += 1
+        return True
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class ThumbnailFetcher:
+    """Background thread refreshing thumbnails of the sources on screen.
+
+    Every ``interval`` seconds each wanted source is fetched once with
+    GetSourceScreenshot, already scaled by OBS to ``width`` pixels wide,
+    stored in ``cache`` and announced through ``on_update(source)`` (called
+    on the fetcher thread). ``pause`` stops all fetching, e.g. while the
+    window is hidden.
+    """
+
+    def __init__(self, obs, cache, on_update, interval=2.0, width=76):
+        self.obs = obs
+        self.cache = cache
+        self.on_update = on_update
+        self.interval = interval
+        self.width = width
+        self.fetches = 0
+        self.failures = 0
+        self.unchanged = 0
+        self.total_s = 0.0
+        self._sources = frozenset()
+        self._paused = False
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="thumbnails", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def set_sources(self, sources):
+        """Fetch these sources from now on; new ones are fetched right away."""
+        sources = frozenset(s for s in sources if s)
+        added = sources - self._sources
+        self._sources = sources
+        if added:
+            self._wake.set()
+
+    def pause(self):
+        self._paused = True
+
+    def resume(self):
+        if self._paused:
+            self._paused = False
+            self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            if not self._paused and self.obs.connected:
+                for source in self._sources:
+                    if self._stop.is_set() or self._paused:
+                        break
+                    self._fetch(source)
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def _fetch(self, source):
+        started = time.perf_counter()
+        try:
+            data = self.obs.get_source_screenshot(source, width=self.width)
+        except Exception:
+            data = None
+        self.total_s += time.perf_counter() - started
+        self.fetches += 1
+        if data is None:
+            self.failures += 1
+            return
+        if self.cache.peek(source) == data:
+            # Static scene; nothing to redraw
+            self.unchanged += 1
+            return
+        self.cache.put(source, data)
+        self.on_update(source)
+
+    def stats(self):
+        return dict(
+            self.cache.stats(),
+            fetches=self.fetches,
+            failures=self.failures,
+            unchanged=self.unchanged,
+            paused=self._paused,
+            avg_fetch_ms=self.total_s / self.fetches * 1000 if self.fetches else 0.0,
+        )
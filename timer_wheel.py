@@ -0,0 +1,179 @@
+"""Timer wheel for gesture timeouts and delayed follow-up actions.
+
+Timers are kept in a ring of slots, one per ``tick`` (1 ms by default), so
+scheduling and cancelling are a set insert or removal whatever the number
+of pending timers. The single timer thread sleeps until the earliest
+pending tick, not once per tick: with nothing due it is not woken at all.
+Times come from ``time.perf_counter``, which is monotonic and high
+resolution, and every timer records how late it fired so the jitter can
+be checked.
+"""
+import logging
+import math
+import threading
+import time
+from collections import deque
+
+log = logging.getLogger(__name__)
+
+TICK_S = 0.001
+SLOTS = 1024
+# Lateness samples kept for the jitter percentiles
+LATE_SAMPLES = 1024
+
+
+class Timer:
+    """A scheduled callback; ``cancel`` it to keep it from running."""
+
+    __slots__ = ("deadline", "tick", "callback", "wheel")
+
+    def __init__(self, wheel, deadline, tick, callback):
+        self.wheel = wheel
+        self.deadline = deadline
+        self.tick = tick
+        self.callback = callback
+
+    def cancel(self):
+        """Return True if the timer was still pending."""
+        return self.wheel.cancel(self)
+
+
+class TimerWheel:
+    """Runs callbacks after a delay, on one thread.
+
+    A timer due at tick ``t`` sits in slot ``t % slots``; timers more than
+    one turn of the wheel away share slots with nearer ones and are skipped
+    until their own tick comes round. Callbacks run on the timer thread
+    and should only queue work.
+    """
+
+    def __init__(self, tick=TICK_S, slots=SLOTS):
+        self.tick = tick
+        self._slots = [set() for _ in range(slots)]
+        self._cursor = self._tick_of(time.perf_counter())
+        self._next = None  # earliest pending tick, None when nothing is pending
+        self._pending = 0
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+        self.scheduled = 0
+        self.fired = 0
+        self.cancelled = 0
+        self.wakeups = 0
+        self.late_total = 0.0
+        self.late_max = 0.0
+        self._late = deque(maxlen=LATE_SAMPLES)
+
+    def _tick_of(self, when):
+        return math.floor(when / self.tick)
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name="timer-wheel", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2):
+        """Stop the thread; pending timers are dropped without running."""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def schedule(self, delay, callback):
+        """Call ``callback()`` once ``delay`` seconds have passed."""
+        deadline = time.perf_counter() + max(0.0, delay)
+        with self._cond:
+            # Rounded up, so a timer never fires before its deadline
+            tick = max(math.ceil(deadline / self.tick), self._cursor + 1)
+            timer = Timer(self, deadline, tick, callback)
+            self._slots[tick % len(self._slots)].add(timer)
+            self._pending += 1
+            self.scheduled += 1
+            if self._next is None or tick < self._next:
+                self._next = tick
+                self._cond.notify()
+        return timer
+
+    def cancel(self, timer):
+        with self._cond:
+            slot = self._slots[timer.tick % len(self._slots)]
+            if timer not in slot:
+                return False
+            slot.remove(timer)
+            self._pending -= 1
+            self.cancelled += 1
+            # _next may now be early; that costs one wakeup that finds nothing
+            return True
+
+    def _advance(self, current):
+        """Take the timers due by tick ``current`` out of the wheel."""
+        due = []
+        count = len(self._slots)
+        for tick in range(self._cursor + 1, self._cursor + 1 + min(current - self._cursor, count)):
+            slot = self._slots[tick % count]
+            if slot:
+                ready = [timer for timer in slot if timer.tick <= current]
+                slot.difference_update(ready)
+                due.extend(ready)
+        self._cursor = current
+        self._pending -= len(due)
+        if self._next is not None and self._next <= current:
+            self._next = self._find_next(current)
+        return due
+
+    def _find_next(self, current):
+        if not self._pending:
+            return None
+        count = len(self._slots)
+        for tick in range(current + 1, current + 1 + count):
+            if any(timer.tick == tick for timer in self._slots[tick % count]):
+                return tick
+        # Everything pending is more than one turn away
+        return min(timer.tick for slot in self._slots for timer in slot)
+
+    def _run(self):
+        with self._cond:
+            while self._running:
+                now = time.perf_counter()
+                due = self._advance(self._tick_of(now))
+                if due:
+                    self._cond.release()
+                    try:
+                        self._fire(due)
+                    finally:
+                        self._cond.acquire()
+                    continue
+                timeout = None if self._next is None else self._next * self.tick - now
+                self._cond.wait(timeout)
+                self.wakeups += 1
+
+    def _fire(self, due):
+        due.sort(key=lambda timer: timer.deadline)
+        for timer in due:
+            late = time.perf_counter() - timer.deadline
+            self.fired += 1
+            self.late_total += late
+            self.late_max = max(self.late_max, late)
+            self._late.append(late)
+            try:
+                timer.callback()
+            except Exception as e:
+                log.error("Timer callback failed: %s", e)
+
+    def stats(self):
+        late = sorted(self._late)
+        return {
+            "pending": self._pending,
+            "scheduled": self.scheduled,
+            "fired": self.fired,
+            "cancelled": self.cancelled,
+            "wakeups": self.wakeups,
+            "avg_late_ms": self.late_total / self.fired * 1000 if self.fired else 0.0,
+            "p99_late_ms": late[min(len(late) - 1, int(0.99 * len(late)))] * 1000 if late else 0.0,
+            "max_late_ms": self.late_max * 1000,
+        }
@@ -0,0 +1,231 @@
+import logging
+import threading
+import time
+
+from obs_state import RECORD, STREAM
+
+log = logging.getLogger(__name__)
+
+# How long a start or stop may take before OBS is asked again
+SETTLE_TIMEOUT = 10.0
+# How often a transition is checked when no state event wakes us up
+POLL_INTERVAL = 0.25
+
+
+class _Resource:
+    """One on/off OBS value a toggle key flips, on one OBS client."""
+
+    def __init__(self, obs, state_key):
+        self.obs = obs
+        self.state_key = state_key
+        if state_key == STREAM:
+            self.name, self.output = "Streaming", "stream"
+        elif state_key == RECORD:
+            self.name, self.output = "Recording", "record"
+        else:
+            # mute_key(input): "on" means muted
+            self.name, self.output = f"Mute {state_key[1]}", None
+
+    def read(self):
+        """Current value: from the state mirror when it has it, else from OBS."""
+        value = self.obs.state.get(self.state_key) if self.obs.state is not None else None
+        if value is not None:
+            return value
+        if self.output is not None:
+            return self.obs.get_output_active(self.output)
+        return self.obs.get_input_mute(self.state_key[1])
+
+    def write(self, value):
+        if self.output is not None:
+            return self.obs.set_output_active(self.output, value)
+        return self.obs.set_input_mute(self.state_key[1], value)
+
+
+class _Entry:
+    __slots__ = ("resource", "desired", "flips", "presses", "sent", "sent_at", "due")
+
+    def __init__(self, resource):
+        self.resource = resource
+        # Wanted end state; None until the state before the first press is known
+        self.desired = None
+        self.flips = 0
+        self.presses = 0
+        # Value of the transition in flight, and when it was requested
+        self.sent = None
+        self.sent_at = 0.0
+        self.due = 0.0
+
+
+class ToggleReconciler:
+    """Turns toggle presses into the net change OBS needs.
+
+    A press only flips the wanted state of its resource (streaming,
+    recording or an input's mute) and returns. One thread compares the
+    wanted state with OBS and sends an explicit Start/Stop or SetInputMute
+    when they differ, then waits for that transition to settle before
+    looking again. Three quick presses while the stream is starting
+    therefore end with the stream stopped, after exactly one more
+    request, and an even number of presses sends nothing at all.
+    """
+
+    def __init__(self):
+        self.presses = 0
+        self.requests = 0
+        self.failures = 0
+        self._entries = {}  # (id(obs), state key) -> _Entry
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    def attach(self, obs):
+        """Route ``obs``'s toggle actions through this reconciler."""
+        obs.reconciler = self
+        if obs.state is not None:
+            obs.state.add_listener(lambda key, value: self._on_state_changed(obs, key))
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name="toggle-reconcile", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def press(self, obs, state_key):
+        """Flip the wanted state of ``state_key`` on ``obs``; never blocks on OBS."""
+        with self._cond:
+            self.presses += 1
+            entry = self._entries.get((id(obs), state_key))
+            if entry is None:
+                entry = self._entries[(id(obs), state_key)] = _Entry(_Resource(obs, state_key))
+            entry.presses += 1
+            base = obs.state.get(state_key) if obs.state is not None else None
+            if entry.desired is not None:
+                entry.desired = not entry.desired
+            elif entry.flips or base is None:
+                # Unknown yet; the reconciler reads it before acting
+                entry.flips += 1
+            else:
+                entry.desired = not base
+            entry.due = 0.0
+            self._cond.notify()
+
+    def _on_state_changed(self, obs, state_key):
+        with self._cond:
+            entry = self._entries.get((id(obs), state_key))
+            if entry is not None:
+                entry.due = 0.0
+                self._cond.notify()
+
+    def _due(self):
+        """Wait for resources that need a look and take them."""
+        with self._cond:
+            while self._running:
+                now = time.monotonic()
+                due = [e for e in self._entries.values() if e.due <= now]
+                if due:
+                    for entry in due:
+                        # Not picked again until _reconcile says when
+                        entry.due = float("inf")
+                    return due
+                timeout = None
+                if self._entries:
+                    timeout = min(e.due for e in self._entries.values()) - now
+                    if timeout == float("inf"):
+                        timeout = None
+                self._cond.wait(timeout)
+            return None
+
+    def _run(self):
+        while True:
+            batch = self._due()
+            if batch is None:
+                return
+            for entry in batch:
+                try:
+                    self._reconcile(entry)
+                except Exception as e:
+                    log.error("%s toggle failed: %s", entry.resource.name, e)
+                    self._drop(entry)
+
+    def _reconcile(self, entry):
+        resource = entry.resource
+        actual = resource.read()
+        now = time.monotonic()
+        if entry.sent is not None:
+            if actual != entry.sent and now - entry.sent_at < SETTLE_TIMEOUT:
+                # Still starting or stopping; sending now would conflict
+                self._check_later(entry, now + POLL_INTERVAL)
+                return
+            entry.sent = None
+        with self._cond:
+            if entry.desired is None:
+                if actual is None:
+                    log.error(
+                        "❌ %s: state unknown, ignoring %s press(es)",
+                        resource.name, entry.flips,
+                    )
+                    self._drop(entry)
+                    return
+                entry.desired = actual ^ (entry.flips % 2 == 1)
+                entry.flips = 0
+            desired = entry.desired
+        if actual == desired:
+            with self._cond:
+                if entry.desired == desired:
+                    # Settled, with no press since we last looked
+                    if self._entries.get(self._key(entry)) is entry:
+                        del self._entries[self._key(entry)]
+                    return
+            self._check_later(entry, 0.0)
+            return
+        ok = resource.write(desired)
+        with self._cond:
+            self.requests += 1
+            if not ok:
+                self.failures += 1
+        if not ok:
+            log.error("❌ %s: OBS refused to turn it %s", resource.name, "on" if desired else "off")
+            self._drop(entry)
+            return
+        with self._cond:
+            presses, entry.presses = entry.presses, 0
+        log.info(
+            "🔀 %s %s (%s press(es))", resource.name, "on" if desired else "off", presses,
+            extra={"resource": resource.name, "presses": presses},
+        )
+        entry.sent = desired
+        entry.sent_at = now
+        self._check_later(entry, now + POLL_INTERVAL)
+
+    def _check_later(self, entry, when):
+        with self._cond:
+            # A press or state event may already have asked for sooner
+            entry.due = min(entry.due, when)
+            self._cond.notify()
+
+    def _drop(self, entry):
+        with self._cond:
+            if self._entries.get(self._key(entry)) is entry:
+                del self._entries[self._key(entry)]
+
+    @staticmethod
+    def _key(entry):
+        return (id(entry.resource.obs), entry.resource.state_key)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "pending": len(self._entries),
+                "presses": self.presses,
+                "requests": self.requests,
+                "failures": self.failures,
+            }
@@ -0,0 +1,38 @@
+# Imported lazily by the GUI: pystray and PIL are only needed once the
+# window is first hidden to the tray.
+import time
+
+import pystray
+from PIL import Image, ImageDraw
+
+
+class DoubleClickIcon(pystray.Icon):
+    """System tray icon that triggers a callback on double click."""
+
+    def __init__(self, *args, on_double_click=None, **kwargs):
+        self._on_double_click = on_double_click
+        super().__init__(*args, **kwargs)
+        self._last_click = 0
+
+    def __call__(self):
+        now = time.time()
+        if now - self._last_click < 0.5:
+            if callable(self._on_double_click):
+                self._on_double_click()
+        self._last_click = now
+
+
+def create_tray_icon(on_open, on_quit):
+    """Create the system tray icon."""
+    size = 64
+    image = Image.new("RGB", (size, size), "#1e1e1e")
+    draw = ImageDraw.Draw(image)
+    draw.text((size // 3, size // 4), "K", fill="white")
+    menu = pystray.Menu(
+        pystray.MenuItem("Open", on_open, default=True),
+        pystray.MenuItem("Quit", on_quit)
+    )
+    return DoubleClickIcon(
+        "keyboard", image, "Keyboard", menu,
+        on_double_click=on_open
+    )
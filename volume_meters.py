@@ -0,0 +1,163 @@
+import logging
+import threading
+import time
+from collections import deque
+
+import numpy as np
+from obswebsocket import events
+
+log = logging.getLogger(__name__)
+
+# Meter range: anything quieter shows as empty (OBS sends 0.0 for silence)
+FLOOR_DB = -60.0
+# Peaks at or above this count as clipping
+CLIP_DB = -0.5
+# Seconds the peak marker and the clip warning stay up
+HOLD_S = 1.5
+# Messages kept between two reads; older ones are dropped when nobody reads
+MAX_PENDING = 64
+
+
+def meter_input(binding):
+    """Input whose level a key should show, if any."""
+    if binding is None:
+        return None
+    if binding.action_name == "Toggle Mic":
+        return "Mic/Aux"
+    if binding.action_name == "Volume":
+        return binding.meta.get("input")
+    return None
+
+
+class VolumeMeters:
+    """Peak and RMS levels of every OBS input, from InputVolumeMeters.
+
+    OBS sends the levels of all inputs in one event, 20 or more times a
+    second. The event handler only appends each message's per-channel
+    multipliers to a short queue; ``levels`` then folds everything queued
+    since the previous call in one NumPy pass: the loudest value per input
+    over all channels and messages (so short peaks survive decimation),
+    conversion to dB, peak hold and clip detection. Call ``levels`` at the
+    display rate, from one thread.
+    """
+
+    def __init__(self, obs, hold=HOLD_S):
+        self.obs = obs
+        self.hold = hold
+        self.messages = 0
+        self.dropped = 0
+        self.frames = 0
+        self.total_s = 0.0
+        self._rows = {}
+        self._names = []
+        self._pending = deque(maxlen=MAX_PENDING)
+        self._lock = threading.Lock()
+        self._running = False
+        # Per input row, grown as inputs appear
+        self._db = np.full((0, 2), FLOOR_DB)
+        self._hold_db = np.full(0, FLOOR_DB)
+        self._hold_until = np.zeros(0)
+        self._clip_until = np.zeros(0)
+        self._levels = {}
+
+    def start(self):
+        """Subscribe to the meters; kept across reconnects until ``stop``."""
+        if self._running:
+            return
+        self._running = True
+        self.obs.ws.register(self._on_meters, events.InputVolumeMeters)
+        self.obs.subscribe_volume_meters(True)
+
+    def stop(self):
+        if not self._running:
+            return
+        self._running = False
+        try:
+            self.obs.subscribe_volume_meters(False)
+        except Exception as e:
+            log.warning("Could not unsubscribe from volume meters: %s", e)
+        self.obs.ws.unregister(self._on_meters, events.InputVolumeMeters)
+        with self._lock:
+            self._pending.clear()
+
+    def _on_meters(self, event):
+        # Runs on the websocket thread for every message: keep it to plain
+        # list building and leave the math to levels()
+        rows, channels = [], []
+        with self._lock:
+            for entry in event.datain.get("inputs") or ():
+                name = entry.get("inputName")
+                row = self._rows.get(name)
+                if row is None:
+                    row = self._rows[name] = len(self._names)
+                    self._names.append(name)
+                for channel in entry.get("inputLevelsMul") or ():
+                    rows.append(row)
+                    # [magnitude, peak, input peak]; the first two are shown
+                    channels.append(channel[:2])
+            if len(self._pending) == self._pending.maxlen:
+                self.dropped += 1
+            self._pending.append((rows, channels))
+            self.messages += 1
+
+    def levels(self, now=None):
+        """Return ``{input: (rms_db, peak_db, hold_db, clipping)}``.
+
+        Without new messages since the last call the previous levels are
+        returned as they were.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            batch = list(self._pending)
+            self._pending.clear()
+            names = list(self._names)
+        rows = [row for message_rows, _ in batch for row in message_rows]
+        if not rows:
+            return self._levels
+        started = time.perf_counter()
+        channels = np.array(
+            [channel for _, message_channels in batch for channel in message_channels],
+            dtype=np.float64,
+        ).reshape(-1, 2)
+        count = len(names)
+        self._grow(count)
+
+        loudest = np.zeros((count, 2))
+        np.maximum.at(loudest, np.array(rows, dtype=np.intp), channels)
+        # Inputs missing from every message keep what they showed last
+        seen = np.zeros(count, dtype=bool)
+        seen[rows] = True
+        db = 20 * np.log10(np.maximum(loudest, 10 ** (FLOOR_DB / 20)))
+        self._db[seen] = db[seen]
+        rms_db, peak_db = self._db[:, 0], self._db[:, 1]
+
+        refresh = (peak_db >= self._hold_db) | (now >= self._hold_until)
+        self._hold_db = np.where(refresh, peak_db, self._hold_db)
+        self._hold_until = np.where(refresh, now + self.hold, self._hold_until)
+        self._clip_until = np.where(peak_db >= CLIP_DB, now + self.hold, self._clip_until)
+        clipping = now < self._clip_until
+
+        self._levels = dict(zip(names, zip(
+            rms_db.tolist(), peak_db.tolist(), self._hold_db.tolist(), clipping.tolist(),
+        )))
+        self.frames += 1
+        self.total_s += time.perf_counter() - started
+        return self._levels
+
+    def _grow(self, count):
+        extra = count - len(self._hold_db)
+        if extra <= 0:
+            return
+        self._db = np.vstack((self._db, np.full((extra, 2), FLOOR_DB)))
+        self._hold_db = np.concatenate((self._hold_db, np.full(extra, FLOOR_DB)))
+        self._hold_until = np.concatenate((self._hold_until, np.zeros(extra)))
+        self._clip_until = np.concatenate((self._clip_until, np.zeros(extra)))
+
+    def stats(self):
+        return {
+            "inputs": len(self._names),
+            "messages": self.messages,
+            "dropped": self.dropped,
+            "frames": self.frames,
+            "avg_frame_ms": self.total_s / self.frames * 1000 if self.frames else 0.0,
+        }